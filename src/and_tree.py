@@ -1,15 +1,20 @@
 import os
 import time
+import random
 import threading
 import logging
 import logging.handlers
 from queue import Queue
-import cProfile
 
 from models import Game, GameSlot, Practice, PracticeSlot
 from input_parser import read_input
-from hard_constraints import satisfies_hard_constraints
-from soft_constraints import soft_penalty, partial_soft_penalty
+from hard_constraints import satisfies_hard_constraints, check_assignment_delta, check_compiled_assignment, compiled_conflict, SlotOverlapIndex
+from compiled_problem import CompiledProblem
+from soft_constraints import PenaltyTracker, default_bounds
+from schedule_state import ScheduleState
+from domain_store import DomainStore
+from search_cache import BoundedCache, NogoodStore
+from local_search import LocalSearch
 
 def time_to_float(time_str):
     # Convert a "HH:MM" time string into a float representing hours.
@@ -27,6 +32,24 @@ progress_state = {
     "assigned_practices": 0
 }
 
+# How expand_node picks the game to branch on: smallest domain first ("mrv"), first
+# in input order ("input"), or most incompatibilities and associated practices first
+# with smallest domain on ties ("degree")
+GAME_ORDERS = ("mrv", "input", "degree")
+# Order in which the DFS tries a node's children: lowest partial penalty first
+# ("penalty"), lowest lower bound first ("bound"), or slot order ("slot")
+VALUE_ORDERS = ("penalty", "bound", "slot")
+
+# Keyword options of ANDTreeSearch and their defaults; the comments in __init__ say
+# what each one does
+SEARCH_OPTIONS = dict(
+    check_penalties=False, check_constraints=False, bounds=None,
+    visited_cache_size=1 << 20, hard_cache_size=1 << 16, hash_bits=64,
+    game_order="mrv", value_order="penalty", seed=None, local_search_iterations=0,
+    practice_fallback=False, backjumping=False, nogood_cache_size=1 << 12,
+    symmetry_breaking=False,
+)
+
 def progress_monitor(interval=1.0):
     # Periodically print out the current search progress.
     # Helpful for long-running searches to see how many nodes have expanded,
@@ -49,23 +72,123 @@ def progress_monitor(interval=1.0):
 
 class ANDTreeNode:
     # Basic node structure for our AND/OR tree search.
-    # Contains the current partial/complete solution and references to child nodes.
-    def __init__(self, solution, parent=None):
+    # The search explores a single ScheduleState in place, so a node only stores the
+    # (item, slot) moves that lead to it from its parent; the full solution is kept
+    # on the root alone. pscore is the partial penalty of the state at this node and
+    # lower_bound adds the search's estimate of the penalty still to come.
+    def __init__(self, solution=None, parent=None, moves=None, pscore=0, lower_bound=None):
         self.solution = solution
         self.parent = parent
+        self.moves = list(moves) if moves else []
+        self.pscore = pscore
+        self.lower_bound = pscore if lower_bound is None else lower_bound
         self.explored_children = []
         self.unexplored_children = []
+        # Generator of the children, when expand_node leaves them to be made one at a
+        # time as the search reaches them (None otherwise)
+        self.pending_children = None
         self.is_pruned = False
+        # Trail positions of the moves that caused this node's dead end, when the search
+        # backjumps (None otherwise)
+        self.conflict = None
 
     def add_child(self, child):
         # Add a child node to the current node's unexplored children list.
         self.unexplored_children.append(child)
 
+class SearchFrame:
+    # One level of the iterative depth-first search: the node the state is positioned
+    # at, the trail mark to undo to when leaving it, and its children still to explore
+    # (the next one last, so they can be popped). When the children are generated one
+    # at a time instead (see expand_node), pending is the generator that yields them
+    # and children stays empty.
+    __slots__ = ("node", "mark", "depth", "children", "pending")
+
+    def __init__(self, node, mark, depth, children, pending=None):
+        self.node = node
+        self.mark = mark
+        self.depth = depth
+        self.children = children
+        self.pending = pending
+
+    def next_child(self):
+        # The next child to explore, or None once there is none left. A pending child is
+        # generated on the state, which must be positioned at the node.
+        if self.children:
+            return self.children.pop()
+        if self.pending is not None:
+            child = next(self.pending, None)
+            if child is not None:
+                return child
+            self.pending = None
+        return None
+
+    def generate_pending(self):
+        # Generate every pending child into children, for whatever needs them all at once
+        # (a cursor, best-first search). The state must be positioned at the node.
+        if self.pending is not None:
+            remaining = list(self.pending)
+            remaining.reverse()
+            self.children = remaining + self.children
+            self.pending = None
+
+class SearchCursor:
+    """
+    Pickleable position of a paused depth-first search, made by
+    ANDTreeSearch.make_cursor and continued with ANDTreeSearch.resume_search.
+
+    frames holds, from the root down, each node's moves, pscore, lower bound and depth,
+    together with the (moves, pscore, lower_bound) of its children still to explore.
+    Moves are (item id, slot id) pairs and the best schedule is an assignment vector,
+    so the cursor stays valid for any ANDTreeSearch built from the same input.
+    """
+    def __init__(self, frames, visited_states, max_depth, best_vector, best_score, expanded_nodes):
+        self.frames = frames
+        self.visited_states = visited_states
+        self.max_depth = max_depth
+        self.best_vector = best_vector
+        self.best_score = best_score
+        self.expanded_nodes = expanded_nodes
+
+class SearchStatus:
+    """
+    How a run_search(with_status=True) call ended.
+
+    stopped_by is "completed" when the DFS ran to the end, otherwise "time_limit",
+    "node_limit", "target_score" or "paused", and cursor then resumes the search with
+    resume_search. lower_bound is the lower bound at the root, so no schedule scores
+    below it. The DFS places practices greedily and can miss better schedules, so only
+    a best score that meets the lower bound is proven optimal, whether or not the DFS
+    completed.
+    """
+    def __init__(self, stopped_by, best_score, lower_bound, expanded_nodes, elapsed, cursor=None):
+        self.stopped_by = stopped_by
+        self.best_score = best_score
+        self.lower_bound = lower_bound
+        self.expanded_nodes = expanded_nodes
+        self.elapsed = elapsed
+        self.cursor = cursor
+
+    @property
+    def proven_optimal(self):
+        return self.best_score <= self.lower_bound + 1e-9
+
+    @property
+    def gap(self):
+        # How far the best score may still be above the optimum (inf without a schedule)
+        return self.best_score - self.lower_bound
+
+    def __repr__(self):
+        return (f"SearchStatus(stopped_by={self.stopped_by!r}, best_score={self.best_score}, "
+                f"lower_bound={self.lower_bound}, gap={self.gap}, proven_optimal={self.proven_optimal}, "
+                f"expanded_nodes={self.expanded_nodes}, elapsed={self.elapsed:.2f}s)")
+
 class ANDTreeSearch:
     # Main class implementing the AND-tree search for scheduling.
     # Handles reading inputs, setting up constraints, performing search,
     # and pruning suboptimal or invalid solutions.
-    def __init__(self, games, practices, game_slots, practice_slots, incompatibilities, preferences, pairs, partial_assignments, weights, unwanted, logger):
+    def __init__(self, games, practices, game_slots, practice_slots, incompatibilities, preferences, pairs, partial_assignments, weights, unwanted, logger, problem=None,
+                 **options):
         # Store all problem data and search parameters
         self.games = games
         self.practices = practices
@@ -78,6 +201,21 @@ class ANDTreeSearch:
         self.unwanted = unwanted
         self.weights = weights
         self.logger = logger
+        # Search options (see SEARCH_OPTIONS), kept so another process can build an
+        # identical search
+        unknown = sorted(set(options) - set(SEARCH_OPTIONS))
+        if unknown:
+            raise TypeError(f"Unknown search options: {', '.join(unknown)}")
+        self.options = options = {**SEARCH_OPTIONS, **options}
+
+        # Branching order; with a seed, ties are broken at random instead of by id
+        if options["game_order"] not in GAME_ORDERS:
+            raise ValueError(f"Unknown game order: {options['game_order']}")
+        if options["value_order"] not in VALUE_ORDERS:
+            raise ValueError(f"Unknown value order: {options['value_order']}")
+        self.game_order = options["game_order"]
+        self.value_order = options["value_order"]
+        self.rng = None if options["seed"] is None else random.Random(options["seed"])
 
         # Build a quick-access map for incompatibilities
         self.incompat_map = {}
@@ -86,13 +224,92 @@ class ANDTreeSearch:
             self.incompat_map.setdefault(i1, set()).add(i2)
             self.incompat_map.setdefault(i2, set()).add(i1)
 
-        self.hard_constraint_cache = {}
+        # Slots are fixed for the whole search, so their overlaps are computed once
+        self.overlap_index = SlotOverlapIndex(game_slots, practice_slots)
+
+        # Integer-indexed view of the problem that the search runs on; problem passes one
+        # already compiled from these games, slots and constraints (see problem_cache)
+        if problem is None:
+            problem = CompiledProblem(games, practices, game_slots, practice_slots, incompatibilities, unwanted)
+        self.problem = problem
+
+        # Visited states and hard-constraint results are keyed by the state's Zobrist hash
+        # and capped in size (None for no cap); hash_bits=128 makes collisions even rarer
+        self.hash_bits = options["hash_bits"]
+        self.visited_cache_size = options["visited_cache_size"]
+        self.hard_constraint_cache = BoundedCache(options["hard_cache_size"])
+
+        # Children are only built from placements check_assignment accepted, so the DFS
+        # does not check them again; check_constraints re-checks every state it steps
+        # into against all hard constraints (slow, for debugging)
+        self.check_constraints = options["check_constraints"]
         
         # Initialize the root node with any partial assignments applied
         self.root = ANDTreeNode(solution=self.initialize_solution_with_partial_assignments())
         
+        # Soft penalties are kept up to date as the state changes; check_penalties
+        # cross-checks every query against the from-scratch functions (slow, for debugging)
+        self.penalties = PenaltyTracker(self.problem, weights, preferences, pairs, debug=options["check_penalties"])
+
+        # Estimates of the penalty unassigned items will still add, used for pruning;
+        # pass bounds=() to prune on the partial penalty alone
+        self.bounds = default_bounds() if options["bounds"] is None else list(options["bounds"])
+
+        # Feasible slots of every unassigned item, propagated after each assignment
+        self.domains = DomainStore(self.problem)
+
+        # Practices are placed greedily in the first feasible slot. By default a branch is
+        # dropped when that slot cannot beat the best score; with practice_fallback the
+        # later slots are tried instead, which finds better schedules for a similar
+        # number of nodes but changes which ones the default search reports
+        self.practice_fallback = options["practice_fallback"]
+
+        # With backjumping, a dead end is traced back to the placements that emptied the
+        # item's domain: the DFS leaves every node below the deepest of them at once and
+        # learns the placements as a nogood, checked on every child it tries
+        self.backjumping = options["backjumping"]
+        self.nogoods = NogoodStore(options["nogood_cache_size"]) if self.backjumping else None
+
+        # With symmetry_breaking, interchangeable games (see setup_symmetries) are only
+        # tried in lexicographic-leader order, and a game goes to just one of several
+        # interchangeable empty slots
+        self.symmetry_breaking = options["symmetry_breaking"]
+        self.game_classes = {}
+        self.slot_class = [None] * len(self.problem.slots)
+        self.held_games = frozenset()
+        if self.symmetry_breaking:
+            self.setup_symmetries()
+
+        # Every schedule the DFS finds that beats the best so far is annealed for
+        # local_search_iterations steps (0 to skip); partial assignments stay in place
+        self.local_search_iterations = options["local_search_iterations"]
+        self.local_search = None
+        if self.local_search_iterations:
+            fixed = [i for i, s in enumerate(self.problem.vector_from_solution(self.root.solution)) if s is not None]
+            self.local_search = LocalSearch(self.problem, PenaltyTracker(self.problem, weights, preferences, pairs),
+                                            fixed, seed=0 if options["seed"] is None else options["seed"])
+
+        # The search explores this state in place, starting from the root solution
+        self.reset_state()
+
         # We don't know the best solution yet
         self.best_solution = None
+        self.pause_requested = False
+        self.pause_reason = None
+        # Budgets of the current run_search: a time.time() deadline and a score that is
+        # good enough to stop at (None for no limit)
+        self.deadline = None
+        self.target_score = None
+        self.stop_reason = None
+
+        # Each new best schedule is written to solution_file (None to skip). When several
+        # processes search together, incumbent is a shared multiprocessing.Value holding
+        # the best score any of them has found, so each prunes with the others' results.
+        self.solution_file = "final_solution.txt"
+        self.incumbent = None
+        # Optional hook with maybe_donate(search, stack), called at every step of the
+        # DFS so a parallel driver can hand open nodes to idle processes
+        self.work_sharing = None
 
         self.logger.debug("Initialization complete. Starting solution:\n %s", self.root.solution)
 
@@ -107,33 +324,148 @@ class ANDTreeSearch:
                 raise ValueError(f"Invalid partial assignment: {assignment}")
             solution[slot].append(item)
             # Check constraints immediately after adding
-            if not satisfies_hard_constraints(solution, self.incompatibilities, self.unwanted, self.incompat_map):
+            if not satisfies_hard_constraints(solution, self.incompatibilities, self.unwanted, self.incompat_map, self.overlap_index):
                 self.logger.debug("Partial assignment %s violates constraints. Removing.", item.id)
                 solution[slot].remove(item)
         return solution
 
+    def reset_state(self):
+        # Start a fresh in-place state at the root solution, with the penalty tracker
+        # and bounds following its moves.
+        self.state = ScheduleState(self.problem, self.root.solution, self.hash_bits)
+        self.penalties.attach(self.state)
+        self.domains.attach(self.state)
+        for bound in self.bounds:
+            bound.attach(self.state, self.penalties)
+
+    def setup_symmetries(self):
+        # Interchangeable games and slots under both the hard and the soft constraints.
+        # Games of the root solution never move, so they are left out. Practices are
+        # placed greedily rather than branched on, so only game classes are kept.
+        root_vector = self.problem.vector_from_solution(self.root.solution)
+        for items in self.problem.interchangeable_items(self.penalties.item_signature):
+            games = tuple(i for i in items if self.problem.item_is_game[i] and root_vector[i] is None)
+            if len(games) > 1:
+                for g in games:
+                    self.game_classes[g] = games
+        for c, slots in enumerate(self.problem.interchangeable_slots(self.penalties.slot_signature)):
+            for slot in slots:
+                self.slot_class[slot] = c
+        self.logger.debug("Symmetry breaking: %d interchangeable games, %d interchangeable slots",
+                          len(self.game_classes), sum(c is not None for c in self.slot_class))
+
+    def hold_assigned_games(self):
+        # Games already placed where a DFS starts (fixed assignments, or the moves of
+        # the node it starts from) are left out of the leader order: the search cannot
+        # swap them with the games it places itself.
+        state = self.state
+        self.held_games = frozenset(g for g in self.game_classes if state.is_assigned(g))
+
+    def symmetric_slots(self, game, slots):
+        # The slots among slots (in id order) that game still has to be tried in. Within a
+        # class of interchangeable games every schedule can be reordered so the slots
+        # never decrease with the game id, so the game must lie between its placed
+        # classmates. Two empty interchangeable slots can trade their contents in every
+        # completion, so only the first is kept; that is only done once every game
+        # of a class is placed, since reordering a class could move a placed game.
+        state = self.state
+        held = self.held_games
+        classmates = self.game_classes.get(game)
+        if classmates:
+            low, high = 0, len(self.problem.slots)
+            for other in classmates:
+                if other in held or not state.is_assigned(other):
+                    continue
+                if other < game:
+                    low = max(low, state.item_slot[other])
+                elif other > game:
+                    high = min(high, state.item_slot[other])
+            slots = [s for s in slots if low <= s <= high]
+        if any(not state.is_assigned(g) for g in self.game_classes if g not in held):
+            return slots
+        kept, seen = [], set()
+        slot_items, slot_class = state.slot_items, self.slot_class
+        for s in slots:
+            c = slot_class[s]
+            if c is not None and not slot_items[s]:
+                if c in seen:
+                    continue
+                seen.add(c)
+            kept.append(s)
+        return kept
+
+    def apply_fixed_assignments(self, fixed_assignments):
+        # Place, on a freshly reset state, every item that fixed_assignments (an assignment
+        # vector, None for items left to the search) assigns and the root solution does
+        # not. Returns the moves made; a placement that breaks a hard constraint raises
+        # ValueError.
+        state = self.state
+        mark = state.mark()
+        fixed_games = []
+        for item, slot in enumerate(fixed_assignments):
+            if slot is None:
+                continue
+            if state.is_assigned(item):
+                if state.item_slot[item] != slot:
+                    raise ValueError(f"Fixed assignment of {self.problem.items[item].id} conflicts with its partial assignment")
+                continue
+            if not self.check_assignment(item, slot, state):
+                raise ValueError(f"Fixed assignment of {self.problem.items[item].id} violates the hard constraints")
+            state.assign(item, slot)
+            if self.problem.item_is_game[item]:
+                fixed_games.append(item)
+        # The DFS only places associated practices together with their game, so do it
+        # here for the fixed games; if one does not fit, the search finds nothing
+        for game in fixed_games:
+            self.assign_associated_practices_greedily(game, state)
+        return state.moves_since(mark)
+
+    def lower_bound(self, pscore):
+        # Optimistic final score of the current state: its partial penalty plus the
+        # bounds' estimates for the items not yet assigned.
+        for bound in self.bounds:
+            pscore += bound.estimate(self.weights)
+        return pscore
+
     def canonical_solution_representation(self, solution):
-        # Represent the solution state as a sorted tuple of (slot_id, item_id) pairs.
+        # Represent the solution state as a sorted tuple of (slot, item) keys.
         # Useful for detecting already visited states and caching.
+        # Game and practice slots share ids, and so do games, practices and the special
+        # CMSA practices, so the keys carry the slot kind and the full item description.
         items_list = []
         for slot, assigns in solution.items():
+            slot_key = (isinstance(slot, GameSlot), slot.id)
             for it in assigns:
-                items_list.append((slot.id, it.id))
+                items_list.append((slot_key, (it.id, it.league, it.tier, it.division, getattr(it, 'practice_type', ''))))
         items_list.sort()
         return tuple(items_list)
 
-    def check_hard_constraints(self, solution):
+    def check_hard_constraints(self, solution, key=None):
         # Check if current solution state satisfies all hard constraints.
-        # Use a cache to avoid recomputing for the same state.
-        rep = self.canonical_solution_representation(solution)
-        if rep in self.hard_constraint_cache:
-            return self.hard_constraint_cache[rep]
-        result = satisfies_hard_constraints(solution, self.incompatibilities, self.unwanted, self.incompat_map)
+        # Use a cache to avoid recomputing for the same state; key identifies the solution
+        # (e.g. the search state's hash) and defaults to its canonical representation.
+        rep = self.canonical_solution_representation(solution) if key is None else key
+        cached = self.hard_constraint_cache.get(rep)
+        if cached is not None:
+            return cached
+        result = satisfies_hard_constraints(solution, self.incompatibilities, self.unwanted, self.incompat_map, self.overlap_index)
         self.hard_constraint_cache[rep] = result
         if not result:
             self.logger.debug("Hard constraints failed for solution state.")
         return result
 
+    def check_assignment(self, item, slot, state):
+        # Check whether placing item id in slot id keeps an already valid state valid.
+        # Only the constraints the new item can break are evaluated, so this must not be
+        # used on solutions that were never checked (use check_hard_constraints for those).
+        return check_compiled_assignment(self.problem, item, slot, state.slot_items)
+
+    def check_object_assignment(self, item, slot, solution):
+        # Same check for Game/Practice and slot objects on a {slot: [items]} solution.
+        if slot not in solution:
+            return False
+        return check_assignment_delta(item, slot, solution, self.unwanted, self.incompat_map, self.overlap_index)
+
     def get_matching_slot(self, slot, solution):
         # Find the slot in the solution dictionary that matches the given slot by ID, day, and time.
         return next((s for s in solution if s.id == slot.id and s.day == slot.day and abs(s.start_time - slot.start_time) < 1e-9), None)
@@ -141,7 +473,8 @@ class ANDTreeSearch:
     def get_hypothetical_solution(self, item, slot, solution):
         # Given an item and a slot, try to produce a new solution state with this item assigned to that slot.
         new_solution = {key: list(value) for key, value in solution.items()}
-        matching_slot = self.get_matching_slot(slot, new_solution)
+        # Prefer the slot object itself: a game slot and a practice slot can share id, day and time.
+        matching_slot = slot if slot in new_solution else self.get_matching_slot(slot, new_solution)
         if not matching_slot:
             return None
         new_solution[matching_slot].append(item)
@@ -149,8 +482,11 @@ class ANDTreeSearch:
 
     def is_solution_complete(self, solution):
         # Check if all games and all practices are assigned.
-        all_games_assigned = all(any(g in assigns for assigns in solution.values()) for g in self.games)
-        all_practices_assigned = all(any(p in assigns for assigns in solution.values()) for p in self.practices)
+        # Game and Practice hashes agree with their equality, so a set lookup gives the
+        # same answer as scanning every slot's list.
+        assigned = {it for assigns in solution.values() for it in assigns}
+        all_games_assigned = all(g in assigned for g in self.games)
+        all_practices_assigned = all(p in assigned for p in self.practices)
         return all_games_assigned and all_practices_assigned
 
     def count_assigned_games(self, solution):
@@ -163,283 +499,607 @@ class ANDTreeSearch:
         assigned_practices = {it for assigns in solution.values() for it in assigns if isinstance(it, Practice)}
         return len(assigned_practices)
 
-    def find_feasible_slots(self, item, solution, slots):
+    def find_feasible_slots(self, item, state, slots):
         # For a given item and candidate slots, find all feasible slots that don't violate hard constraints.
-        # Also compute partial penalty for each hypothetical assignment.
+        # Also compute partial penalty for each hypothetical assignment, placing the item in
+        # the state and taking it back again rather than copying the solution.
         feasible = []
         for slot in slots:
-            hypo = self.get_hypothetical_solution(item, slot, solution)
-            if hypo and self.check_hard_constraints(hypo):
-                pscore = partial_soft_penalty(hypo, self.weights, self.preferences, self.pairs)
-                feasible.append((slot, pscore, hypo))
+            if not self.check_assignment(item, slot, state):
+                continue
+            state.assign(item, slot)
+            pscore = self.penalties.partial_penalty()
+            state.undo()
+            feasible.append((slot, pscore))
         return feasible
 
-    def place_item_with_lowest_penalty(self, item, solution, candidate_slots):
+    def place_item_with_lowest_penalty(self, item, state, candidate_slots):
         # Assign the given item to the slot that yields the lowest partial penalty increase.
-        feasible = self.find_feasible_slots(item, solution, candidate_slots)
+        feasible = self.find_feasible_slots(item, state, candidate_slots)
         if not feasible:
-            return None
+            return False
         feasible.sort(key=lambda x: x[1])  # sort by partial penalty
-        best_hypo = feasible[0][2]
-        return best_hypo
-
-    def place_unassociated_practices_first(self, solution):
+        state.assign(item, feasible[0][0])
+        return True
+
+    def place_item_from_rcl(self, item, state, candidate_slots, rng, alpha):
+        # Randomised place_item_with_lowest_penalty for GRASP: choose at random among the
+        # feasible slots whose partial penalty is within alpha of the range above the
+        # lowest (alpha=0 is greedy, alpha=1 any feasible slot).
+        feasible = self.find_feasible_slots(item, state, candidate_slots)
+        if not feasible:
+            return False
+        low = min(pscore for _, pscore in feasible)
+        high = max(pscore for _, pscore in feasible)
+        restricted = [slot for slot, pscore in feasible if pscore <= low + alpha * (high - low)]
+        state.assign(item, rng.choice(restricted))
+        return True
+
+    def place_unassociated_practices_first(self, state):
         # Before assigning games, try to place all unassociated practices to avoid late issues.
-        current_solution = {k: list(v) for k,v in solution.items()}
-        assigned_practices = {it for assigns in current_solution.values() for it in assigns if isinstance(it, Practice)}
-        unassigned = [p for p in self.practices if p not in assigned_practices]
-
-        def is_associated(p):
-            # A practice is associated if it matches league/tier/division of some game
-            return any((p.league == g.league and p.tier == g.tier and p.division == g.division) for g in self.games)
-        unassociated_practices = [p for p in unassigned if not is_associated(p)]
+        # Returns True if all of them were placed; otherwise the state is left unchanged.
+        mark = state.mark()
+        # A practice is unassociated if it matches the league/tier/division of no game
+        unassociated_practices = [p for p in self.problem.unassociated_practices if not state.is_assigned(p)]
 
         for p in unassociated_practices:
             placed = False
-            for ps in self.practice_slots:
-                hypo = self.get_hypothetical_solution(p, ps, current_solution)
-                if hypo and self.check_hard_constraints(hypo):
-                    # Compute partial penalty to see if continuing is promising
-                    pscore = partial_soft_penalty(hypo, self.weights, self.preferences, self.pairs)
-                    if pscore >= progress_state["best_score"]:
-                        # This partial assignment cannot surpass current best
-                        # Prune and return None
-                        return None
-                    # If promising, update current_solution
-                    current_solution = hypo
-                    placed = True
-                    break
+            for ps in self.problem.practice_slot_ids():
+                if not self.check_assignment(p, ps, state):
+                    continue
+                state.assign(p, ps)
+                # Compute partial penalty to see if continuing is promising
+                pscore = self.penalties.partial_penalty()
+                if self.lower_bound(pscore) >= progress_state["best_score"]:
+                    if self.practice_fallback:
+                        state.undo()
+                        continue
+                    # This partial assignment cannot surpass current best
+                    # Prune and leave the state as it was
+                    state.undo_to(mark)
+                    return False
+                placed = True
+                break
             if not placed:
                 # Couldn't place this unassociated practice anywhere
-                return None
-            current_solution = hypo
-        return current_solution
+                state.undo_to(mark)
+                return False
+        return True
 
-    def assign_associated_practices_greedily(self, game, solution):
+    def assign_associated_practices_greedily(self, game, state):
         # Once we pick a game slot, we greedily assign associated practices that match the game’s league/tier/div.
-        associated_practices = [
-            p for p in self.practices
-            if p.league == game.league 
-            and p.tier == game.tier 
-            and p.division == game.division
-        ]
-        current_solution = {k: list(v) for k, v in solution.items()}
-
-        for practice in associated_practices:
-            if any(practice in assigns for assigns in current_solution.values()):
+        # Returns True if all of them were placed; otherwise the state is left unchanged.
+        mark = state.mark()
+
+        for practice in self.problem.associated_practices[game]:
+            if state.is_assigned(practice):
                 continue  # Already assigned this practice
             assigned = False
-            for ps in self.practice_slots:
-                hypo = self.get_hypothetical_solution(practice, ps, current_solution)
-                if hypo and self.check_hard_constraints(hypo):
-                    # Compute partial penalty after this placement
-                    pscore = partial_soft_penalty(hypo, self.weights, self.preferences, self.pairs)
-                    if pscore >= progress_state["best_score"]:
-                        # No chance to improve, prune
-                        return None
-                    current_solution = hypo
-                    assigned = True
-                    break
+            for ps in self.problem.practice_slot_ids():
+                if not self.check_assignment(practice, ps, state):
+                    continue
+                state.assign(practice, ps)
+                # Compute partial penalty after this placement
+                pscore = self.penalties.partial_penalty()
+                if self.lower_bound(pscore) >= progress_state["best_score"]:
+                    if self.practice_fallback:
+                        state.undo()
+                        continue
+                    # No chance to improve, prune
+                    state.undo_to(mark)
+                    return False
+                assigned = True
+                break
             if not assigned:
                 # Couldn't place associated practice
-                return None
-            current_solution = hypo
-        return current_solution
+                state.undo_to(mark)
+                return False
+        return True
 
-    def place_one_most_constrained_unassociated(self, solution):
+    def place_one_most_constrained_unassociated(self, state):
         # Try to place just one most constrained unassociated practice to guide the search initially.
-        current_solution = {k: list(v) for k,v in solution.items()}
-        assigned_practices = {it for assigns in current_solution.values() for it in assigns if isinstance(it, Practice)}
-        unassigned = [p for p in self.practices if p not in assigned_practices]
-
-        def is_associated(p):
-            return any((p.league == g.league and p.tier == g.tier and p.division == g.division) for g in self.games)
-        unassociated_practices = [p for p in unassigned if not is_associated(p)]
+        # Returns False if some unassociated practice is left that cannot be placed.
+        unassociated_practices = [p for p in self.problem.unassociated_practices if not state.is_assigned(p)]
 
         if not unassociated_practices:
             # No unassociated practice left, nothing to do
-            return current_solution
+            return True
 
         # Find the unassociated practice with the fewest feasible slots
         practice_feasibility = []
         for p in unassociated_practices:
-            feasible = self.find_feasible_slots(p, current_solution, self.practice_slots)
+            feasible = self.find_feasible_slots(p, state, self.problem.practice_slot_ids())
             if feasible:
                 practice_feasibility.append((p, len(feasible)))
 
         if not practice_feasibility:
             # No feasible slot for any unassociated practice
-            return None
+            return False
 
         practice_feasibility.sort(key=lambda x: x[1])
         most_constrained_practice = practice_feasibility[0][0]
 
         # Place it in the best slot available
-        new_sol = self.place_item_with_lowest_penalty(most_constrained_practice, current_solution, self.practice_slots)
-        return new_sol
+        return self.place_item_with_lowest_penalty(most_constrained_practice, state, self.problem.practice_slot_ids())
 
     def expand_node(self, node):
+        # Generate the children of node. The search state must currently be positioned at
+        # node; any practices placed here are recorded in node.moves, and each child only
+        # stores the moves that lead to it from node.
+        # Children are built up front in node.unexplored_children when the DFS has to
+        # sort them (penalty or bound order, or a seed shuffling ties) or a parallel
+        # driver may split them between processes. Otherwise node.pending_children
+        # generates them one at a time as the DFS reaches them, so the children of a
+        # subtree that finds a better schedule, or of a search that stops early, are
+        # never built.
         progress_state["expanded_nodes"] += 1
         self.logger.debug("Expanding node. Expanded count: %d", progress_state['expanded_nodes'])
+        state = self.state
 
         if node.is_pruned:
             return
 
-        if self.is_solution_complete(node.solution):
+        if state.is_complete():
             return
         
-        # Identify if we have a baseline solution
-        have_baseline = (self.best_solution is not None)
-
         # Identify unassigned games
-        unassigned_games = [g for g in self.games if not any(g in assigns for assigns in node.solution.values())]
+        unassigned_games = state.unassigned_game_ids()
 
         # Separate late division games from others
-        late_div_games = [g for g in unassigned_games if g.division > 90]
+        late_div_games = [g for g in unassigned_games if self.problem.item_division[g] > 90]
         if late_div_games:
             games_to_consider = late_div_games
         else:
-            new_sol = self.place_unassociated_practices_first(node.solution)
-            if new_sol is not None:
-                node.solution = new_sol
+            mark = state.mark()
+            if self.place_unassociated_practices_first(state):
+                node.moves.extend(state.moves_since(mark))
             games_to_consider = unassigned_games
 
-        # Most constrained game
-        best_game = None
-        best_valid_count = float('inf')
-        valid_assignments_by_game = {}
-        for g in games_to_consider:
-            valid_slots = []
-            for slot in self.game_slots:
-                hypo = self.get_hypothetical_solution(g, slot, node.solution)
-                if hypo and self.check_hard_constraints(hypo):
-                    valid_slots.append(slot)
-            valid_assignments_by_game[g] = valid_slots
-            if 0 < len(valid_slots) < best_valid_count:
-                best_valid_count = len(valid_slots)
-                best_game = g
-
-        if not best_game:
+        # A game or practice with no feasible slot left means no completion exists below here
+        if self.domains.has_dead_end():
             node.is_pruned = True
+            if self.backjumping:
+                node.conflict = self.explain_dead_end()
             return
 
-        # Just pick the first feasible slot for the best_game
-        for slot in valid_assignments_by_game[best_game]:
-            hypo = self.get_hypothetical_solution(best_game, slot, node.solution)
-            if hypo and self.check_hard_constraints(hypo):
-                assigned_sol = self.assign_associated_practices_greedily(best_game, hypo)
-                if assigned_sol and self.check_hard_constraints(assigned_sol):
-                    # After placing this game and its associated practices
-                    # If complete, check improvement
-                    if self.is_solution_complete(assigned_sol):
-                        score = soft_penalty(assigned_sol, self.weights, self.preferences, self.pairs)
-                        if score < progress_state["best_score"]:
-                            child = ANDTreeNode(solution=assigned_sol, parent=node)
-                            node.add_child(child)
-                    else:
-                        # Post-baseline pruning at node addition:
-                        if have_baseline:
-                            # Compute partial penalty
-                            pscore = partial_soft_penalty(assigned_sol, self.weights, self.preferences, self.pairs)
-                            if pscore >= progress_state["best_score"]:
-                                # Skip adding this child entirely
-                                continue
-                        # If we reach here, either no baseline or pscore < best_score
-                        child = ANDTreeNode(solution=assigned_sol, parent=node)
-                        node.add_child(child)
-
-                    # If we don't have a baseline solution yet, break after first successful child.
-                    # if not have_baseline:
-                    #     break
-
-
-    def depth_first_search(self, node, visited_states=None, max_depth=1000, current_depth=0):
-        # Perform a DFS from the given node, exploring children and pruning.
-        # We keep track of visited states to avoid cycles or repeated expansions.
-        if visited_states is None:
-            visited_states = set()
-
-        if node.is_pruned or current_depth >= max_depth:
+        best_game = self.select_game(games_to_consider)
+        if best_game is None:
+            node.is_pruned = True
             return
 
-        # Re-check baseline at each call
-        have_baseline = (self.best_solution is not None)
+        # Create a child for each feasible slot of the best_game
+        slots = sorted(self.domains.domain(best_game))
+        if self.symmetry_breaking:
+            slots = self.symmetric_slots(best_game, slots)
+        children = self.generate_children(node, best_game, slots)
+        if self.value_order == "slot" and self.rng is None and self.work_sharing is None:
+            node.pending_children = children
+        else:
+            for child in children:
+                node.add_child(child)
+
+    def generate_children(self, node, game, slots):
+        # Yield, in slot order, a child of node for every slot that game and its
+        # associated practices fit in and that can still beat the best score. Each is
+        # made on the state when it is asked for, which must then be positioned at node,
+        # and the state is back at node whenever a child is yielded.
+        state = self.state
+        for slot in slots:
+            mark = state.mark()
+            state.assign(game, slot)
+            child = None
+            if self.assign_associated_practices_greedily(game, state):
+                # After placing this game and its associated practices
+                # If complete, check improvement
+                pscore = self.penalties.partial_penalty()
+                if state.is_complete():
+                    score = self.penalties.penalty()
+                    if score < progress_state["best_score"]:
+                        child = ANDTreeNode(parent=node, moves=state.moves_since(mark), pscore=pscore, lower_bound=score)
+                else:
+                    # Post-baseline pruning at node addition:
+                    # either no baseline or the child's bound is below best_score
+                    bound = self.lower_bound(pscore)
+                    if self.best_solution is None or bound < progress_state["best_score"]:
+                        child = ANDTreeNode(parent=node, moves=state.moves_since(mark), pscore=pscore, lower_bound=bound)
+            state.undo_to(mark)
+            if child is not None:
+                yield child
+
+    def explain_dead_end(self):
+        # Trail positions of placements that together leave a dead-end item without a
+        # feasible slot, learned as a nogood. Each slot of the item's domain at the
+        # root is explained by the placements breaking one hard constraint there (see
+        # compiled_conflict); placements of the root solution never move, so they are
+        # left out.
+        state, domains = self.state, self.domains
+        item = domains.dead_end_item()
+        positions = {placed: index for index, (placed, _) in enumerate(state.trail)}
+        conflict = set()
+        for slot in domains.initial_domains[item]:
+            reason = compiled_conflict(self.problem, item, slot, state.slot_items)
+            if reason is None:
+                return None
+            conflict.update(positions[other] for other in reason if other in positions)
+        self.nogoods.add(state.trail[index] for index in conflict)
+        return conflict
+
+    def backjump(self, stack, conflict, mark):
+        # A child applied at trail position mark was a dead end caused by the moves at
+        # the conflict positions. If none of them is the child's own, no sibling can
+        # help either: pop every frame up to and including the one whose node made the
+        # deepest of them, so the DFS carries on with that node's next sibling.
+        culprit = max(conflict, default=-1)
+        if culprit >= mark:
+            return
+        state = self.state
+        while stack:
+            frame = stack.pop()
+            if frame.mark is None:
+                break
+            state.undo_to(frame.mark)
+            if frame.mark <= culprit:
+                break
+        self.logger.debug("Backjumped to trail position %d", culprit)
+
+    def select_game(self, games):
+        # The game to branch on among games (in id order), following game_order, or
+        # None if none of them has a feasible slot left.
+        if self.rng is not None:
+            games = list(games)
+            self.rng.shuffle(games)
+        best_game = None
+        best_key = None
+        for g in games:
+            valid_count = len(self.domains.domain(g))
+            if valid_count == 0:
+                continue
+            if self.game_order == "input":
+                return g
+            if self.game_order == "mrv":
+                # Most constrained game: smallest domain, first in game order on ties
+                key = valid_count
+            else:
+                degree = len(self.problem.item_incompatible[g]) + len(self.problem.associated_practices[g])
+                key = (-degree, valid_count)
+            if best_key is None or key < best_key:
+                best_key = key
+                best_game = g
+        return best_game
+
+    def order_children(self, children):
+        # Sort children in place so the one to explore first comes last (the DFS pops
+        # from the end); ties keep generation order unless a seed shuffles them.
+        if self.rng is not None:
+            self.rng.shuffle(children)
+        if self.value_order == "penalty":
+            children.sort(key=lambda c: c.pscore)
+        elif self.value_order == "bound":
+            children.sort(key=lambda c: c.lower_bound)
+        children.reverse()
+        return children
+
+    def state_key(self, state):
+        # Key identifying a solution state for the visited-state check: the Zobrist hash
+        # of its placements, maintained by the state on every move.
+        return state.hash
+
+    def visit_node(self, node, depth, mark, visited_states, max_depth):
+        # Visit a node the search state is positioned at: expand it, record it if it is a
+        # new best schedule, and return a SearchFrame over its children, or None if there
+        # is nothing below it to explore. mark is the trail position to undo to once the
+        # node is finished (None for the node the search started from).
+        if node.is_pruned or depth >= max_depth:
+            return None
 
-        state_items = []
-        for slot in sorted(node.solution.keys(), key=lambda s: (s.day, s.start_time, s.id)):
-            assigned_ids = tuple(sorted(it.id for it in node.solution[slot]))
-            state_items.append((slot.id, assigned_ids))
-        current_state = tuple(state_items)
+        state = self.state
+        current_state = self.state_key(state)
 
         if current_state in visited_states:
             self.logger.debug("State already visited, skipping.")
-            return
+            return None
         visited_states.add(current_state)
 
         # Always re-check best_score before expanding
         self.expand_node(node)
 
         # Update progress stats
-        assigned_games_count = self.count_assigned_games(node.solution)
-        assigned_practices_count = self.count_assigned_practices(node.solution)
-        progress_state["assigned_games"] = assigned_games_count
-        progress_state["assigned_practices"] = assigned_practices_count
+        progress_state["assigned_games"] = state.assigned_game_count()
+        progress_state["assigned_practices"] = state.assigned_practice_count()
 
         # If we found a complete solution here, check if it's better than current best
-        if self.is_solution_complete(node.solution):
-            score = soft_penalty(node.solution, self.weights, self.preferences, self.pairs)
+        if state.is_complete():
+            score = self.penalties.penalty()
             if score < progress_state["best_score"]:
-                progress_state["best_score"] = score
-                self.best_score = score
-                self.best_solution = node.solution
+                # Only now is the in-place state copied
+                self.record_best(state.snapshot(), score)
                 self.logger.debug("Found new baseline solution with score=%s", score)
-                self.save_solution_to_file("final_solution.txt")
+                if self.local_search is not None:
+                    self.improve_best(state.assignment_vector())
                 # Now prune children given we have a baseline
                 # If children exist, prune them here:
                 self.prune_children_based_on_baseline(node)
 
+        # The frame takes the children over, so finished subtrees are not kept alive by
+        # the node
+        pending, node.pending_children = node.pending_children, None
+        if pending is not None:
+            return SearchFrame(node, mark, depth, [], pending)
         if not node.unexplored_children:
-            return
+            return None
 
-        # Now that we might have a baseline, prune children again
-        # This ensures that even if baseline was found in a sibling, we prune here too.
-        children = node.unexplored_children
-        children_scores = []
-        for c in children:
-            pscore = partial_soft_penalty(c.solution, self.weights, self.preferences, self.pairs)
-            children_scores.append((c, pscore))
-        children_scores.sort(key=lambda x: x[1])
+        # Children already carry the partial penalty and lower bound computed when they
+        # were generated; explore the most promising first
+        children = self.order_children(list(node.unexplored_children))
+        node.unexplored_children = []
+        return SearchFrame(node, mark, depth, children)
+
+    def depth_first_search(self, node, visited_states=None, max_depth=1000, current_depth=0, node_limit=None):
+        # Perform a DFS from the given node, exploring children and pruning.
+        # The search state must be positioned at node; children are applied to it in place
+        # and undone again once their subtree has been explored. The search runs on an
+        # explicit stack of SearchFrames rather than recursing once per level.
+        # We keep track of visited states to avoid cycles or repeated expansions.
+        # Returns None when the search is finished, or a SearchCursor to resume from if it
+        # stopped early because node_limit nodes were expanded or pause() was called.
+        if visited_states is None:
+            visited_states = BoundedCache(self.visited_cache_size)
+        self.pause_requested = False
+        self.hold_assigned_games()
+        # The root is reused from run to run; a dead end it had under other fixed
+        # assignments must not stop this one
+        node.is_pruned = False
+        node.conflict = None
+        stack = []
+        frame = self.visit_node(node, current_depth, None, visited_states, max_depth)
+        if frame is not None:
+            stack.append(frame)
+        return self.run_stack(stack, visited_states, max_depth, node_limit)
+
+    def run_stack(self, stack, visited_states, max_depth, node_limit=None, split_depth=None, subproblems=None):
+        # Drive the iterative DFS until the stack is empty or the search is paused.
+        # With split_depth, children at that depth are not explored but appended to
+        # subproblems as (moves from the start of the trail, depth, pscore, lower_bound).
+        state = self.state
+        while stack:
+            if self.incumbent is not None:
+                self.sync_incumbent()
+            if self.work_sharing is not None:
+                self.work_sharing.maybe_donate(self, stack)
+            stop_reason = self.check_stop(node_limit)
+            if stop_reason is not None:
+                self.stop_reason = stop_reason
+                return self.make_cursor(stack, visited_states, max_depth)
+
+            frame = stack[-1]
+            child = frame.next_child()
+            if child is None:
+                # All children explored: step back to the parent
+                stack.pop()
+                if frame.mark is not None:
+                    state.undo_to(frame.mark)
+                continue
 
-        pruned_children = []
-        for (child, pscore) in children_scores:
             # This re-check ensures we always use the updated best_score
-            if pscore >= progress_state["best_score"]:
+            if child.lower_bound >= progress_state["best_score"]:
                 child.is_pruned = True
-                pruned_children.append(child)
-                self.logger.debug("Pruned child with pscore=%s > best_score=%s", pscore, progress_state["best_score"])
-            elif not self.check_hard_constraints(child.solution):
+                self.logger.debug("Pruned child with bound=%s > best_score=%s", child.lower_bound, progress_state["best_score"])
+                continue
+            mark = state.mark()
+            state.apply(child.moves)
+            if self.check_constraints and not self.check_hard_constraints(state.solution, state.hash):
                 child.is_pruned = True
-                pruned_children.append(child)
                 self.logger.debug("Pruned child due to hard constraints.")
+                state.undo_to(mark)
+                continue
+            if self.nogoods is not None:
+                nogood = self.nogoods.find(child.moves, state.item_slot)
+                if nogood is not None:
+                    self.logger.debug("Pruned child matching a learned nogood.")
+                    positions = {item: index for index, (item, _) in enumerate(state.trail)}
+                    state.undo_to(mark)
+                    self.backjump(stack, {positions[item] for item, _ in nogood}, mark)
+                    continue
+            if split_depth is not None and frame.depth + 1 >= split_depth:
+                subproblems.append((state.moves_since(0), frame.depth + 1, child.pscore, child.lower_bound))
+                state.undo_to(mark)
+                continue
+            child_frame = self.visit_node(child, frame.depth + 1, mark, visited_states, max_depth)
+            if child_frame is None:
+                state.undo_to(mark)
+                if child.conflict is not None:
+                    self.backjump(stack, child.conflict, mark)
             else:
-                self.depth_first_search(child, visited_states, max_depth, current_depth+1)
-                node.explored_children.append(child)
-
-        for pc in pruned_children:
-            if pc in node.unexplored_children:
-                node.unexplored_children.remove(pc)
-
-        # Update parent references if any
-        if node.parent:
-            node.parent.explored_children.append(node)
+                stack.append(child_frame)
+        return None
+
+    def split_root(self, split_depth, visited_states=None, max_depth=1000):
+        # Search the first split_depth levels below the root exactly as the DFS would and
+        # return the open nodes at that depth as subproblems (see run_stack), in the
+        # order the DFS would explore them. Complete schedules found above the split
+        # depth become the best solution as usual.
+        if visited_states is None:
+            visited_states = BoundedCache(self.visited_cache_size)
+        self.reset_state()
+        self.root.moves = []
+        self.root.is_pruned = False
+        subproblems = []
+        frame = self.visit_node(self.root, 0, None, visited_states, max_depth)
+        if frame is not None:
+            self.run_stack([frame], visited_states, max_depth, split_depth=split_depth, subproblems=subproblems)
+        return subproblems
+
+    def search_subproblem(self, subproblem, max_depth=1000):
+        # Run the DFS below one subproblem from split_root, on a fresh state and with
+        # its own visited states. Returns the assignment vector of the best schedule
+        # found below it (None if none beat the best score) and that schedule's score.
+        moves, depth, pscore, lower_bound = subproblem
+        self.best_solution = None
+        if self.incumbent is not None:
+            self.sync_incumbent()
+        if lower_bound >= progress_state["best_score"]:
+            return None, float('inf')
+        self.reset_state()
+        self.state.apply(moves)
+        node = ANDTreeNode(moves=moves, pscore=pscore, lower_bound=lower_bound)
+        self.depth_first_search(node, BoundedCache(self.visited_cache_size), max_depth, depth)
+        if self.best_solution is None:
+            return None, float('inf')
+        return self.problem.vector_from_solution(self.best_solution), self.best_score
+
+    def record_best(self, solution, score):
+        # Make solution the best schedule: it tightens pruning from here on, is shared
+        # with other processes and written to solution_file.
+        progress_state["best_score"] = score
+        self.best_score = score
+        self.best_solution = solution
+        self.publish_incumbent(score)
+        if self.solution_file:
+            self.save_solution_to_file(self.solution_file)
+
+    def score_vector(self, vector):
+        # Penalty under this search's weights of the complete schedule given as an
+        # assignment vector of the same problem (e.g. one found under other weights).
+        # The state is left reset at the root.
+        self.reset_state()
+        state = self.state
+        state.apply([(i, s) for i, s in enumerate(vector) if s is not None and not state.is_assigned(i)])
+        score = self.penalties.penalty()
+        self.reset_state()
+        return score
+
+    def improve_best(self, vector):
+        # Anneal the complete schedule given as an assignment vector; every improvement
+        # becomes the best schedule straight away, so the DFS prunes with it.
+        def on_improvement(better, score):
+            if score < progress_state["best_score"]:
+                self.record_best(self.problem.solution_from_vector(better), score)
+                self.logger.debug("Local search improved the best solution to score=%s", score)
+        self.local_search.run(vector, self.local_search_iterations, on_improvement)
+
+    def frame_vector(self, stack, index, moves=()):
+        # Assignment vector of the state at stack[index], with moves applied on top.
+        # The state itself is positioned at the top of the stack, so the moves made by
+        # the frames above index are left out.
+        vector = list(self.state.item_slot)
+        if index + 1 < len(stack):
+            for item, _ in self.state.trail[stack[index + 1].mark:]:
+                vector[item] = None
+        for item, slot in moves:
+            vector[item] = slot
+        return tuple(vector)
+
+    def search_from_vector(self, vector, depth, pscore, lower_bound, visited_states, max_depth=1000):
+        # Run the DFS below the node whose assignment vector is given, on a fresh state.
+        # The vector must extend the root solution; the node is checked against the best
+        # score first, like any child the DFS pops.
+        if self.incumbent is not None:
+            self.sync_incumbent()
+        if lower_bound >= progress_state["best_score"]:
+            return
+        self.reset_state()
+        state = self.state
+        root_vector = self.problem.vector_from_solution(self.root.solution)
+        moves = [(item, slot) for item, slot in enumerate(vector) if slot is not None and root_vector[item] is None]
+        state.apply(moves)
+        if self.check_constraints and not self.check_hard_constraints(state.solution, state.hash):
+            return
+        node = ANDTreeNode(moves=moves, pscore=pscore, lower_bound=lower_bound)
+        self.depth_first_search(node, visited_states, max_depth, depth)
+
+    def sync_incumbent(self):
+        # Adopt a better score found by another process sharing self.incumbent.
+        shared = self.incumbent.value
+        if shared < progress_state["best_score"]:
+            progress_state["best_score"] = shared
+
+    def publish_incumbent(self, score):
+        # Share a new best score with the other processes, if any.
+        if self.incumbent is None:
+            return
+        with self.incumbent.get_lock():
+            if score < self.incumbent.value:
+                self.incumbent.value = score
+
+    def pause(self, reason="paused"):
+        # Ask a running depth_first_search/resume_search to stop at the next node and
+        # return a SearchCursor. Safe to call from another thread.
+        self.pause_reason = reason
+        self.pause_requested = True
+
+    def check_stop(self, node_limit=None):
+        # Why the DFS has to stop before its next step, or None to carry on.
+        if self.pause_requested:
+            return self.pause_reason
+        if node_limit is not None and progress_state["expanded_nodes"] >= node_limit:
+            return "node_limit"
+        if self.deadline is not None and time.time() >= self.deadline:
+            return "time_limit"
+        if self.target_score is not None and progress_state["best_score"] <= self.target_score:
+            return "target_score"
+        return None
+
+    def make_cursor(self, stack, visited_states, max_depth):
+        # Capture the stack as a SearchCursor and step the state back to the node the
+        # search started from. Children still pending are generated first, from the top
+        # frame down, each with the state stepped back to its frame's node.
+        state = self.state
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index].pending is not None:
+                if index + 1 < len(stack):
+                    state.undo_to(stack[index + 1].mark)
+                stack[index].generate_pending()
+        frames = []
+        for frame in stack:
+            children = [(c.moves, c.pscore, c.lower_bound) for c in frame.children]
+            frames.append((frame.node.moves, frame.node.pscore, frame.node.lower_bound, frame.depth, children))
+        if len(stack) > 1:
+            state.undo_to(stack[1].mark)
+        best_vector = None
+        if self.best_solution is not None:
+            best_vector = self.problem.vector_from_solution(self.best_solution)
+        return SearchCursor(frames, visited_states, max_depth, best_vector,
+                            progress_state["best_score"], progress_state["expanded_nodes"])
+
+    def resume_search(self, cursor, node_limit=None):
+        # Continue a search from a SearchCursor made by this or an identical ANDTreeSearch
+        # (e.g. after unpickling it in a new process). Returns a new cursor if the search
+        # stops early again, otherwise None.
+        self.pause_requested = False
+        progress_state["best_score"] = cursor.best_score
+        progress_state["expanded_nodes"] = cursor.expanded_nodes
+        self.best_score = cursor.best_score
+        self.best_solution = None
+        if cursor.best_vector is not None:
+            self.best_solution = self.problem.solution_from_vector(cursor.best_vector)
+
+        # Replay the path of the paused search onto a fresh state
+        self.reset_state()
+        state = self.state
+        stack = []
+        parent = None
+        for index, (moves, pscore, lower_bound, depth, children) in enumerate(cursor.frames):
+            mark = None if index == 0 else state.mark()
+            state.apply(moves)
+            if index == 0:
+                self.hold_assigned_games()
+                node = self.root
+                node.moves = list(moves)
+            else:
+                node = ANDTreeNode(parent=parent, moves=moves, pscore=pscore, lower_bound=lower_bound)
+            frame_children = [ANDTreeNode(parent=node, moves=m, pscore=p, lower_bound=b) for m, p, b in children]
+            stack.append(SearchFrame(node, mark, depth, frame_children))
+            parent = node
+        return self.run_stack(stack, cursor.visited_states, cursor.max_depth, node_limit)
 
     def prune_children_based_on_baseline(self, node):
         if not node.unexplored_children:
             return
         pruned_children = []
         for c in node.unexplored_children:
-            pscore = partial_soft_penalty(c.solution, self.weights, self.preferences, self.pairs)
-            if pscore >= progress_state["best_score"] or not self.check_hard_constraints(c.solution):
+            # Every child was built from hard-constraint checked placements, so only
+            # its lower bound needs comparing against the new baseline.
+            if c.lower_bound >= progress_state["best_score"]:
                 c.is_pruned = True
                 pruned_children.append(c)
         for pc in pruned_children:
@@ -447,22 +1107,57 @@ class ANDTreeSearch:
                 node.unexplored_children.remove(pc)
 
 
-    def run_search(self):
+    def run_search(self, time_limit=None, node_limit=None, target_score=None, with_status=False, fixed_assignments=None,
+                   incumbent=None):
+        # Search for the best schedule and return (best_solution, best_score). The search
+        # stops early, keeping the best schedule found so far, once time_limit seconds
+        # have passed, node_limit nodes have been expanded, or a schedule scoring
+        # target_score or less has been found. With with_status=True a SearchStatus
+        # saying how it ended is returned as a third value. fixed_assignments is an
+        # assignment vector of placements to hold on top of the partial assignments.
+        # incumbent is a (vector, score) pair found elsewhere (e.g. by grasp.run_grasp)
+        # that starts out as the best schedule, so the DFS prunes from its first node.
         # Initialize best_score to infinity and start the progress monitor.
         progress_state["best_score"] = float('inf')
+        start = time.time()
+        start_nodes = progress_state["expanded_nodes"]
         
         monitor_thread = threading.Thread(target=progress_monitor, daemon=True)
         monitor_thread.start()
-        visited_states = set()
+        visited_states = BoundedCache(self.visited_cache_size)
         
-        # Start DFS from the root node
-        self.depth_first_search(self.root, visited_states)
+        if incumbent is not None:
+            vector, score = incumbent
+            self.record_best(self.problem.solution_from_vector(vector), score)
+            self.logger.debug("Search seeded with score=%s", score)
+
+        # Start DFS from the root node, exploring a single schedule in place
+        self.reset_state()
+        self.root.moves = self.apply_fixed_assignments(fixed_assignments) if fixed_assignments else []
+        root_bound = self.lower_bound(self.penalties.partial_penalty())
+        self.deadline = None if time_limit is None else start + time_limit
+        self.target_score = target_score
+        self.stop_reason = None
+        if node_limit is not None:
+            node_limit += start_nodes
+        try:
+            cursor = self.depth_first_search(self.root, visited_states, node_limit=node_limit)
+        finally:
+            self.deadline = None
+            self.target_score = None
+        self.logger.debug("Visited-state cache: %s", visited_states.stats())
+        self.logger.debug("Hard-constraint cache: %s", self.hard_constraint_cache.stats())
+        status = SearchStatus("completed" if cursor is None else self.stop_reason, progress_state["best_score"],
+                              root_bound, progress_state["expanded_nodes"] - start_nodes, time.time() - start, cursor)
+        self.logger.debug("Search ended: %s", status)
         
         # Mark search as done and join monitor thread
         progress_state["done"] = True
         monitor_thread.join()
         
         self.save_solution_to_file("final_solution_2.txt")
+        if with_status:
+            return self.best_solution, progress_state["best_score"], status
         return self.best_solution, progress_state["best_score"]
 
     def save_solution_to_file(self, filename):
@@ -564,141 +1259,3 @@ def setup_logger(log_filename="debug.log"):
     listener.start()
 
     return logger, listener
-
-def run_for_file(file_path, weights = [0, 0, 0, 1, 1, 1, 0, 5]):
-    # Utility function to run the search for a given file and weights.
-    parsed_data = read_input(file_path)
-
-    logger, listener = setup_logger("debug.log")
-
-    search = ANDTreeSearch(
-        games=parsed_data.games,
-        practices=parsed_data.practices,
-        game_slots=parsed_data.game_slots,
-        practice_slots=parsed_data.practice_slots,
-        incompatibilities=parsed_data.incompatibilities,
-        partial_assignments=parsed_data.partial_assignments,
-        weights=weights,
-        preferences=parsed_data.preferences,
-        pairs=parsed_data.pair,
-        unwanted=parsed_data.unwanted,
-        logger=logger
-    )
-
-    best_solution, best_score = search.run_search()
-    listener.stop()
-    return best_solution, best_score
-
-if __name__ == "__main__":
-
-    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "inputs", "large_2.txt")
-    cProfile.run('run_for_file(file_path, [1, 1, 1, 1, 1, 1, 1, 1])', sort='time')
-    # Loop through hc1.txt to hc12.txt.
-    # script_dir = os.path.dirname(os.path.abspath(__file__))
-    # for i in range(1, 13):
-    #     filename = f"hc{i}.txt"
-    #     file_path = os.path.join(script_dir, "..", "inputs", filename)
-    #     print(f"Running {filename}...")
-    #     best_solution, best_score = run_for_file(file_path)
-
-
-    #     # All other hc files should produce no valid solution found.
-    #     if best_solution is not None:
-    #         print(f"ERROR: {filename} found a solution when it shouldn't have.")
-    #     else:
-    #         print(f"{filename} correctly returned no valid solution found.")
-
-    # # Define the test cases based on your known reference outputs and parameter settings
-    # test_cases = [
-    #     {
-    #         "filename": "pairing.txt",
-    #         "weights": [0, 0, 1, 0, 0, 0, 11, 0],  # [w_minfilled, w_pref, w_pair, w_secdiff, pengamemin, penpracticemin, pennotpaired, pensection]
-    #         "expected_eval": 55,
-    #     },
-    #     {
-    #         "filename": "minnumber.txt",
-    #         "weights": [1, 0, 0, 0, 100, 100, 0, 10],
-    #         "expected_eval": 0,
-    #     },
-    #     {
-    #         "filename": "parallelpen.txt",
-    #         "weights": [0, 0, 0, 1, 1, 1, 0, 5],
-    #         "expected_eval": 5,
-    #     },
-    #     {
-    #         "filename": "prefexamp.txt",
-    #         "weights": [0, 1, 0, 0, 100, 100, 0, 100],
-    #         "expected_eval": 30,  # Insert the expected value if known
-    #     }
-    # ]
-
-    # # Assuming your files are in a directory ../inputs relative to this script
-    # script_dir = os.path.dirname(os.path.abspath(__file__))
-
-    # for test_case in test_cases:
-    #     filename = test_case["filename"]
-    #     weights = test_case["weights"]
-    #     file_path = os.path.join(script_dir, "..", "inputs", filename)
-
-    #     print(f"Running {filename} with weights={weights}...")
-    #     best_solution, best_score = run_for_file(file_path, weights)
-
-    #     if best_solution is None:
-    #         print(f"No valid solution found for {filename}.")
-    #     else:
-    #         print(f"Solution found for {filename} with Eval-value: {best_score}")
-
-    #         # If you have an expected_eval value, compare it
-    #         expected_eval = test_case.get("expected_eval")
-    #         if expected_eval is not None:
-    #             if best_score == expected_eval:
-    #                 print(f"{filename}: Eval value matches expected result ({expected_eval}).")
-    #             else:
-    #                 print(f"{filename}: Eval value ({best_score}) does NOT match expected ({expected_eval}).")
-
-    #     print()  # Blank line for readability
-    
-    
-    # import argparse
-    # parser = argparse.ArgumentParser(description="Process and calculate scores based on weights and penalties.")
-    # parser.add_argument("filename", type=str, help="The file to process.")
-    # parser.add_argument("wminfilled", type=float, help="Weight for minimal filled sections.")
-    # parser.add_argument("wpref", type=float, help="Weight for preferred options.")
-    # parser.add_argument("wpair", type=float, help="Weight for paired options.")
-    # parser.add_argument("wsecdiff", type=float, help="Weight for section differences.")
-    # parser.add_argument("pengamemin", type=float, help="Penalty for engagement minimum not met.")
-    # parser.add_argument("penpracticemin", type=float, help="Penalty for practice minimum not met.")
-    # parser.add_argument("pennotpaired", type=float, help="Penalty for not paired sections.")
-    # parser.add_argument("pensection", type=float, help="Penalty for an entire section issue.")
-
-    # # Parse arguments
-    # args = parser.parse_args()
-
-    # file_path = args.filename
-    # Wminfilled = args.wminfilled
-    # Wpref = args.wpref
-    # Wpair = args.wpair
-    # Wsecdif = args.wsecdiff
-    # PENgamemin = args.pengamemin
-    # PENpracticemin = args.penpracticemin
-    # PENnotpaired = args.pennotpaired
-    # PENsection = args.pensection
-
-    # weights =  [Wminfilled, Wpref, Wpair, Wsecdif, PENgamemin, PENpracticemin, PENnotpaired, PENsection]
-
-    # parsed_data = read_input(file_path)
-
-    # search = ANDTreeSearch(
-    #     games=parsed_data.games,
-    #     practices=parsed_data.practices,
-    #     game_slots=parsed_data.game_slots,
-    #     practice_slots=parsed_data.practice_slots,
-    #     incompatibilities=parsed_data.incompatibilities,
-    #     partial_assignments=parsed_data.partial_assignments,
-    #     weights=weights,
-    #     preferences=parsed_data.preferences,
-    #     pairs=parsed_data.pair,
-    #     unwanted=parsed_data.unwanted,
-    # )
-
-    # search.run_search()
\ No newline at end of file
@@ -0,0 +1,189 @@
+import os
+import time
+import queue
+import logging
+import multiprocessing
+
+from and_tree import ANDTreeSearch, progress_state
+from compiled_problem import compile_problem
+from problem_cache import load_problem
+
+# Nodes each weight vector's search expands per round of solve_many, between exchanges
+# of the schedules found so far
+ROUND_NODES = 2000
+
+class WeightSweep:
+    """
+    The searches one process runs for solve_many: one ANDTreeSearch per weight vector,
+    all built on the same compiled problem. Each search runs a round at a time and
+    keeps its paused DFS as a SearchCursor in between.
+    """
+    def __init__(self, arguments, weights_list):
+        self.arguments = arguments
+        self.weights_list = weights_list
+        self.searches = {}
+        self.cursors = {}
+
+    def search(self, k):
+        # The search for weights_list[k], built on first use.
+        search = self.searches.get(k)
+        if search is None:
+            search = ANDTreeSearch(logger=logging.getLogger("SchedulerBatch"), weights=self.weights_list[k],
+                                   **self.arguments)
+            search.solution_file = None
+            self.searches[k] = search
+        return search
+
+    def run_round(self, k, seeds, node_budget, deadline=None):
+        # Run the search for weights_list[k] for node_budget more nodes, or until the
+        # time.time() deadline. It first adopts the best of seeds (assignment vectors of
+        # complete schedules, found under other weights) rescored under its own
+        # weights, if that beats its best so far. Returns (finished, best vector, best
+        # score, nodes expanded), with (None, inf) while it has no schedule.
+        search = self.search(k)
+        cursor = self.cursors.get(k)
+        best_vector, best_score = (None, float('inf')) if cursor is None else (cursor.best_vector, cursor.best_score)
+        for vector in seeds:
+            score = search.score_vector(vector)
+            if score < best_score:
+                best_vector, best_score = vector, score
+
+        search.deadline = deadline
+        try:
+            if cursor is None:
+                progress_state["expanded_nodes"] = 0
+                progress_state["best_score"] = float('inf')
+                search.best_solution = None
+                search.reset_state()
+                search.root.moves = []
+                if best_vector is not None:
+                    search.record_best(search.problem.solution_from_vector(best_vector), best_score)
+                start = 0
+                cursor = search.depth_first_search(search.root, node_limit=node_budget)
+            else:
+                cursor.best_vector, cursor.best_score = best_vector, best_score
+                start = cursor.expanded_nodes
+                cursor = search.resume_search(cursor, node_limit=start + node_budget)
+        finally:
+            search.deadline = None
+        self.cursors[k] = cursor
+
+        vector = None
+        if search.best_solution is not None:
+            vector = search.problem.vector_from_solution(search.best_solution)
+        score = progress_state["best_score"] if vector is not None else float('inf')
+        return cursor is None, vector, score, progress_state["expanded_nodes"] - start
+
+def _sweep_worker(arguments, weights_list, tasks, results):
+    # Runs in a worker process: for every round sent on tasks as (seeds per weight
+    # index, node budget, deadline), run those searches and report each on results as
+    # (k, finished, vector, score, nodes). None ends the worker.
+    sweep = WeightSweep(arguments, weights_list)
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        round_seeds, node_budget, deadline = task
+        for k, seeds in round_seeds:
+            results.put((k,) + sweep.run_round(k, seeds, node_budget, deadline))
+
+def solve_many(problem, weights_list, processes=None, time_limit=None, round_nodes=ROUND_NODES, **options):
+    """
+    Solve one input under each weight vector in weights_list, parsing and compiling it
+    once. problem is an input file name (loaded through problem_cache.load_problem) or
+    the ParsedData read_input returned for it; options are ANDTreeSearch keyword
+    options.
+
+    The searches run round_nodes nodes at a time. After each round, every search still
+    running is offered the schedules the others improved on, rescored under its own
+    weights, and adopts the best as its incumbent if that beats its own, so it prunes
+    with it from the next round on. The weight vectors are shared out over processes
+    worker processes (one per weight vector up to the CPU count by default, 1 to run
+    here). time_limit (seconds) stops every search with the best schedule found so far.
+
+    Returns [(best_solution, best_score)], one per weight vector in order, with
+    (None, inf) where no schedule was found.
+    """
+    if isinstance(problem, (str, os.PathLike)):
+        parsed_data, compiled = load_problem(problem)
+    else:
+        parsed_data, compiled = problem, compile_problem(problem)
+    arguments = dict(
+        games=parsed_data.games,
+        practices=parsed_data.practices,
+        game_slots=parsed_data.game_slots,
+        practice_slots=parsed_data.practice_slots,
+        incompatibilities=parsed_data.incompatibilities,
+        preferences=parsed_data.preferences,
+        pairs=parsed_data.pair,
+        partial_assignments=parsed_data.partial_assignments,
+        unwanted=parsed_data.unwanted,
+        problem=compiled,
+        **options
+    )
+    weights_list = [list(weights) for weights in weights_list]
+    if processes is None:
+        processes = min(len(weights_list), os.cpu_count() or 1)
+    processes = max(1, min(processes, len(weights_list)))
+    deadline = None if time_limit is None else time.time() + time_limit
+
+    best = [(None, float('inf'))] * len(weights_list)
+    running = set(range(len(weights_list)))
+    # Schedules that improved in the last round, offered to the other searches
+    improved = {}
+
+    def round_seeds(owned):
+        return [(k, [vector for j, vector in improved.items() if j != k]) for k in sorted(owned & running)]
+
+    def collect(k, finished, vector, score, nodes):
+        if vector is not None and score < best[k][1]:
+            best[k] = (vector, score)
+            new_improved[k] = vector
+        if finished:
+            running.discard(k)
+
+    if processes == 1:
+        sweep = WeightSweep(arguments, weights_list)
+        while running and (deadline is None or time.time() < deadline):
+            new_improved = {}
+            for k, seeds in round_seeds(set(running)):
+                collect(k, *sweep.run_round(k, seeds, round_nodes, deadline))
+            improved = new_improved
+    else:
+        owners = [set(range(w, len(weights_list), processes)) for w in range(processes)]
+        task_queues = [multiprocessing.Queue() for _ in owners]
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_sweep_worker, daemon=True,
+                                    args=(arguments, weights_list, tasks, results))
+            for tasks in task_queues
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while running and (deadline is None or time.time() < deadline):
+                new_improved = {}
+                expected = 0
+                for owned, tasks in zip(owners, task_queues):
+                    seeds = round_seeds(owned)
+                    if seeds:
+                        tasks.put((seeds, round_nodes, deadline))
+                        expected += len(seeds)
+                for _ in range(expected):
+                    while True:
+                        try:
+                            result = results.get(timeout=0.1)
+                            break
+                        except queue.Empty:
+                            if not all(worker.is_alive() for worker in workers):
+                                raise RuntimeError("A search worker exited without reporting its result")
+                    collect(*result)
+                improved = new_improved
+        finally:
+            for tasks in task_queues:
+                tasks.put(None)
+            for worker in workers:
+                worker.join()
+
+    return [(None, score) if vector is None else (compiled.solution_from_vector(vector), score)
+            for vector, score in best]
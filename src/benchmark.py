@@ -0,0 +1,209 @@
+import os
+import time
+import random
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+import and_tree
+from and_tree import ANDTreeSearch
+import baseline_input_parser
+from input_parser import read_input
+from parallel_search import run_parallel_search, run_work_stealing_search
+
+GAME_SLOT_TIMES = [("MO", t) for t in ["8:00", "9:00", "10:00", "17:00", "18:00", "19:00"]] + \
+                  [("TU", t) for t in ["8:00", "9:30", "11:00", "14:00", "18:00", "19:30"]]
+PRACTICE_SLOT_TIMES = [("MO", t) for t in ["8:00", "9:00", "18:00"]] + \
+                      [("TU", t) for t in ["10:00", "18:00", "19:00"]] + \
+                      [("FR", t) for t in ["8:00", "18:00"]]
+TIERS = ["U13T3", "U15T1", "U17T1", "O18", "U10T2", "U11T1"]
+
+def generate_problem(seed, n_games=5, n_game_slots=5, n_practice_slots=5):
+    # Build the text of a random input file in the format read_input expects.
+    # Every section is populated, so the instances exercise all hard and soft constraints.
+    rng = random.Random(seed)
+    game_slots = rng.sample(GAME_SLOT_TIMES, min(n_game_slots, len(GAME_SLOT_TIMES)))
+    practice_slots = rng.sample(PRACTICE_SLOT_TIMES, min(n_practice_slots, len(PRACTICE_SLOT_TIMES)))
+
+    games = set()
+    while len(games) < n_games:
+        league = rng.choice(["CMSA", "CUSA"])
+        division = rng.choice([1, 2, 3, 91] if rng.random() < 0.2 else [1, 2, 3])
+        games.add(f"{league} {rng.choice(TIERS)} DIV {division:02}")
+    games = sorted(games)
+    practices = []
+    for game in games:
+        for k in range(rng.randint(0, 2)):
+            practices.append(f"{game} {rng.choice(['PRC', 'OPN'])} {k + 1:02}")
+    if rng.random() < 0.5:
+        practices.append(f"CMSA {rng.choice(TIERS)} PRC 0{rng.randint(1, 3)}")
+    items = games + practices
+
+    def random_slot(item):
+        return rng.choice(game_slots if item in games else practice_slots)
+
+    incompatible = [f"{a}, {b}" for a, b in (rng.sample(items, 2) for _ in range(rng.randint(0, 3)))]
+    unwanted = []
+    for _ in range(rng.randint(0, 3)):
+        item = rng.choice(items)
+        day, time_str = random_slot(item)
+        unwanted.append(f"{item}, {day}, {time_str}")
+    preferences = []
+    for _ in range(rng.randint(1, 5)):
+        item = rng.choice(items)
+        day, time_str = random_slot(item)
+        preferences.append(f"{day}, {time_str}, {item}, {rng.randint(1, 10)}")
+    pairs = [f"{a}, {b}" for a, b in (rng.sample(items, 2) for _ in range(rng.randint(0, 3)))]
+
+    lines = ["Name:", f"Synthetic{seed}", "", "Game slots:"]
+    lines += [f"{day}, {time_str}, {rng.randint(3, 4)}, {rng.randint(0, 2)}" for day, time_str in game_slots]
+    lines += ["", "Practice slots:"]
+    lines += [f"{day}, {time_str}, {rng.randint(3, 5)}, {rng.randint(0, 2)}" for day, time_str in practice_slots]
+    lines += ["", "Games:"] + games + ["", "Practices:"] + practices
+    lines += ["", "Not compatible:"] + incompatible + ["", "Unwanted:"] + unwanted
+    lines += ["", "Preferences:"] + preferences + ["", "Pair:"] + pairs + ["", "Partial assignments:", ""]
+    return "\n".join(lines) + "\n"
+
+def build_search(parsed_data, weights, **kwargs):
+    return ANDTreeSearch(
+        games=parsed_data.games,
+        practices=parsed_data.practices,
+        game_slots=parsed_data.game_slots,
+        practice_slots=parsed_data.practice_slots,
+        incompatibilities=parsed_data.incompatibilities,
+        partial_assignments=parsed_data.partial_assignments,
+        weights=weights,
+        preferences=parsed_data.preferences,
+        pairs=parsed_data.pair,
+        unwanted=parsed_data.unwanted,
+        logger=logging.getLogger("SchedulerBenchmark"),
+        **kwargs
+    )
+
+def run_search(parsed_data, weights, **kwargs):
+    # Run one search quietly and return (best_score, expanded_nodes, seconds).
+    search = build_search(parsed_data, weights, **kwargs)
+    and_tree.progress_state["expanded_nodes"] = 0
+    start = time.time()
+    _, best_score = search.run_search()
+    return best_score, and_tree.progress_state["expanded_nodes"], time.time() - start
+
+def generate_league_file(seed, n_games):
+    # Text of a large input in the read_input format: n_games games with a practice each
+    # and about ten constraint lines per game, for timing the parser rather than the search.
+    rng = random.Random(seed)
+    games = [f"{rng.choice(['CMSA', 'CUSA'])} {rng.choice(TIERS)} DIV {d:02}" for d in range(1, n_games + 1)]
+    practices = [f"{game} {rng.choice(['PRC', 'OPN'])} 01" for game in games]
+    items = games + practices
+
+    def slot_of(item):
+        day, time_str = rng.choice(GAME_SLOT_TIMES if item in game_set else PRACTICE_SLOT_TIMES)
+        return f"{day}, {time_str}"
+
+    game_set = set(games)
+    lines = ["Name:", f"League{seed}", "", "Game slots:"]
+    lines += [f"{day}, {time_str}, {n_games}, 0" for day, time_str in GAME_SLOT_TIMES]
+    lines += ["", "Practice slots:"] + [f"{day}, {time_str}, {n_games}, 0" for day, time_str in PRACTICE_SLOT_TIMES]
+    lines += ["", "Games:"] + games + ["", "Practices:"] + practices
+    lines += ["", "Not compatible:"] + [", ".join(rng.sample(items, 2)) for _ in range(3 * n_games)]
+    lines += ["", "Unwanted:"] + [f"{item}, {slot_of(item)}" for item in rng.choices(items, k=2 * n_games)]
+    lines += ["", "Preferences:"] + [f"{slot_of(item)}, {item}, {rng.randint(1, 10)}" for item in rng.choices(items, k=3 * n_games)]
+    lines += ["", "Pair:"] + [", ".join(rng.sample(items, 2)) for _ in range(2 * n_games)]
+    lines += ["", "Partial assignments:", ""]
+    return "\n".join(lines) + "\n"
+
+def measure_parse(read, file_name):
+    # (seconds, peak traced bytes) of read(file_name). The peak is traced in a second
+    # run: tracemalloc slows the parse down several times over.
+    start = time.time()
+    read(file_name)
+    elapsed = time.time() - start
+    tracemalloc.start()
+    read(file_name)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def benchmark_parser(seeds, weights):
+    # Parse time and peak traced memory of the original parser (baseline_input_parser)
+    # and of read_input on league files growing by 500 games per seed (weights are
+    # unused).
+    print(f"{'instance':<12}{'games':>8}{'size':>10}{'base time':>12}{'base peak':>12}"
+          f"{'time':>10}{'peak memory':>14}")
+    for seed in seeds:
+        n_games = 500 * (seed + 1)
+        with open("league.txt", "w") as f:
+            f.write(generate_league_file(seed, n_games))
+        size = os.path.getsize("league.txt") / 2 ** 20
+        base_elapsed, base_peak = measure_parse(baseline_input_parser.read_input, "league.txt")
+        elapsed, peak = measure_parse(read_input, "league.txt")
+        print(f"{'seed ' + str(seed):<12}{n_games:>8}{size:>8.2f}MB{base_elapsed:>11.2f}s{base_peak / 2 ** 20:>10.1f}MB"
+              f"{elapsed:>9.2f}s{peak / 2 ** 20:>12.1f}MB")
+
+def benchmark_bounds(seeds, weights):
+    # Compare branch-and-bound pruning with the default lower bounds against pruning on
+    # the partial penalty alone (bounds=()).
+    print(f"{'instance':<12}{'score':>8}{'nodes (no bounds)':>20}{'nodes (bounds)':>17}{'time (no bounds)':>19}{'time (bounds)':>16}")
+    totals = [0, 0, 0.0, 0.0]
+    for seed in seeds:
+        with open("instance.txt", "w") as f:
+            f.write(generate_problem(seed))
+        parsed_data = read_input("instance.txt")
+        score_off, nodes_off, time_off = run_search(parsed_data, weights, bounds=())
+        score_on, nodes_on, time_on = run_search(parsed_data, weights)
+        score = f"{score_on}" if score_on == score_off else f"{score_on}/{score_off}"
+        print(f"{'seed ' + str(seed):<12}{score:>8}{nodes_off:>20}{nodes_on:>17}{time_off:>18.2f}s{time_on:>15.2f}s")
+        for i, value in enumerate((nodes_off, nodes_on, time_off, time_on)):
+            totals[i] += value
+    print(f"{'total':<12}{'':>8}{totals[0]:>20}{totals[1]:>17}{totals[2]:>18.2f}s{totals[3]:>15.2f}s")
+
+# Worker counts benchmark_parallel runs each parallel search with
+PARALLEL_PROCESSES = sorted({2, 4, os.cpu_count() or 1})
+
+def benchmark_parallel(seeds, weights):
+    # Wall time and speedup over the sequential search of run_parallel_search (static
+    # split below the root) and run_work_stealing_search, for each count in
+    # PARALLEL_PROCESSES, on instances taking seconds to search to completion. Speedup
+    # only means something with as many free cores as worker processes.
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'instance':<12}{'score':>8}{'nodes':>8}{'sequential':>12}{'processes':>11}{'split':>16}{'stealing':>16}")
+    for seed in seeds:
+        with open("instance.txt", "w") as f:
+            f.write(generate_problem(seed, n_games=8, n_game_slots=6, n_practice_slots=6))
+        parsed_data = read_input("instance.txt")
+        score, nodes, sequential = run_search(parsed_data, weights)
+        for processes in PARALLEL_PROCESSES:
+            row = f"{'seed ' + str(seed):<12}{score:>8}{nodes:>8}{sequential:>11.2f}s{processes:>11}"
+            for run in (run_parallel_search, run_work_stealing_search):
+                start = time.time()
+                _, parallel_score = run(build_search(parsed_data, weights), processes)
+                elapsed = time.time() - start
+                mark = "" if parallel_score == score else "!"
+                row += f"{elapsed:>8.2f}s{sequential / elapsed:>6.2f}x{mark:1}"
+            print(row)
+
+BENCHMARKS = {
+    "bounds": benchmark_bounds,
+    "parallel": benchmark_parallel,
+    "parser": benchmark_parser,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the scheduler on synthetic instances.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS), help="Which benchmark to run.")
+    parser.add_argument("--seeds", type=int, default=20, help="Number of synthetic instances.")
+    parser.add_argument("--weights", type=float, nargs=8, default=[1, 1, 1, 1, 1, 1, 1, 1],
+                        help="Wminfilled Wpref Wpair Wsecdif PENgamemin PENpracticemin PENnotpaired PENsection")
+    args = parser.parse_args()
+
+    # The search prints progress every second and writes its best schedule to the
+    # working directory, so run quietly from a scratch directory.
+    and_tree.progress_monitor = lambda interval=1.0: None
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            BENCHMARKS[args.benchmark](range(args.seeds), args.weights)
+        finally:
+            os.chdir(cwd)
@@ -0,0 +1,117 @@
+import heapq
+import itertools
+import threading
+
+import and_tree
+from and_tree import ANDTreeNode, progress_state
+from search_cache import BoundedCache
+
+def best_first_search(search, beam_width=None, max_frontier=100000, node_limit=None, max_depth=1000):
+    """
+    Explore search's tree best-first instead of depth-first. Nodes come from the same
+    visit_node/expand_node as the DFS, so the two can be compared directly; only the
+    order differs. Open nodes wait in a priority queue ordered by lower bound (partial
+    penalty plus the remaining-cost bounds), deeper nodes first on ties so complete
+    schedules turn up early.
+
+    With beam_width the tree is explored level by level instead, keeping only the
+    beam_width open nodes with the lowest bounds at each depth. Without it, the queue is
+    cut back to its best max_frontier // 2 nodes whenever it grows past max_frontier.
+    Either way nodes may be dropped, so the search is a heuristic unless it finishes
+    with nothing dropped.
+
+    Open nodes are kept as their moves from the root, and the search state is rebuilt
+    from them when a node is taken from the queue. Stops like the DFS on node_limit
+    or a pause(); returns the number of open nodes it dropped.
+    """
+    state = search.state
+    visited_states = BoundedCache(search.visited_cache_size)
+    search.pause_requested = False
+    counter = itertools.count()
+    dropped = 0
+
+    def expand(node, depth, frontier):
+        # Visit the node the state is at and add its children to frontier as
+        # (lower_bound, -depth, tie, path, pscore).
+        frame = search.visit_node(node, depth, None, visited_states, max_depth)
+        if frame is None:
+            return
+        frame.generate_pending()
+        path = tuple(state.moves_since(0))
+        for child in frame.children:
+            frontier.append((child.lower_bound, -(depth + 1), next(counter), path + tuple(child.moves), child.pscore))
+
+    def visit(entry, frontier):
+        # Position the state at an open node, check it and expand it into frontier.
+        lower_bound, neg_depth, _, path, pscore = entry
+        state.undo_to(0)
+        state.apply(path)
+        if search.check_constraints and not search.check_hard_constraints(state.solution, state.hash):
+            return
+        node = ANDTreeNode(moves=[], pscore=pscore, lower_bound=lower_bound)
+        expand(node, -neg_depth, frontier)
+
+    frontier = []
+    search.root.moves = list(state.moves_since(0))
+    expand(search.root, 0, frontier)
+    try:
+        if beam_width is not None:
+            level = frontier
+            while level:
+                level.sort()
+                if len(level) > beam_width:
+                    dropped += len(level) - beam_width
+                    del level[beam_width:]
+                next_level = []
+                for entry in level:
+                    if search.check_stop(node_limit) is not None:
+                        return dropped
+                    if entry[0] >= progress_state["best_score"]:
+                        # Sorted by bound, so the rest of the level is pruned too
+                        break
+                    visit(entry, next_level)
+                level = next_level
+        else:
+            heapq.heapify(frontier)
+            while frontier:
+                if search.check_stop(node_limit) is not None:
+                    return dropped
+                entry = heapq.heappop(frontier)
+                if entry[0] >= progress_state["best_score"]:
+                    # Every open node's bound is at least this one's: nothing left can improve
+                    frontier = []
+                    break
+                children = []
+                visit(entry, children)
+                for child in children:
+                    heapq.heappush(frontier, child)
+                if len(frontier) > max_frontier:
+                    kept = heapq.nsmallest(max_frontier // 2, frontier)
+                    dropped += len(frontier) - len(kept)
+                    frontier = kept
+                    heapq.heapify(frontier)
+    finally:
+        state.undo_to(0)
+    return dropped
+
+def run_best_first(search, beam_width=None, max_frontier=100000, node_limit=None):
+    """
+    run_search counterpart for best_first_search: reports progress, writes the best
+    schedule to final_solution_2.txt and returns (best_solution, best_score).
+    """
+    progress_state["best_score"] = float('inf')
+    progress_state["done"] = False
+    monitor_thread = threading.Thread(target=and_tree.progress_monitor, daemon=True)
+    monitor_thread.start()
+
+    search.reset_state()
+    if node_limit is not None:
+        node_limit += progress_state["expanded_nodes"]
+    dropped = best_first_search(search, beam_width, max_frontier, node_limit)
+    search.logger.debug("Best-first search dropped %d open nodes", dropped)
+
+    progress_state["done"] = True
+    monitor_thread.join()
+
+    search.save_solution_to_file("final_solution_2.txt")
+    return search.best_solution, progress_state["best_score"]
@@ -0,0 +1,274 @@
+import random
+
+from models import Game, GameSlot
+from hard_constraints import slots_overlap, compiled_slot_allowed, CMSA_SPECIAL_PRACTICE_TIERS, CMSA_SPECIAL_GAME_TIERS, NON_OVERLAPPING_TIERS
+
+# Fixed seed for the Zobrist keys, so state hashes agree between processes and runs.
+ZOBRIST_SEED = 0x5EED
+
+# Small integer codes for the CMSA special tiers, shared by a game tier and its special practice tier.
+CMSA_SPECIAL_GROUPS = {tier: group for group, tier in enumerate(sorted(CMSA_SPECIAL_GAME_TIERS), start=1)}
+
+# Attributes a CompiledProblem stores as int lists, and how to read each back from one:
+# bool for flags, int for values, None for ragged lists of ids (see to_arrays).
+ARRAY_FIELDS = {
+    "item_is_game": bool, "item_key": int, "item_division": int, "item_late": bool,
+    "item_u15": bool, "item_overlap_tier": bool, "item_cmsa_game": int, "item_cmsa_practice": int,
+    "slot_is_game": bool, "slot_max": int, "slot_min": int, "slot_no_games": bool,
+    "slot_before_18": bool, "slot_cmsa_tuesday": bool, "unassociated_practices": int,
+}
+RAGGED_FIELDS = {
+    "item_incompatible": frozenset, "item_unwanted_slots": frozenset,
+    "slot_overlaps": tuple, "associated_practices": list,
+}
+
+def _int_list(values):
+    # memoryviews and arrays convert in one call, much faster than iterating them
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+def _identity(item):
+    # What two equal items always have in common (see Game/Practice __eq__)
+    return isinstance(item, Game), item.id, item.league, item.tier
+
+def _slot_time(day, start_time):
+    # Key matching a day and start time to the slots there, to the minute
+    return day, round(start_time * 60)
+
+class CompiledProblem:
+    """
+    Integer-indexed view of a scheduling problem, built once after input_parser.read_input.
+
+    Items are numbered games first, then practices, and slots game slots first, then practice
+    slots, in input order. Everything the hard constraints need is stored in flat lists indexed
+    by those ids, so the search can work on ints instead of hashing Game/Practice objects
+    (whose Practice.__eq__ carries the wildcard-division rule). The original objects are kept
+    in `items` and `slots` to map results back for output.
+    """
+    __slots__ = (
+        "items", "slots", "n_games", "n_game_slots", "item_index", "slot_index",
+        "item_is_game", "item_key", "item_division", "item_late", "item_u15", "item_overlap_tier",
+        "item_cmsa_game", "item_cmsa_practice", "item_incompatible", "item_unwanted_slots",
+        "slot_is_game", "slot_max", "slot_min", "slot_no_games", "slot_before_18",
+        "slot_cmsa_tuesday", "slot_overlaps", "associated_practices", "unassociated_practices",
+        "_zobrist",
+    )
+
+    def __init__(self, games, practices, game_slots, practice_slots, incompatibilities, unwanted):
+        self.items = list(games) + list(practices)
+        self.slots = list(game_slots) + list(practice_slots)
+        self.n_games = len(games)
+        self.n_game_slots = len(game_slots)
+        # Only used at the boundaries, to translate objects from the parser into ids
+        self.item_index = {}
+        for i, item in enumerate(self.items):
+            self.item_index.setdefault(item, i)
+        self.slot_index = {slot: s for s, slot in enumerate(self.slots)}
+
+        # Per-item attributes
+        keys = {}
+        self.item_is_game = [i < self.n_games for i in range(len(self.items))]
+        self.item_key = [keys.setdefault((it.league, it.tier, it.division), len(keys)) for it in self.items]
+        self.item_division = [it.division for it in self.items]
+        self.item_late = [90 <= it.division < 100 for it in self.items]
+        self.item_u15 = [isinstance(it, Game) and any(t in it.tier for t in NON_OVERLAPPING_TIERS) for it in self.items]
+        self.item_overlap_tier = [getattr(it, 'has_overlapping_tier', False) for it in self.items]
+        self.item_cmsa_game = [
+            CMSA_SPECIAL_GROUPS[CMSA_SPECIAL_PRACTICE_TIERS[it.tier]]
+            if it.league == "CMSA" and it.tier in CMSA_SPECIAL_PRACTICE_TIERS else 0
+            for it in self.items
+        ]
+        self.item_cmsa_practice = [
+            CMSA_SPECIAL_GROUPS[it.tier] if it.league == "CMSA" and it.tier in CMSA_SPECIAL_GAME_TIERS else 0
+            for it in self.items
+        ]
+
+        # Incompatibilities, resolved with the same object equality the object-based checks use.
+        # Equal items always share kind, id, league and tier, so each reference is only
+        # compared with the few items under that key rather than with every item.
+        incompat_map = {}
+        for inc in incompatibilities:
+            i1, i2 = inc.game_or_practice1, inc.game_or_practice2
+            incompat_map.setdefault(i1, set()).add(i2)
+            incompat_map.setdefault(i2, set()).add(i1)
+        by_identity = {}
+        for i, item in enumerate(self.items):
+            by_identity.setdefault(_identity(item), []).append(i)
+        self.item_incompatible = []
+        for item in self.items:
+            incs = incompat_map.get(item)
+            if incs is None:
+                self.item_incompatible.append(frozenset())
+            else:
+                self.item_incompatible.append(frozenset(
+                    j for other in incs for j in by_identity.get(_identity(other), ()) if self.items[j] == other
+                ))
+
+        # Per-slot attributes
+        self.slot_is_game = [isinstance(slot, GameSlot) for slot in self.slots]
+        self.slot_max = [slot.gamemax if is_game else slot.practicemax for slot, is_game in zip(self.slots, self.slot_is_game)]
+        self.slot_min = [slot.gamemin if is_game else slot.practicemin for slot, is_game in zip(self.slots, self.slot_is_game)]
+        self.slot_no_games = [is_game and slot.day == "TR" and 11.0 <= slot.start_time < 12.5
+                              for slot, is_game in zip(self.slots, self.slot_is_game)]
+        self.slot_before_18 = [slot.start_time < 18.0 for slot in self.slots]
+        self.slot_cmsa_tuesday = [slot.day == "TU" and 18.0 <= slot.start_time < 19.0 for slot in self.slots]
+        overlaps = [[] for _ in self.slots]
+        for gs in range(self.n_game_slots):
+            for ps in range(self.n_game_slots, len(self.slots)):
+                if slots_overlap(self.slots[gs], self.slots[ps]):
+                    overlaps[gs].append(ps)
+                    overlaps[ps].append(gs)
+        self.slot_overlaps = [tuple(others) for others in overlaps]
+
+        # Unwanted placements; like satisfies_hard_constraints, items are matched by id
+        items_by_id, slots_by_time = {}, {}
+        for i, item in enumerate(self.items):
+            items_by_id.setdefault(item.id, []).append(i)
+        for s, slot in enumerate(self.slots):
+            slots_by_time.setdefault(_slot_time(slot.day, slot.start_time), []).append(s)
+        self.item_unwanted_slots = [set() for _ in self.items]
+        for unwant in unwanted:
+            slots = slots_by_time.get(_slot_time(unwant.slot_day, unwant.slot_time), ())
+            for i in items_by_id.get(unwant.game_or_practice.id, ()):
+                self.item_unwanted_slots[i].update(slots)
+        self.item_unwanted_slots = [frozenset(slots) for slots in self.item_unwanted_slots]
+
+        # Practices sharing league/tier/division with a game are placed together with it
+        game_keys = set(self.item_key[:self.n_games])
+        practices_by_key = {}
+        for p in self.practice_ids():
+            practices_by_key.setdefault(self.item_key[p], []).append(p)
+        self.associated_practices = [list(practices_by_key.get(self.item_key[g], ())) for g in self.game_ids()]
+        self.unassociated_practices = [p for p in self.practice_ids() if self.item_key[p] not in game_keys]
+        self._zobrist = {}
+
+    def to_arrays(self):
+        # Everything derived from the input as flat int lists, for problem_cache: one list
+        # per ARRAY_FIELDS attribute, and per RAGGED_FIELDS attribute a pair (values,
+        # offsets) in which entry k is values[offsets[k]:offsets[k + 1]], ids sorted.
+        arrays = {name: [int(v) for v in getattr(self, name)] for name in ARRAY_FIELDS}
+        for name in RAGGED_FIELDS:
+            values, offsets = [], [0]
+            for entry in getattr(self, name):
+                values.extend(sorted(entry))
+                offsets.append(len(values))
+            arrays[name] = (values, offsets)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, games, practices, game_slots, practice_slots, arrays):
+        # Rebuild the problem to_arrays came from around the parsed objects, without
+        # resolving the constraints again. arrays holds sequences of ints, such as the
+        # memoryviews problem_cache casts from a cache file's bytes.
+        problem = cls.__new__(cls)
+        problem.items = list(games) + list(practices)
+        problem.slots = list(game_slots) + list(practice_slots)
+        problem.n_games = len(games)
+        problem.n_game_slots = len(game_slots)
+        problem.item_index = {}
+        for i, item in enumerate(problem.items):
+            problem.item_index.setdefault(item, i)
+        problem.slot_index = {slot: s for s, slot in enumerate(problem.slots)}
+        for name, kind in ARRAY_FIELDS.items():
+            values = _int_list(arrays[name])
+            setattr(problem, name, values if kind is int else [kind(v) for v in values])
+        for name, kind in RAGGED_FIELDS.items():
+            values, offsets = map(_int_list, arrays[name])
+            setattr(problem, name, [kind(values[a:b]) for a, b in zip(offsets, offsets[1:])])
+        problem._zobrist = {}
+        return problem
+
+    def candidate_slots(self, item):
+        # Slots of the item's kind that no single-item rule (unwanted, late division,
+        # TR 11:00 games, CMSA Tuesday practices; see compiled_slot_allowed) rules out,
+        # whatever else is scheduled.
+        if self.item_is_game[item]:
+            slots = self.game_slot_ids()
+        else:
+            slots = self.practice_slot_ids()
+        return [s for s in slots if compiled_slot_allowed(self, item, s)]
+
+    def interchangeable_items(self, signature=None):
+        # Classes (id lists, two items or more, of one kind) of items that can trade slots
+        # in any schedule without changing whether it is valid: same flags, unwanted
+        # slots and incompatibilities, and no same-division rule telling them apart. An
+        # item sharing its league/tier/division with no other item is only bound by that
+        # rule to itself, so such items match across divisions. signature(item) adds
+        # whatever else must agree, such as the soft constraints.
+        key_size = {}
+        for key in self.item_key:
+            key_size[key] = key_size.get(key, 0) + 1
+        classes = {}
+        for i in range(len(self.items)):
+            key = self.item_key[i] if key_size[self.item_key[i]] > 1 else None
+            sig = (self.item_is_game[i], key, self.item_late[i], self.item_u15[i], self.item_overlap_tier[i],
+                   self.item_cmsa_game[i], self.item_cmsa_practice[i], self.item_unwanted_slots[i],
+                   self.item_incompatible[i], None if signature is None else signature(i))
+            classes.setdefault(sig, []).append(i)
+        return [ids for ids in classes.values() if len(ids) > 1]
+
+    def interchangeable_slots(self, signature=None):
+        # Classes (id lists, two slots or more, of one kind) of slots whose contents can be
+        # exchanged in any schedule without changing whether it is valid: same capacity,
+        # flags and overlapping slots, and unwanted by the same items. signature(slot)
+        # adds whatever else must agree.
+        unwanted_by = [[] for _ in self.slots]
+        for i, slots in enumerate(self.item_unwanted_slots):
+            for s in slots:
+                unwanted_by[s].append(i)
+        classes = {}
+        for s in range(len(self.slots)):
+            sig = (self.slot_is_game[s], self.slot_max[s], self.slot_min[s], self.slot_no_games[s],
+                   self.slot_before_18[s], self.slot_cmsa_tuesday[s], frozenset(self.slot_overlaps[s]),
+                   tuple(unwanted_by[s]), None if signature is None else signature(s))
+            classes.setdefault(sig, []).append(s)
+        return [ids for ids in classes.values() if len(ids) > 1]
+
+    def zobrist_keys(self, bits=64):
+        # Random key per (item, slot) placement, as keys[item][slot]. A schedule's hash is
+        # the XOR of the keys of its placements, so it can be updated move by move.
+        if bits not in self._zobrist:
+            rng = random.Random(ZOBRIST_SEED)
+            n_slots = len(self.slots)
+            self._zobrist[bits] = [[rng.getrandbits(bits) for _ in range(n_slots)] for _ in self.items]
+        return self._zobrist[bits]
+
+    def vector_from_solution(self, solution):
+        # Compact form of a {slot: [items]} solution: the slot id of every item id,
+        # or None for unassigned items.
+        vector = [None] * len(self.items)
+        for slot, items in solution.items():
+            s = self.slot_index[slot]
+            for item in items:
+                vector[self.item_index[item]] = s
+        return tuple(vector)
+
+    def solution_from_vector(self, vector):
+        # Rebuild the {slot: [items]} solution with the original objects, in input order.
+        solution = {slot: [] for slot in self.slots}
+        for i, s in enumerate(vector):
+            if s is not None:
+                solution[self.slots[s]].append(self.items[i])
+        return solution
+
+    def game_ids(self):
+        return range(self.n_games)
+
+    def practice_ids(self):
+        return range(self.n_games, len(self.items))
+
+    def game_slot_ids(self):
+        return range(self.n_game_slots)
+
+    def practice_slot_ids(self):
+        return range(self.n_game_slots, len(self.slots))
+
+def compile_problem(parsed_data):
+    # Compile the output of input_parser.read_input into a CompiledProblem.
+    return CompiledProblem(
+        games=parsed_data.games,
+        practices=parsed_data.practices,
+        game_slots=parsed_data.game_slots,
+        practice_slots=parsed_data.practice_slots,
+        incompatibilities=parsed_data.incompatibilities,
+        unwanted=parsed_data.unwanted,
+    )
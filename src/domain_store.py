@@ -0,0 +1,98 @@
+from hard_constraints import check_compiled_assignment
+
+class DomainStore:
+    """
+    Feasible slots of every unassigned item, kept up to date as a ScheduleState changes.
+
+    An item's domain is exactly the set of slots where check_compiled_assignment would
+    accept it. Adding an item to slot s can only affect placements in s and in the slots
+    overlapping s, and can only make them infeasible, so propagation rechecks those slots
+    for the unassigned items and removes what no longer fits. That covers full slots,
+    incompatible items, same-division overlaps and the CMSA special tiers.
+
+    The store observes the state. Propagation is lazy: moves are queued and processed
+    the next time a domain is read, so the trial placements the search makes and undoes
+    straight away cost nothing. The removals made while catching up are recorded on the
+    newest move and restored when that move is undone.
+    """
+    def __init__(self, problem):
+        self.problem = problem
+        self.state = None
+
+    def attach(self, state):
+        # Compute every unassigned item's domain on the (valid) state and follow its moves.
+        problem = self.problem
+        self.state = state
+        self.domains = [set() for _ in problem.items]
+        for item in range(len(problem.items)):
+            if state.is_assigned(item):
+                continue
+            slots = problem.game_slot_ids() if problem.item_is_game[item] else problem.practice_slot_ids()
+            self.domains[item] = {s for s in slots if check_compiled_assignment(problem, item, s, state.slot_items)}
+        # The domains on the attached state, which the search's dead ends are explained against
+        self.initial_domains = [frozenset(domain) for domain in self.domains]
+        # One [slot, removed, since] frame per move on the state's trail. removed is None
+        # until the frame has been propagated; since is where that propagation started.
+        self.frames = []
+        self.synced = 0
+        state.observers.append(self)
+
+    def on_assign(self, item, slot):
+        self.frames.append([slot, None, None])
+
+    def on_unassign(self, item, slot):
+        _, removed, since = self.frames.pop()
+        if removed is not None:
+            domains = self.domains
+            for other, s in removed:
+                domains[other].add(s)
+            # The moves this frame propagated for are pending again
+            self.synced = since
+        elif self.synced > len(self.frames):
+            self.synced = len(self.frames)
+
+    def sync(self):
+        # Propagate every queued move.
+        frames = self.frames
+        if self.synced == len(frames):
+            return
+        problem, state = self.problem, self.state
+        overlaps = problem.slot_overlaps
+        affected = set()
+        for slot, _, _ in frames[self.synced:]:
+            affected.add(slot)
+            affected.update(overlaps[slot])
+
+        removed = []
+        slot_items = state.slot_items
+        domains = self.domains
+        for item in state.unassigned_games | state.unassigned_practices:
+            domain = domains[item]
+            for s in affected:
+                if s in domain and not check_compiled_assignment(problem, item, s, slot_items):
+                    domain.discard(s)
+                    removed.append((item, s))
+        frames[-1][1] = removed
+        frames[-1][2] = self.synced
+        self.synced = len(frames)
+
+    def domain(self, item):
+        # Slots the unassigned item can currently be placed in.
+        self.sync()
+        return self.domains[item]
+
+    def has_dead_end(self):
+        # True if some unassigned item has no feasible slot left, so the state can never
+        # be completed.
+        return self.dead_end_item() is not None
+
+    def dead_end_item(self):
+        # An unassigned item with no feasible slot left (games first), or None.
+        self.sync()
+        domains = self.domains
+        state = self.state
+        for items in (state.unassigned_games, state.unassigned_practices):
+            for i in items:
+                if not domains[i]:
+                    return i
+        return None
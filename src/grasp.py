@@ -0,0 +1,95 @@
+import random
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from and_tree import ANDTreeSearch
+from parallel_search import search_arguments
+
+# Share of the penalty range above the cheapest slot that the restricted candidate
+# list admits
+DEFAULT_ALPHA = 0.3
+
+# The search each worker process builds once, in _init_worker
+_worker_search = None
+
+def construct(search, rng, alpha=DEFAULT_ALPHA, cutoff=float('inf')):
+    # Build one complete schedule on search's state in the order expand_node uses:
+    # unassociated practices, then games (late divisions first, fewest feasible slots
+    # next, random on ties) each followed by its associated practices. Every item goes
+    # to a slot drawn from its restricted candidate list (see place_item_from_rcl).
+    # Returns (vector, score), or None if an item did not fit or the partial schedule
+    # can no longer beat cutoff.
+    search.reset_state()
+    state, problem, domains = search.state, search.problem, search.domains
+    practice_slots = problem.practice_slot_ids()
+
+    for p in problem.unassociated_practices:
+        if not state.is_assigned(p) and not search.place_item_from_rcl(p, state, practice_slots, rng, alpha):
+            return None
+    while state.unassigned_games:
+        if domains.has_dead_end():
+            return None
+        games = state.unassigned_game_ids()
+        games = [g for g in games if problem.item_division[g] > 90] or games
+        sizes = {g: len(domains.domain(g)) for g in games}
+        fewest = min(sizes.values())
+        game = rng.choice([g for g in games if sizes[g] == fewest])
+        if not search.place_item_from_rcl(game, state, sorted(domains.domain(game)), rng, alpha):
+            return None
+        for p in problem.associated_practices[game]:
+            if not state.is_assigned(p) and not search.place_item_from_rcl(p, state, practice_slots, rng, alpha):
+                return None
+        if search.lower_bound(search.penalties.partial_penalty()) >= cutoff:
+            return None
+    # Practices of games placed by the partial assignments
+    for p in sorted(state.unassigned_practices):
+        if not search.place_item_from_rcl(p, state, practice_slots, rng, alpha):
+            return None
+    return state.assignment_vector(), search.penalties.penalty()
+
+def grasp(search, restarts, alpha=DEFAULT_ALPHA, seed=0):
+    # Run construct restarts times and return the best (vector, score), or (None, inf)
+    # if no restart completed a schedule. The search state is left at the root.
+    rng = random.Random(seed)
+    best_vector, best_score = None, float('inf')
+    for _ in range(restarts):
+        result = construct(search, rng, alpha, best_score)
+        if result is not None and result[1] < best_score:
+            best_vector, best_score = result
+    search.reset_state()
+    return best_vector, best_score
+
+def _init_worker(arguments):
+    global _worker_search
+    _worker_search = ANDTreeSearch(logger=logging.getLogger("SchedulerWorker"), **arguments)
+    _worker_search.solution_file = None
+
+def _grasp_chunk(task):
+    restarts, alpha, seed = task
+    return grasp(_worker_search, restarts, alpha, seed)
+
+def run_grasp(search, restarts, processes=1, alpha=DEFAULT_ALPHA, seed=0):
+    """
+    GRASP: restarts randomised greedy constructions, shared out over processes worker
+    processes (each with its own seed) when processes > 1. Returns the best
+    (assignment vector, score), or (None, inf) if none completed a schedule.
+    """
+    if processes <= 1:
+        return grasp(search, restarts, alpha, seed)
+    arguments = search_arguments(search)
+    chunks = [(restarts // processes + (k < restarts % processes), alpha, seed + k) for k in range(processes)]
+    best_vector, best_score = None, float('inf')
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(arguments,)) as pool:
+        for vector, score in pool.map(_grasp_chunk, chunks):
+            if vector is not None and score < best_score:
+                best_vector, best_score = vector, score
+    return best_vector, best_score
+
+def run_grasp_search(search, restarts, processes=1, alpha=DEFAULT_ALPHA, seed=0, **kwargs):
+    """
+    search.run_search(**kwargs) with the best of restarts GRASP constructions (see
+    run_grasp) as incumbent, so the DFS prunes from its first node.
+    """
+    vector, score = run_grasp(search, restarts, processes, alpha, seed)
+    incumbent = None if vector is None else (vector, score)
+    return search.run_search(incumbent=incumbent, **kwargs)
@@ -19,39 +19,72 @@ def is_matching_day(day1, day2):
     # Two patterns match if their bitmasks share any common bit.
     return (DAY_CODES[day1] & DAY_CODES[day2]) != 0
 
-def game_capacity(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots):
+def slots_overlap(game_slot, practice_slot):
+    # A game slot and a practice slot overlap if they share a day and their time ranges intersect.
+    return (is_matching_day(game_slot.day, practice_slot.day)
+            and practice_slot.start_time < game_slot.end_time
+            and game_slot.start_time < practice_slot.end_time)
+
+class SlotOverlapIndex:
+    """
+    Immutable map from each slot to the slots of the other kind (game <-> practice) that
+    overlap it in time. The slot set never changes during a search, so the index is built
+    once and the constraint functions look overlaps up instead of re-testing every
+    GameSlot x PracticeSlot pair on each call.
+    """
+    __slots__ = ("_overlaps",)
+
+    def __init__(self, game_slots, practice_slots):
+        overlaps = {slot: set() for slot in list(game_slots) + list(practice_slots)}
+        for gs in game_slots:
+            for ps in practice_slots:
+                if slots_overlap(gs, ps):
+                    overlaps[gs].add(ps)
+                    overlaps[ps].add(gs)
+        self._overlaps = {slot: frozenset(others) for slot, others in overlaps.items()}
+
+    def overlapping(self, slot):
+        # Slots of the other kind overlapping the given slot.
+        return self._overlaps[slot]
+
+    def overlaps(self, slot1, slot2):
+        return slot2 in self._overlaps[slot1]
+
+def game_capacity(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots, overlap_index=None):
     # Ensure no game slot exceeds its gamemax capacity.
     for slot, assignments in game_slots.items():
         if len(assignments) > slot.gamemax:
             return False
     return True
 
-def practice_capacity(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots):
+def practice_capacity(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots, overlap_index=None):
     # Ensure no practice slot exceeds its practicemax capacity.
     for slot, assignments in practice_slots.items():
         if len(assignments) > slot.practicemax:
             return False
     return True
 
-def overlapping_games_practices(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots):
+def overlapping_games_practices(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots, overlap_index=None):
     # Check that games and practices of the same division do not improperly overlap.
+    if overlap_index is None:
+        overlap_index = SlotOverlapIndex(game_slots, practice_slots)
     game_lookup = {}
     for gs, gassign in game_slots.items():
         for g in gassign:
             key = (g.league, g.tier, g.division)
-            game_lookup.setdefault(key, []).append(gs)
+            game_lookup.setdefault(key, set()).add(gs)
 
     for ps, passign in practice_slots.items():
+        if not passign:
+            continue
+        overlapping = overlap_index.overlapping(ps)
         for p in passign:
             key = (p.league, p.tier, p.division)
-            if key not in game_lookup:
-                continue
-            for gs in game_lookup[key]:
-                if is_matching_day(gs.day, ps.day) and gs.start_time < ps.end_time and ps.start_time < gs.end_time:
-                    return False
+            if key in game_lookup and not game_lookup[key].isdisjoint(overlapping):
+                return False
     return True
 
-def late_divisions(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots):
+def late_divisions(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots, overlap_index=None):
     # Divisions 90-99 must not start before 17:00.
     for slot, assignments in solution.items():
         s_start = slot.start_time
@@ -61,7 +94,7 @@ def late_divisions(solution, incompatibilities_list, unwanted_list, game_slots,
                 return False
     return True
 
-def overlapping_tiers(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots):
+def overlapping_tiers(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots, overlap_index=None):
     # Ensure no slot contains more than one item with 'has_overlapping_tier'.
     for slot, assignments in solution.items():
         overlap_items = [it for it in assignments if getattr(it, 'has_overlapping_tier', False)]
@@ -69,14 +102,14 @@ def overlapping_tiers(solution, incompatibilities_list, unwanted_list, game_slot
             return False
     return True
 
-def no_tuesday_eleven(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots):
+def no_tuesday_eleven(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots, overlap_index=None):
     # No games on TR between 11:00 and 12:30.
     for gs, gassign in game_slots.items():
         if gs.day == "TR" and 11.0 <= gs.start_time < 12.5 and gassign:
             return False
     return True
 
-def cmsa_tuesday(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots):
+def cmsa_tuesday(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots, overlap_index=None):
     # Certain CMSA tiers require practices on TU between 18:00 and 19:00.
     required_tiers = {"U12T1S", "U13T1S"}
     required_league = "CMSA"
@@ -89,23 +122,24 @@ def cmsa_tuesday(solution, incompatibilities_list, unwanted_list, game_slots, pr
                     return False
     return True
 
-def cmsa_overlapping_tiers(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots):
+def cmsa_overlapping_tiers(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots, overlap_index=None):
     # Certain CMSA tiers must not overlap.
     cannot_overlap = {("U12T1", "U12T1S"), ("U13T1", "U13T1S")}
     required_league = "CMSA"
+    if overlap_index is None:
+        overlap_index = SlotOverlapIndex(game_slots, practice_slots)
     for (tier1, tier2) in cannot_overlap:
         for gs, gassign in game_slots.items():
             relevant_games = [g for g in gassign if g.league == required_league and g.tier == tier1]
             if not relevant_games:
                 continue
-            for ps, passign in practice_slots.items():
-                if is_matching_day(gs.day, ps.day) and ps.start_time < gs.end_time and gs.start_time < ps.end_time:
-                    for pitem in passign:
-                        if pitem.league == required_league and pitem.tier == tier2:
-                            return False
+            for ps in overlap_index.overlapping(gs):
+                for pitem in practice_slots.get(ps, ()):
+                    if pitem.league == required_league and pitem.tier == tier2:
+                        return False
     return True
 
-def check_u15_u19_non_overlapping(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots):
+def check_u15_u19_non_overlapping(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots, overlap_index=None):
     # Ensure no more than one U15/U16/U17/U19 game in the same slot.
     for slot, assignments in solution.items():
         count = 0
@@ -116,9 +150,12 @@ def check_u15_u19_non_overlapping(solution, incompatibilities_list, unwanted_lis
                     return False
     return True
 
-def satisfies_hard_constraints(solution, incompatibilities_list, unwanted_list, incompat_map):
+def satisfies_hard_constraints(solution, incompatibilities_list, unwanted_list, incompat_map, overlap_index=None):
     # Check all defined constraints in order.
+    # Searches pass a prebuilt SlotOverlapIndex; otherwise one is built for this call.
     game_slots, practice_slots = separate_slots(solution)
+    if overlap_index is None:
+        overlap_index = SlotOverlapIndex(game_slots, practice_slots)
 
     # Intra-slot incompatibilities
     for slot, assignments in solution.items():
@@ -133,15 +170,18 @@ def satisfies_hard_constraints(solution, incompatibilities_list, unwanted_list,
 
     # Inter-slot incompatibilities
     for gs, gassign in game_slots.items():
-        gs_day, gs_start, gs_end = gs.day, gs.start_time, gs.end_time
-        for ps, passign in practice_slots.items():
-            if is_matching_day(gs_day, ps.day) and ps.start_time < gs_end and gs_start < ps.end_time:
-                for gitem in gassign:
-                    if gitem in incompat_map:
-                        incs = incompat_map[gitem]
-                        for pitem in passign:
-                            if pitem in incs:
-                                return False
+        if not gassign:
+            continue
+        for ps in overlap_index.overlapping(gs):
+            passign = practice_slots.get(ps)
+            if not passign:
+                continue
+            for gitem in gassign:
+                if gitem in incompat_map:
+                    incs = incompat_map[gitem]
+                    for pitem in passign:
+                        if pitem in incs:
+                            return False
 
     # Unwanted assignments
     for unwant in unwanted_list:
@@ -164,7 +204,188 @@ def satisfies_hard_constraints(solution, incompatibilities_list, unwanted_list,
         cmsa_overlapping_tiers,
         check_u15_u19_non_overlapping
     ]:
-        if not constraint(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots):
+        if not constraint(solution, incompatibilities_list, unwanted_list, game_slots, practice_slots, overlap_index):
+            return False
+
+    return True
+
+# Lookups used by check_assignment_delta, mirroring the rules encoded in the functions above.
+# Game tier -> special practice tier it must not overlap with, and the reverse.
+CMSA_SPECIAL_PRACTICE_TIERS = {"U12T1": "U12T1S", "U13T1": "U13T1S"}
+CMSA_SPECIAL_GAME_TIERS = {"U12T1S": "U12T1", "U13T1S": "U13T1"}
+NON_OVERLAPPING_TIERS = ["U15", "U16", "U17", "U19"]
+
+def overlapping_slots(slot, solution, overlap_index=None):
+    # Slots of the other kind overlapping `slot`, from the index when one is available,
+    # otherwise by testing the slots present in the solution.
+    if overlap_index is not None:
+        return overlap_index.overlapping(slot)
+    if isinstance(slot, GameSlot):
+        return [ps for ps in solution if isinstance(ps, PracticeSlot) and slots_overlap(slot, ps)]
+    return [gs for gs in solution if isinstance(gs, GameSlot) and slots_overlap(gs, slot)]
+
+def check_assignment_delta(item, slot, solution, unwanted_list, incompat_map, overlap_index=None):
+    # Check whether adding `item` to `slot` keeps `solution` valid, assuming `solution`
+    # already satisfies every hard constraint. Only the constraints the new item can
+    # break are evaluated: the slot it lands in, the slots overlapping it, and the
+    # item's own unwanted/late/CMSA rules. Gives the same answer as running
+    # satisfies_hard_constraints on the solution with the item appended to the slot.
+    assignments = solution[slot]
+    is_game_slot = isinstance(slot, GameSlot)
+    s_day, s_start = slot.day, slot.start_time
+
+    # Capacity of the one slot being filled
+    if is_game_slot:
+        if len(assignments) + 1 > slot.gamemax:
+            return False
+    elif isinstance(slot, PracticeSlot):
+        if len(assignments) + 1 > slot.practicemax:
+            return False
+
+    # Intra-slot incompatibilities (the new item is always the later of the pair)
+    for other in assignments:
+        if other in incompat_map and item in incompat_map[other]:
+            return False
+
+    # Unwanted assignments
+    for unwant in unwanted_list:
+        if unwant.game_or_practice.id == item.id and slot.day == unwant.slot_day and abs(s_start - unwant.slot_time) < 1e-9:
+            return False
+
+    # Late divisions
+    if 90 <= item.division < 100 and s_start < 18.0:
+        return False
+
+    # No games on TR between 11:00 and 12:30
+    if is_game_slot and s_day == "TR" and 11.0 <= s_start < 12.5:
+        return False
+
+    # At most one item with an overlapping tier per slot
+    if getattr(item, 'has_overlapping_tier', False):
+        if any(getattr(it, 'has_overlapping_tier', False) for it in assignments):
             return False
 
-    return True
\ No newline at end of file
+    # At most one U15/U16/U17/U19 game per slot
+    if isinstance(item, Game) and any(t in item.tier for t in NON_OVERLAPPING_TIERS):
+        for it in assignments:
+            if isinstance(it, Game) and any(t in it.tier for t in NON_OVERLAPPING_TIERS):
+                return False
+
+    key = (item.league, item.tier, item.division)
+    is_cmsa = item.league == "CMSA"
+    if is_game_slot:
+        # Special CMSA practices must be on TU 18:00-19:00 (only checked for practice slots)
+        cmsa_partner = CMSA_SPECIAL_PRACTICE_TIERS.get(item.tier) if is_cmsa else None
+        for ps in overlapping_slots(slot, solution, overlap_index):
+            passign = solution.get(ps)
+            if not passign:
+                continue
+            if item in incompat_map:
+                incs = incompat_map[item]
+                for pitem in passign:
+                    if pitem in incs:
+                        return False
+            for pitem in passign:
+                if (pitem.league, pitem.tier, pitem.division) == key:
+                    return False
+                if cmsa_partner and pitem.league == "CMSA" and pitem.tier == cmsa_partner:
+                    return False
+    elif isinstance(slot, PracticeSlot):
+        if is_cmsa and item.tier in CMSA_SPECIAL_GAME_TIERS and not (s_day == "TU" and 18.0 <= s_start < 19.0):
+            return False
+        cmsa_partner = CMSA_SPECIAL_GAME_TIERS.get(item.tier) if is_cmsa else None
+        for gs in overlapping_slots(slot, solution, overlap_index):
+            gassign = solution.get(gs)
+            if not gassign:
+                continue
+            for gitem in gassign:
+                if gitem in incompat_map and item in incompat_map[gitem]:
+                    return False
+                if (gitem.league, gitem.tier, gitem.division) == key:
+                    return False
+                if cmsa_partner and gitem.league == "CMSA" and gitem.tier == cmsa_partner:
+                    return False
+
+    return True
+
+def check_compiled_assignment(problem, item, slot, slot_items):
+    # Integer-id version of check_assignment_delta for a CompiledProblem.
+    # `item` and `slot` are dense ids and `slot_items[s]` lists the item ids in slot s,
+    # which must already satisfy every hard constraint. Gives the same answer as
+    # check_assignment_delta on the corresponding objects; the rules themselves are in
+    # compiled_conflict, so the two cannot drift apart.
+    return compiled_conflict(problem, item, slot, slot_items) is None
+
+def compiled_slot_allowed(problem, item, slot):
+    # Whether the rules about item and slot alone allow the placement, whatever else is
+    # scheduled. compiled_conflict and CompiledProblem.candidate_slots both use it, so
+    # the search, the domain store and the candidate lists agree on them.
+    # Unwanted assignments
+    if slot in problem.item_unwanted_slots[item]:
+        return False
+    # Late divisions
+    if problem.item_late[item] and problem.slot_before_18[slot]:
+        return False
+    # No games on TR between 11:00 and 12:30
+    if problem.slot_no_games[slot]:
+        return False
+    # Special CMSA practices must be on TU 18:00-19:00
+    if problem.item_cmsa_practice[item] and not problem.slot_is_game[slot] and not problem.slot_cmsa_tuesday[slot]:
+        return False
+    return True
+
+def compiled_conflict(problem, item, slot, slot_items):
+    # Why item may not go in slot: the items already placed that one violated
+    # constraint involves (empty if the item or slot alone rules it out), or None if the
+    # placement is allowed (see check_compiled_assignment). Hard constraints hold or fail
+    # for a whole schedule, so the placement stays infeasible for as long as those items
+    # stay put.
+    assignments = slot_items[slot]
+
+    # Capacity of the one slot being filled
+    if len(assignments) + 1 > problem.slot_max[slot]:
+        return list(assignments)
+
+    # Intra-slot incompatibilities (the new item is always the later of the pair)
+    incompatible = problem.item_incompatible
+    for other in assignments:
+        if item in incompatible[other]:
+            return [other]
+
+    # Rules about the item and slot alone
+    if not compiled_slot_allowed(problem, item, slot):
+        return []
+
+    # At most one item with an overlapping tier per slot
+    if problem.item_overlap_tier[item]:
+        overlap_tier = problem.item_overlap_tier
+        for other in assignments:
+            if overlap_tier[other]:
+                return [other]
+
+    # At most one U15/U16/U17/U19 game per slot
+    if problem.item_u15[item]:
+        u15 = problem.item_u15
+        for other in assignments:
+            if u15[other]:
+                return [other]
+
+    key = problem.item_key[item]
+    item_key = problem.item_key
+    if problem.slot_is_game[slot]:
+        incs = incompatible[item]
+        cmsa = problem.item_cmsa_game[item]
+        cmsa_practice = problem.item_cmsa_practice
+        for ps in problem.slot_overlaps[slot]:
+            for pitem in slot_items[ps]:
+                if pitem in incs or item_key[pitem] == key or (cmsa and cmsa_practice[pitem] == cmsa):
+                    return [pitem]
+    else:
+        cmsa = problem.item_cmsa_practice[item]
+        cmsa_game = problem.item_cmsa_game
+        for gs in problem.slot_overlaps[slot]:
+            for gitem in slot_items[gs]:
+                if item in incompatible[gitem] or item_key[gitem] == key or (cmsa and cmsa_game[gitem] == cmsa):
+                    return [gitem]
+
+    return None
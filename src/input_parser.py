@@ -18,9 +18,67 @@ class ParsedData:
         self.pair = pair
         self.partial_assignments = partial_assignments
 
-def read_input(filename):
+# Section headers of the input format and the name each section's records carry
+SECTIONS = {
+    "Game slots:": "game_slots",
+    "Practice slots:": "practice_slots",
+    "Games:": "games",
+    "Practices:": "practices",
+    "Not compatible:": "not_compatible",
+    "Unwanted:": "unwanted",
+    "Preferences:": "preferences",
+    "Pair:": "pair",
+    "Partial assignments:": "partial_assignments",
+}
+HEADER_PATTERN = re.compile("|".join(re.escape(header) for header in SECTIONS))
+WHITESPACE_PATTERN = re.compile(r"\s+")
+FIELD_SEPARATOR = re.compile(r" ?, ?")
+# A schedule line, as save_solution_to_file writes it ("CMSA U13T3 DIV 01 PRC 01 : TU,
+# 10:00") or in the reference format ("CMSA U13T3 DIV 01 - PRC 01: TR, 10:00", with
+# "- Game" for games and a bare "-" for the special CMSA practices)
+SOLUTION_LINE = re.compile(r"(?P<name>[^:-]+?)\s*(?:-\s*(?P<kind>Game|(?:PRC|OPN)\s+\d+)?\s*)?:\s*"
+                           r"(?P<day>[A-Z]+),\s*(?P<time>\d{1,2}:\d{2})")
+# Days a schedule is written with, back to the days of the input format
+SOLUTION_DAYS = {"MWF": "MO", "MW": "MO", "TR": "TU", "F": "FR"}
+
+class InputRecord:
+    """
+    One entry of an input section: the section's name (see SECTIONS), the line number
+    it was read from and its comma-separated fields, whitespace-normalized.
+    """
+    __slots__ = ("section", "line", "fields")
+
+    def __init__(self, section, line, fields):
+        self.section = section
+        self.line = line
+        self.fields = fields
+
+def tokenize(stream):
+    """
+    Read the input format from a file or any iterable of lines in a single pass,
+    yielding an InputRecord per entry. A section runs from its header to the next
+    blank line; lines outside sections (such as the name) are skipped, and the input
+    ends with the partial assignments section.
+    """
+    section = None
+    for number, line in enumerate(stream, start=1):
+        if section is None:
+            match = HEADER_PATTERN.search(line)
+            if match:
+                section = SECTIONS[match.group()]
+            continue
+        text = WHITESPACE_PATTERN.sub(" ", line).strip()
+        if not text:
+            if section == "partial_assignments":
+                return
+            section = None
+            continue
+        yield InputRecord(section, number, FIELD_SEPARATOR.split(text))
+
+def read_input(source):
     """
     Reads the input file and transforms raw textual data into structured objects.
+    source is a file name or an open file-like object.
     
     Expected sections:
     - Game slots:
@@ -33,338 +91,273 @@ def read_input(filename):
     - Pair:
     - Partial assignments:
     
-    Each section is read until a blank line or EOF. After reading all sections,
-    the data is organized into typed objects for easy use in the scheduling logic.
+    Each section is read until a blank line or EOF (see tokenize). The entries are
+    turned into typed objects for easy use in the scheduling logic as they are read
+    (see build_parsed_data). An entry that cannot be parsed raises ValueError naming
+    its line.
     """
-    game_slots = []
-    practice_slots = []
-    games = []
-    practices = []
-    not_compatible = []
-    unwanted = []
-    preferences = []
-    pair = []
-    partial_assignments = []
-
     try:
-        with open(filename, 'r') as file:
-            while True:
-                line = file.readline()
-                if not line:
-                    break
-
-                # Detect sections by keywords
-                if "Game slots:" in line:
-                    read_section(file, game_slots)
-
-                elif "Practice slots:" in line:
-                    read_section(file, practice_slots)
-
-                elif "Games:" in line:
-                    read_section(file, games)
-
-                elif "Practices:" in line:
-                    read_section(file, practices)
-
-                elif "Not compatible:" in line:
-                    read_section(file, not_compatible)
-
-                elif "Unwanted:" in line:
-                    read_section(file, unwanted)
-
-                elif "Preferences:" in line:
-                    read_section(file, preferences)
-
-                elif "Pair:" in line:
-                    read_section(file, pair)
-
-                elif "Partial assignments:" in line:
-                    read_section(file, partial_assignments)
-                    # After partial assignments, input ends
-                    break
-
+        if hasattr(source, "read"):
+            return build_parsed_data(tokenize(source))
+        with open(source, 'r') as file:
+            return build_parsed_data(tokenize(file))
     except FileNotFoundError:
-        raise FileNotFoundError(f"Error: File '{filename}' not found.")
+        raise FileNotFoundError(f"Error: File '{source}' not found.")
+    except ValueError:
+        raise
     except Exception as e:
         raise Exception(f"Error reading the input file: {e}")
 
-    # Convert raw lists into structured objects
-    game_objects, special_practice_object = organize_game_objects(games)
-    practice_objects = organize_practice_objects(practices) + special_practice_object
-    game_slot_objects = organize_game_slot_objects(game_slots)
-    practice_slot_objects = organize_practice_slot_objects(practice_slots)
-    pair_objects = organize_pair_objects(pair, game_objects, practice_objects)
-    preferences_objects = organize_preferences_objects(preferences, game_objects, practice_objects)
-    unwanted_objects = organize_unwanted_objects(unwanted, game_objects, practice_objects)
-    partial_assignment_objects = organize_partial_assignment_objects(partial_assignments, game_objects, practice_objects)
-    incompatible_objects = organize_incompatible_objects(not_compatible, game_objects, practice_objects)
-
-    return ParsedData(
-        games=game_objects,
-        practices=practice_objects,
-        game_slots=game_slot_objects,
-        practice_slots=practice_slot_objects,
-        incompatibilities=incompatible_objects,
-        unwanted=unwanted_objects,
-        preferences=preferences_objects,
-        pair=pair_objects,
-        partial_assignments=partial_assignment_objects,
-    )
-
-def determine_game_or_practice(game_or_practice, game_objects, practice_objects):
+def build_parsed_data(records):
     """
-    Given a raw string describing a game or practice, find the corresponding 
-    object from game_objects or practice_objects. This function first parses 
-    the string to identify if it's a practice or a game, then searches 
-    through the provided lists to find a matching object.
+    Build the ParsedData of a stream of InputRecords (see tokenize), turning each
+    record into its object as soon as it is read, so only the objects are held and
+    never the records of a whole section. References in the constraint sections
+    resolve against the games and practices read so far, which in the usual section
+    order are all of them; if a game or practice comes after a constraint entry, the
+    references still unresolved are looked up again at the end.
     """
-    if "OPN" in game_or_practice or "PRC" in game_or_practice:
-        # Treat as practice
-        normalized_string = game_or_practice.replace("DIV", "").strip()
-        normalized_string = re.sub(r'\s+', ' ', normalized_string)
-        parts = normalized_string.split()
-        # If DIV not mentioned, division=0 (wildcard division)
-        if "DIV" not in game_or_practice:
-            league = parts[0]
-            tier = parts[1]
-            division = 0
-            practice_type = f"{parts[2]} {parts[3]}"
+    objects = {name: [] for name in SECTIONS.values()}
+    special_practices = []
+    index = {}
+    # Whether a game or practice was read after some reference was resolved
+    resolved, late = False, False
+    for record in records:
+        section = record.section
+        section_objects = objects[section]
+        i = len(section_objects)
+        if section in REFERENCE_PARSERS:
+            section_objects.append(parse_record(REFERENCE_PARSERS[section], i, record, index))
+            resolved = True
+        elif section == "games":
+            game = parse_record(parse_game, i, record)
+            section_objects.append(game)
+            index.setdefault(item_key(game), game)
+            practice = special_practice(game)
+            if practice is not None:
+                special_practices.append(practice)
+                index.setdefault(item_key(practice), practice)
+            late = late or resolved
+        elif section == "practices":
+            practice = parse_record(parse_practice, i, record)
+            section_objects.append(practice)
+            index.setdefault(item_key(practice), practice)
+            late = late or resolved
         else:
-            league = parts[0]
-            tier = parts[1]
-            division = parts[2]
-            practice_type = f"{parts[3]} {parts[4]}"
-
-        # Find matching practice in practice_objects
-        identifier = None
-        for practice in practice_objects:
-            if (practice.league == league and practice.tier == tier and 
-                practice.division == int(division) and practice.practice_type == practice_type):
-                identifier = practice.id
-                break
-        res = Practice(identifier=identifier, league=league, tier=tier, division=division, practice_type=practice_type)
-
-    else:
-        # Treat as game
-        normalized_string = game_or_practice.replace("DIV", "").strip()
-        normalized_string = re.sub(r'\s+', ' ', normalized_string)
-        parts = normalized_string.split()
-        league = parts[0]
-        tier = parts[1]
-        division = parts[2]
-        # Find matching game in game_objects
-        identifier = None
-        for game in game_objects:
-            if game.league == league and game.tier == tier and game.division == int(division):
-                identifier = game.id
-                break
-        res = Game(identifier=identifier, league=league, tier=tier, division=division)
-
-    return res
-
-def organize_incompatible_objects(not_compatibles:list, game_objects, practice_objects):
-    """
-    Convert raw 'Not compatible:' lines into Incompatible objects.
-    Each line typically specifies two items that can't appear together.
-    """
-    incompatible_object_list = []
-
-    for i, item in enumerate(not_compatibles):
-        normalized_string = re.sub(r'\s+', ' ', item)
-        parts = [part.strip() for part in normalized_string.split(",")]
-        game_or_practice1 = determine_game_or_practice(parts[0], game_objects, practice_objects)
-        game_or_practice2 = determine_game_or_practice(parts[1], game_objects, practice_objects)
-        incompatible_obj = Incompatible(identifier=i, game_or_practice1=game_or_practice1, game_or_practice2=game_or_practice2)
-        incompatible_object_list.append(incompatible_obj)
-
-    return incompatible_object_list
-
-def organize_pair_objects(pairs: list, game_objects, practice_objects):
-    """
-    Convert raw 'Pair:' lines into PairConstraint objects.
-    Each pair line contains two items that should be scheduled at the same time.
-    """
-    pair_list = []
+            section_objects.append(parse_record(SLOT_PARSERS[section], i, record))
 
-    for i, pair_cst in enumerate(pairs):
-        normalized_string = re.sub(r'\s+', ' ', pair_cst)
-        parts = [part.strip() for part in normalized_string.split(",")]
-        game_or_practice1 = determine_game_or_practice(parts[0], game_objects, practice_objects)
-        game_or_practice2 = determine_game_or_practice(parts[1], game_objects, practice_objects)
-        pair_obj = PairConstraint(identifier=i, game_or_practice1=game_or_practice1, game_or_practice2=game_or_practice2)
-        pair_list.append(pair_obj)
+    if late:
+        for section, attributes in REFERENCE_ATTRIBUTES.items():
+            for constraint in objects[section]:
+                for attribute in attributes:
+                    item = getattr(constraint, attribute)
+                    if item.id is None:
+                        setattr(constraint, attribute, index.get(item_key(item), item))
 
-    return pair_list
-
-def organize_preferences_objects(preferences_list: list, game_objects, practice_objects):
-    """
-    Convert raw 'Preferences:' lines into Preference objects.
-    Each preference line maps an item to a preferred slot (day/time) and a preference value.
-    """
-    preference_obj_list = []
-
-    for i, preference in enumerate(preferences_list):
-        normalized_string = re.sub(r'\s+', ' ', preference)
-        parts = [part.strip() for part in normalized_string.split(",")]
-        slot_day = parts[0]
-        slot_time = parts[1]
-        game_or_practice = determine_game_or_practice(parts[2], game_objects, practice_objects)
-        preference_value = parts[3]
-        preference_obj = Preference(
-            identifier=i, slot_day=slot_day, slot_time=slot_time,
-            game_or_practice=game_or_practice, preference_value=preference_value
-        )
-        preference_obj_list.append(preference_obj)
-
-    return preference_obj_list
-
-def organize_partial_assignment_objects(partial_list: list, game_objects, practice_objects):
-    """
-    Convert raw 'Partial assignments:' lines into PartialAssignments objects.
-    Each partial assignment fixes an item to a specific slot if possible.
-    """
-    partial_obj_list = []
-
-    for i, partial in enumerate(partial_list):
-        normalized_string = re.sub(r'\s+', ' ', partial)
-        parts = [part.strip() for part in normalized_string.split(",")]
-        game_or_practice = determine_game_or_practice(parts[0], game_objects, practice_objects)
-        slot_day = parts[1]
-        slot_time = parts[2]
-        partial_obj = PartialAssignments(identifier=i, game_or_practice=game_or_practice, slot_day=slot_day, slot_time=slot_time)
-        partial_obj_list.append(partial_obj)
+    return ParsedData(
+        games=objects["games"],
+        practices=objects["practices"] + special_practices,
+        game_slots=objects["game_slots"],
+        practice_slots=objects["practice_slots"],
+        incompatibilities=objects["not_compatible"],
+        unwanted=objects["unwanted"],
+        preferences=objects["preferences"],
+        pair=objects["pair"],
+        partial_assignments=objects["partial_assignments"],
+    )
 
-    return partial_obj_list
+def parse_record(parse, i, record, *args):
+    # The object parse(i, fields, *args) builds for the i-th record of its section. A
+    # record parse cannot handle raises ValueError with its line.
+    try:
+        return parse(i, record.fields, *args)
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"Line {record.line}: invalid entry in {record.section}: {', '.join(record.fields)!r}") from e
 
-def organize_unwanted_objects(unwanted_list: list, game_objects, practice_objects):
+def parse_item_name(name, is_practice=None):
     """
-    Convert raw 'Unwanted:' lines into Unwanted objects.
-    Each line specifies an item that should not be placed in a given slot.
+    Split a game or practice name such as "CMSA U13T3 DIV 01 PRC 01" into (league,
+    tier, division, practice_type), with practice_type None for a game. Names with OPN
+    or PRC are practices unless is_practice says otherwise; a practice without DIV gets
+    division 0 (wildcard division).
     """
-    unwanted_obj_list = []
-
-    for i, unw in enumerate(unwanted_list):
-        normalized_string = re.sub(r'\s+', ' ', unw)
-        parts = [part.strip() for part in normalized_string.split(",")]
-        game_or_practice = determine_game_or_practice(parts[0], game_objects, practice_objects)
-        slot_day = parts[1]
-        slot_time = parts[2]
-        unwanted_obj = Unwanted(identifier=i, game_or_practice=game_or_practice, slot_day=slot_day, slot_time=slot_time)
-        unwanted_obj_list.append(unwanted_obj)
-
-    return unwanted_obj_list
-
-def organize_game_slot_objects(game_slots: list):
+    if is_practice is None:
+        is_practice = "OPN" in name or "PRC" in name
+    parts = name.replace("DIV", "").split()
+    if not is_practice:
+        return parts[0], parts[1], int(parts[2]), None
+    if "DIV" not in name:
+        return parts[0], parts[1], 0, f"{parts[2]} {parts[3]}"
+    return parts[0], parts[1], int(parts[2]), f"{parts[3]} {parts[4]}"
+
+def build_item_index(game_objects, practice_objects):
     """
-    Convert raw 'Game slots:' lines into GameSlot objects.
-    Each line typically contains day, start_time, gamemax, gamemin.
+    Map every game's (league, tier, division) and every practice's (league, tier,
+    division, practice type) to the object itself, so determine_game_or_practice can
+    resolve a reference with one lookup. On duplicates the first object is kept.
     """
-    game_slot_obj_list = []
-
-    for i, slot in enumerate(game_slots):
-        normalized_string = slot.replace(",", " ").strip()
-        normalized_string = re.sub(r'\s+', ' ', normalized_string)
-        parts = normalized_string.split()
-        day = parts[0]
-        start_time = parts[1]
-        game_max = parts[2]
-        game_min = parts[3]
-        game_obj = GameSlot(identifier=i, day=day, start_time=start_time, gamemax=game_max, gamemin=game_min)
-        game_slot_obj_list.append(game_obj)
-
-    return game_slot_obj_list
-
-def organize_practice_slot_objects(practice_slots: list):
+    index = {}
+    for game in game_objects:
+        index.setdefault(item_key(game), game)
+    for practice in practice_objects:
+        index.setdefault(item_key(practice), practice)
+    return index
+
+def item_key(item):
+    # The key build_item_index files a game or practice under
+    if isinstance(item, Game):
+        return item.league, item.tier, item.division
+    return item.league, item.tier, item.division, item.practice_type
+
+def determine_game_or_practice(game_or_practice, game_objects, practice_objects, index=None):
     """
-    Convert raw 'Practice slots:' lines into PracticeSlot objects.
-    Each line should have day, start_time, practicemax, practicemin.
-    """
-    practice_slot_obj_list = []
-
-    for i, slot in enumerate(practice_slots):
-        normalized_string = slot.replace(",", " ").strip()
-        normalized_string = re.sub(r'\s+', ' ', normalized_string)
-        parts = normalized_string.split()
-        day = parts[0]
-        start_time = parts[1]
-        practice_max = parts[2]
-        practice_min = parts[3]
-        game_obj = PracticeSlot(identifier=i, day=day, start_time=start_time, practicemax=practice_max, practicemin=practice_min)
-        practice_slot_obj_list.append(game_obj)
-
-    return practice_slot_obj_list
-
-def organize_game_objects(games_list: list):
-    """
-    Convert raw 'Games:' lines into Game objects.
-    Additionally, if certain tiers (e.g., U12T1, U13T1) require associated special practices,
-    create a special practice object and include it separately.
+    Given a raw string describing a game or practice, find the corresponding 
+    object from game_objects or practice_objects. This function first parses 
+    the string to identify if it's a practice or a game, then looks it up in
+    index (built from the two lists if not given). The matching object itself is
+    returned; a reference to nothing in the lists gives a new object with no id,
+    which equals none of them.
     """
-    games_obj_list = []
-    practice_obj_list = []
-
-    for i, game in enumerate(games_list):
-        normalized_string = game.replace("DIV", "").strip()
-        normalized_string = re.sub(r'\s+', ' ', normalized_string)
-        parts = normalized_string.split()
-        league = parts[0]
-        tier = parts[1]
-        division = parts[2]
-        game_obj = Game(identifier=i, league=league, tier=tier, division=division)
-        games_obj_list.append(game_obj)
-
-        if tier in ["U12T1", "U13T1"]:
-            # Some special logic to create a corresponding practice with a "S" tier (e.g., U13T1S)
-            spec_tier = f"{tier}S"
-            special_prac = Practice(identifier=0, league="CMSA", tier=spec_tier, division=division, practice_type="")
-            practice_obj_list.append(special_prac)
-
-    return games_obj_list, practice_obj_list
+    if index is None:
+        index = build_item_index(game_objects, practice_objects)
+    league, tier, division, practice_type = parse_item_name(game_or_practice)
+    if practice_type is not None:
+        res = index.get((league, tier, division, practice_type))
+        if res is None:
+            res = Practice(identifier=None, league=league, tier=tier, division=division, practice_type=practice_type)
+    else:
+        res = index.get((league, tier, division))
+        if res is None:
+            res = Game(identifier=None, league=league, tier=tier, division=division)
+    return res
 
-def organize_practice_objects(practice_list: list):
+def read_solution(source, game_objects, practice_objects, index=None):
     """
-    Convert raw 'Practices:' lines into Practice objects.
-    If no explicit DIV is mentioned, set division=0 (wildcard).
+    Read a schedule written by ANDTreeSearch.save_solution_to_file, or in the reference
+    format of Large_1_sol.txt, back into PartialAssignments objects, one per line, with
+    line numbers as their ids. source is a file name or an open file-like object. Items
+    resolve against game_objects and practice_objects like the constraint sections do,
+    so an item the input no longer has comes back with no id. The "Eval value" line
+    and a "No valid solution found." file give nothing; any other line that is not a
+    placement raises ValueError naming its line.
     """
-    practice_obj_list = []
-
-    for i, practice in enumerate(practice_list):
-        if "DIV" not in practice:
-            # If DIV not specified, division=0
-            normalized_string = practice.replace("DIV", "").strip()
-            normalized_string = re.sub(r'\s+', ' ', normalized_string)
-            parts = normalized_string.split()
-            league = parts[0]
-            tier = parts[1]
-            division = 0
-            practice_type = f"{parts[2]} {parts[3]}"
-            practice_obj = Practice(
-                identifier=i, league=league, tier=tier, division=division, practice_type=practice_type
-            )
-            practice_obj_list.append(practice_obj)
+    if index is None:
+        index = build_item_index(game_objects, practice_objects)
+    if not hasattr(source, "read"):
+        with open(source, 'r') as file:
+            return read_solution(file, game_objects, practice_objects, index)
+
+    assignments = []
+    for number, line in enumerate(source, start=1):
+        text = WHITESPACE_PATTERN.sub(" ", line).strip()
+        if not text or text.startswith("Eval value") or text == "No valid solution found.":
+            continue
+        match = SOLUTION_LINE.fullmatch(text)
+        if match is None:
+            raise ValueError(f"Line {number}: not a schedule entry: {text!r}")
+        name, kind = match.group("name"), match.group("kind")
+        if kind is not None and kind != "Game":
+            name = f"{name} {kind}"
+        try:
+            league, tier, division, practice_type = parse_item_name(name, is_practice=None if kind is None else kind != "Game")
+        except (IndexError, ValueError) as e:
+            raise ValueError(f"Line {number}: not a schedule entry: {text!r}") from e
+        if practice_type is None:
+            # The special CMSA practices are named like games but have no practice type
+            item = index.get((league, tier, division)) or index.get((league, tier, division, ""))
+            if item is None:
+                item = Game(identifier=None, league=league, tier=tier, division=division)
         else:
-            normalized_string = practice.replace("DIV", "").strip()
-            normalized_string = re.sub(r'\s+', ' ', normalized_string)
-            parts = normalized_string.split()
-            league = parts[0]
-            tier = parts[1]
-            division = parts[2]
-            practice_type = f"{parts[3]} {parts[4]}"
-            practice_obj = Practice(identifier=i, league=league, tier=tier, division=division, practice_type=practice_type)
-            practice_obj_list.append(practice_obj)
-
-    return practice_obj_list
+            item = index.get((league, tier, division, practice_type))
+            if item is None:
+                item = Practice(identifier=None, league=league, tier=tier, division=division, practice_type=practice_type)
+        day = match.group("day")
+        assignments.append(PartialAssignments(identifier=number, game_or_practice=item,
+                                              slot_day=SOLUTION_DAYS.get(day, day), slot_time=match.group("time")))
+    return assignments
+
+def parse_incompatible(i, fields, index):
+    # An Incompatible from a 'Not compatible:' entry: two items that can't appear together
+    return Incompatible(identifier=i,
+                        game_or_practice1=determine_game_or_practice(fields[0], None, None, index),
+                        game_or_practice2=determine_game_or_practice(fields[1], None, None, index))
+
+def parse_pair(i, fields, index):
+    # A PairConstraint from a 'Pair:' entry: two items to schedule at the same time
+    return PairConstraint(identifier=i,
+                          game_or_practice1=determine_game_or_practice(fields[0], None, None, index),
+                          game_or_practice2=determine_game_or_practice(fields[1], None, None, index))
+
+def parse_preference(i, fields, index):
+    # A Preference from a 'Preferences:' entry: day, time, item and preference value
+    return Preference(
+        identifier=i, slot_day=fields[0], slot_time=fields[1],
+        game_or_practice=determine_game_or_practice(fields[2], None, None, index), preference_value=fields[3]
+    )
 
-def read_section(file, target_list):
-    """
-    Reads a section of the input until an empty line or EOF and appends each line to target_list.
-    Sections are expected to be continuously listed until a blank line indicates section end.
-    """
-    while True:
-        line = file.readline().strip()
-        if not line:
-            break
-        target_list.append(line)
+def parse_partial_assignment(i, fields, index):
+    # A PartialAssignments from a 'Partial assignments:' entry: item, day and time
+    game_or_practice = determine_game_or_practice(fields[0], None, None, index)
+    return PartialAssignments(identifier=i, game_or_practice=game_or_practice, slot_day=fields[1], slot_time=fields[2])
+
+def parse_unwanted(i, fields, index):
+    # An Unwanted from an 'Unwanted:' entry: item, day and time
+    game_or_practice = determine_game_or_practice(fields[0], None, None, index)
+    return Unwanted(identifier=i, game_or_practice=game_or_practice, slot_day=fields[1], slot_time=fields[2])
+
+def slot_fields(fields):
+    # day, start_time, max and min of a slot record; the commas are optional.
+    parts = " ".join(fields).split()
+    return parts[0], parts[1], parts[2], parts[3]
+
+def parse_game_slot(i, fields):
+    # A GameSlot from a 'Game slots:' entry: day, start_time, gamemax, gamemin
+    day, start_time, game_max, game_min = slot_fields(fields)
+    return GameSlot(identifier=i, day=day, start_time=start_time, gamemax=game_max, gamemin=game_min)
+
+def parse_practice_slot(i, fields):
+    # A PracticeSlot from a 'Practice slots:' entry: day, start_time, practicemax, practicemin
+    day, start_time, practice_max, practice_min = slot_fields(fields)
+    return PracticeSlot(identifier=i, day=day, start_time=start_time, practicemax=practice_max, practicemin=practice_min)
+
+def parse_game(i, fields):
+    # A Game from a 'Games:' entry
+    league, tier, division, _ = parse_item_name(", ".join(fields), is_practice=False)
+    return Game(identifier=i, league=league, tier=tier, division=division)
+
+def special_practice(game):
+    # Some special logic to create a corresponding practice with a "S" tier (e.g., U13T1S)
+    # for the games of certain tiers (U12T1, U13T1); None for the others
+    if game.tier not in ["U12T1", "U13T1"]:
+        return None
+    return Practice(identifier=0, league="CMSA", tier=f"{game.tier}S", division=game.division, practice_type="")
+
+def parse_practice(i, fields):
+    # A Practice from a 'Practices:' entry; without an explicit DIV, division=0 (wildcard)
+    league, tier, division, practice_type = parse_item_name(", ".join(fields), is_practice=True)
+    return Practice(identifier=i, league=league, tier=tier, division=division, practice_type=practice_type)
+
+# How build_parsed_data turns each section's records into objects: the slot sections on
+# their own, the constraint sections against the index of the games and practices
+SLOT_PARSERS = {
+    "game_slots": parse_game_slot,
+    "practice_slots": parse_practice_slot,
+}
+REFERENCE_PARSERS = {
+    "not_compatible": parse_incompatible,
+    "pair": parse_pair,
+    "preferences": parse_preference,
+    "partial_assignments": parse_partial_assignment,
+    "unwanted": parse_unwanted,
+}
+# The attributes of each constraint section's objects that refer to games or practices
+REFERENCE_ATTRIBUTES = {
+    "not_compatible": ("game_or_practice1", "game_or_practice2"),
+    "pair": ("game_or_practice1", "game_or_practice2"),
+    "preferences": ("game_or_practice",),
+    "partial_assignments": ("game_or_practice",),
+    "unwanted": ("game_or_practice",),
+}
 
 def parse_not_compatible(not_compatible):
     """
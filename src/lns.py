@@ -0,0 +1,150 @@
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+import and_tree
+from and_tree import progress_state
+from search_cache import BoundedCache
+
+# Width in hours of the time bands the "time_band" neighbourhood frees
+TIME_BAND_HOURS = 2.0
+
+def tier_neighbourhood(problem, vector, rng):
+    # Every item of one league and tier.
+    items = problem.items
+    league, tier = rng.choice(sorted({(it.league, it.tier) for it in items}))
+    return {i for i, it in enumerate(items) if it.league == league and it.tier == tier}
+
+def day_neighbourhood(problem, vector, rng):
+    # Every item placed on one day.
+    day = rng.choice(sorted({slot.day for slot in problem.slots}))
+    return {i for i, s in enumerate(vector) if s is not None and problem.slots[s].day == day}
+
+def time_band_neighbourhood(problem, vector, rng):
+    # Every item placed in a slot starting within TIME_BAND_HOURS of a random slot's start.
+    start = rng.choice(problem.slots).start_time
+    return {i for i, s in enumerate(vector)
+            if s is not None and start <= problem.slots[s].start_time < start + TIME_BAND_HOURS}
+
+NEIGHBOURHOODS = {
+    "tier": tier_neighbourhood,
+    "day": day_neighbourhood,
+    "time_band": time_band_neighbourhood,
+}
+
+class LargeNeighbourhoodSearch:
+    """
+    Destroy-and-repair improvement of a complete schedule with an ANDTreeSearch.
+
+    Each step frees a structured part of the best schedule (one league/tier, one day or
+    one time band, see NEIGHBOURHOODS), holds everything else as fixed assignments and
+    runs the search's DFS on what is left, for at most node_limit nodes. The DFS prunes
+    against the current best score, so any schedule it finds is an improvement and
+    becomes the new best. Partial assignments are never freed.
+
+    The DFS runs with the search's practice_fallback on, both for the first schedule and
+    for the repairs: pruning against the best score from the first node would otherwise
+    drop most repair branches at their first practice, and a better first schedule
+    leads to much better final ones.
+    """
+    def __init__(self, search, node_limit=2000, neighbourhoods=None, seed=0):
+        self.search = search
+        self.node_limit = node_limit
+        self.neighbourhoods = NEIGHBOURHOODS if neighbourhoods is None else neighbourhoods
+        self.rng = random.Random(seed)
+
+    @contextmanager
+    def practice_fallback(self):
+        search = self.search
+        saved = search.practice_fallback
+        search.practice_fallback = True
+        try:
+            yield
+        finally:
+            search.practice_fallback = saved
+
+    def first_schedule(self):
+        # Run the DFS from the root until it has found a schedule or finished, and
+        # return (vector, score), or (None, inf) if there is no valid schedule.
+        search = self.search
+        progress_state["best_score"] = float('inf')
+        search.best_solution = None
+        search.reset_state()
+        search.root.moves = []
+        with self.practice_fallback():
+            cursor = search.depth_first_search(search.root, node_limit=progress_state["expanded_nodes"] + self.node_limit)
+            while search.best_solution is None and cursor is not None:
+                cursor = search.resume_search(cursor, node_limit=progress_state["expanded_nodes"] + self.node_limit)
+        if search.best_solution is None:
+            return None, float('inf')
+        return search.problem.vector_from_solution(search.best_solution), progress_state["best_score"]
+
+    def repair(self, vector, score, free):
+        # Search for a better schedule that keeps every item outside free where vector
+        # has it. Returns its (vector, score), or None if none was found in the budget.
+        search = self.search
+        fixed = tuple(None if i in free else s for i, s in enumerate(vector))
+        progress_state["best_score"] = score
+        search.best_solution = None
+        search.reset_state()
+        problem, state = search.problem, search.state
+        with self.practice_fallback():
+            # The freed practices of fixed games are placed here rather than by the DFS, so
+            # they need the fallback as much; one still left without a slot means the DFS
+            # cannot complete any schedule, and the budget is not spent on it
+            search.root.moves = search.apply_fixed_assignments(fixed)
+            if any(not state.is_assigned(p) for g in problem.game_ids() if fixed[g] is not None
+                   for p in problem.associated_practices[g]):
+                search.logger.debug("Freed practices of fixed games do not fit, skipping the repair")
+                return None
+            search.depth_first_search(search.root, BoundedCache(search.visited_cache_size),
+                                      node_limit=progress_state["expanded_nodes"] + self.node_limit)
+        if search.best_solution is None:
+            return None
+        return search.problem.vector_from_solution(search.best_solution), progress_state["best_score"]
+
+    def run(self, vector, score, iterations=None, time_limit=None):
+        # Destroy and repair from the schedule (vector, score) for the given number of
+        # steps and/or seconds; returns the best (vector, score).
+        deadline = None if time_limit is None else time.time() + time_limit
+        names = sorted(self.neighbourhoods)
+        step = 0
+        while (iterations is None or step < iterations) and (deadline is None or time.time() < deadline):
+            step += 1
+            name = self.rng.choice(names)
+            free = self.neighbourhoods[name](self.search.problem, vector, self.rng)
+            if not free:
+                continue
+            repaired = self.repair(vector, score, free)
+            if repaired is not None:
+                vector, score = repaired
+                self.search.logger.debug("LNS step %d (%s, %d items freed) improved the score to %s",
+                                         step, name, len(free), score)
+        progress_state["best_score"] = score
+        return vector, score
+
+def run_lns(search, iterations=None, time_limit=60.0, node_limit=2000, seed=0):
+    """
+    Find a first schedule with the DFS and improve it with LargeNeighbourhoodSearch
+    until iterations steps or time_limit seconds are used up (None for no limit; one
+    of them should be set). Progress is reported like run_search, every improvement is
+    written to search.solution_file, and the best schedule also to final_solution_2.txt.
+    Returns (best_solution, best_score).
+    """
+    progress_state["done"] = False
+    monitor_thread = threading.Thread(target=and_tree.progress_monitor, daemon=True)
+    monitor_thread.start()
+
+    lns = LargeNeighbourhoodSearch(search, node_limit, seed=seed)
+    vector, score = lns.first_schedule()
+    if vector is not None:
+        vector, score = lns.run(vector, score, iterations, time_limit)
+        search.best_solution = search.problem.solution_from_vector(vector)
+        search.best_score = score
+
+    progress_state["done"] = True
+    monitor_thread.join()
+
+    search.save_solution_to_file("final_solution_2.txt")
+    return search.best_solution, score
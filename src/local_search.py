@@ -0,0 +1,174 @@
+import math
+import random
+
+from hard_constraints import check_compiled_assignment
+from schedule_state import ScheduleState
+
+# Relative chance of each neighbourhood being tried in one iteration
+MOVE_WEIGHTS = {"move": 4, "swap": 2, "block": 1}
+
+class LocalSearch:
+    """
+    Simulated-annealing improvement of a complete schedule.
+
+    Three neighbourhoods are used: moving one item to another slot, swapping the slots
+    of two games, and swapping two games together with their associated practices
+    (block), which exchange slots too or are re-placed where cheapest. Each move
+    is checked with check_compiled_assignment against the rest of the schedule, and the
+    schedule's penalty is kept up to date by a PenaltyTracker, so trying a move costs a
+    few delta checks rather than re-validating or re-scoring the whole schedule.
+
+    Items in fixed_items (the partial assignments) are never moved.
+    """
+    def __init__(self, problem, penalties, fixed_items=(), seed=0):
+        self.problem = problem
+        self.penalties = penalties
+        self.fixed = set(fixed_items)
+        self.rng = random.Random(seed)
+        self.movable_items = [i for i in range(len(problem.items)) if i not in self.fixed]
+        self.movable_games = [g for g in problem.game_ids() if g not in self.fixed]
+        self.state = None
+
+    def run(self, vector, iterations, on_improvement=None, temperature=None):
+        # Anneal from the complete schedule given as an assignment vector and return the
+        # (vector, score) of the best schedule seen. on_improvement(vector, score) is
+        # called for every schedule better than all the ones before it.
+        problem = self.problem
+        self.state = state = ScheduleState(problem, problem.solution_from_vector(vector))
+        self.penalties.attach(state)
+        score = best_score = self.penalties.penalty()
+        best_vector = state.assignment_vector()
+        if not self.movable_items or iterations <= 0:
+            return best_vector, best_score
+
+        # Start hot enough to accept moves costing a few percent of the score and cool
+        # geometrically to a hundredth of that
+        if temperature is None:
+            temperature = 0.05 * max(score, 1)
+        cooling = 0.01 ** (1.0 / iterations)
+        kinds = list(MOVE_WEIGHTS)
+        weights = list(MOVE_WEIGHTS.values())
+
+        for _ in range(iterations):
+            kind = self.rng.choices(kinds, weights)[0]
+            changes = getattr(self, kind)()
+            temperature *= cooling
+            if changes is None:
+                continue
+            new_score = self.penalties.penalty()
+            delta = new_score - score
+            if delta <= 0 or self.rng.random() < math.exp(-delta / temperature):
+                score = new_score
+                if score < best_score:
+                    best_score = score
+                    best_vector = state.assignment_vector()
+                    if on_improvement is not None:
+                        on_improvement(best_vector, best_score)
+            else:
+                self.revert(changes)
+        return best_vector, best_score
+
+    def revert(self, changes):
+        # Put the items of a move back where they were, given as [(item, old slot)].
+        state = self.state
+        for item, _ in changes:
+            state.remove(item)
+        for item, slot in changes:
+            state.place(item, slot)
+
+    def try_place(self, item, slot):
+        # Place the unassigned item in slot if the hard constraints allow it.
+        if check_compiled_assignment(self.problem, item, slot, self.state.slot_items):
+            self.state.place(item, slot)
+            return True
+        return False
+
+    def random_slot(self, item):
+        problem = self.problem
+        slots = problem.game_slot_ids() if problem.item_is_game[item] else problem.practice_slot_ids()
+        return self.rng.choice(slots)
+
+    def move(self):
+        # Move one item to another slot of its kind.
+        item = self.rng.choice(self.movable_items)
+        slot = self.random_slot(item)
+        state = self.state
+        old = state.item_slot[item]
+        if slot == old:
+            return None
+        state.remove(item)
+        if not self.try_place(item, slot):
+            state.place(item, old)
+            return None
+        return [(item, old)]
+
+    def swap(self):
+        # Exchange the slots of two games.
+        if len(self.movable_games) < 2:
+            return None
+        g1, g2 = self.rng.sample(self.movable_games, 2)
+        state = self.state
+        s1, s2 = state.item_slot[g1], state.item_slot[g2]
+        if s1 == s2:
+            return None
+        state.remove(g1)
+        state.remove(g2)
+        if self.try_place(g1, s2):
+            if self.try_place(g2, s1):
+                return [(g1, s1), (g2, s2)]
+            state.remove(g1)
+        state.place(g1, s1)
+        state.place(g2, s2)
+        return None
+
+    def block(self):
+        # Exchange the slots of two games together with their associated practices: the
+        # k-th practice of each game takes the old slot of the other game's k-th
+        # practice. Practices without a counterpart, or whose new slot breaks a hard
+        # constraint, are re-placed at their cheapest feasible practice slots. If any of
+        # them fits nowhere, everything goes back.
+        if len(self.movable_games) < 2:
+            return None
+        g1, g2 = self.rng.sample(self.movable_games, 2)
+        state = self.state
+        s1, s2 = state.item_slot[g1], state.item_slot[g2]
+        if s1 == s2:
+            return None
+        associated = self.problem.associated_practices
+        practices1 = [p for p in associated[g1] if p not in self.fixed]
+        practices2 = [p for p in associated[g2] if p not in self.fixed and p not in practices1]
+        changes = [(item, state.item_slot[item]) for item in [g1, g2] + practices1 + practices2]
+        for item, _ in changes:
+            state.remove(item)
+        old = dict(changes)
+        swapped = [(p1, old[p2]) for p1, p2 in zip(practices1, practices2)] + \
+                  [(p2, old[p1]) for p1, p2 in zip(practices1, practices2)]
+        if self.try_place(g1, s2) and self.try_place(g2, s1):
+            leftover = [p for p, slot in swapped if not self.try_place(p, slot)]
+            leftover += practices1[len(practices2):] + practices2[len(practices1):]
+            if all(self.place_cheapest(p) for p in leftover):
+                return changes
+        for item, _ in changes:
+            if state.is_assigned(item):
+                state.remove(item)
+        for item, slot in changes:
+            state.place(item, slot)
+        return None
+
+    def place_cheapest(self, item):
+        # Place the unassigned practice at the feasible practice slot with the lowest
+        # penalty; False if it fits nowhere.
+        state = self.state
+        best_slot, best_score = None, None
+        for slot in self.problem.practice_slot_ids():
+            if not check_compiled_assignment(self.problem, item, slot, state.slot_items):
+                continue
+            state.place(item, slot)
+            score = self.penalties.penalty()
+            state.remove(item)
+            if best_score is None or score < best_score:
+                best_slot, best_score = slot, score
+        if best_slot is None:
+            return False
+        state.place(item, best_slot)
+        return True
@@ -0,0 +1,260 @@
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import and_tree
+from and_tree import ANDTreeSearch, progress_state
+from search_cache import BoundedCache
+
+# The search each worker process builds once, in _init_worker
+_worker_search = None
+
+def search_arguments(search):
+    # Constructor arguments that rebuild an identical ANDTreeSearch in another process.
+    return dict(
+        games=search.games,
+        practices=search.practices,
+        game_slots=search.game_slots,
+        practice_slots=search.practice_slots,
+        incompatibilities=search.incompatibilities,
+        preferences=search.preferences,
+        pairs=search.pairs,
+        partial_assignments=search.partial_assignments,
+        weights=search.weights,
+        unwanted=search.unwanted,
+        # Sent along so workers need not compile the problem again
+        problem=search.problem,
+        **search.options
+    )
+
+def _init_worker(arguments, incumbent, deadline):
+    global _worker_search
+    _worker_search = ANDTreeSearch(logger=logging.getLogger("SchedulerWorker"), **arguments)
+    # Only the parent process writes solution files
+    _worker_search.solution_file = None
+    _worker_search.incumbent = incumbent
+    _worker_search.deadline = deadline
+
+def _solve_subproblem(subproblem):
+    # Runs in a worker: search below one subproblem, pruning against the shared incumbent.
+    search = _worker_search
+    progress_state["expanded_nodes"] = 0
+    progress_state["best_score"] = search.incumbent.value
+    vector, score = search.search_subproblem(subproblem)
+    return vector, score, progress_state["expanded_nodes"]
+
+def run_parallel_search(search, processes=None, split_depth=2, time_limit=None):
+    """
+    Parallel version of search.run_search(). The first split_depth game assignments
+    below the root are searched here; the open nodes at that depth are handed to a
+    pool of worker processes, in the order the sequential DFS would visit them.
+    time_limit (seconds) stops every worker with the best schedule found so far.
+
+    The best score is shared through a multiprocessing.Value: every worker reads it
+    before each node and writes any improvement back, so a good schedule found in one
+    subtree prunes all the others. Workers return their best schedules as assignment
+    vectors, and the parent keeps progress_state and the solution files up to date
+    just like run_search. Returns (best_solution, best_score).
+    """
+    processes = processes or os.cpu_count()
+    progress_state["best_score"] = float('inf')
+    progress_state["expanded_nodes"] = 0
+    progress_state["done"] = False
+
+    monitor_thread = threading.Thread(target=and_tree.progress_monitor, daemon=True)
+    monitor_thread.start()
+
+    deadline = None if time_limit is None else time.time() + time_limit
+    search.deadline = deadline
+    try:
+        subproblems = search.split_root(split_depth)
+    finally:
+        search.deadline = None
+    best_solution, best_score = search.best_solution, progress_state["best_score"]
+    search.logger.debug("Split the root into %d subproblems at depth %d", len(subproblems), split_depth)
+
+    incumbent = multiprocessing.Value('d', best_score)
+    expanded_nodes = progress_state["expanded_nodes"]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(search_arguments(search), incumbent, deadline)) as pool:
+        futures = [pool.submit(_solve_subproblem, subproblem) for subproblem in subproblems]
+        for future in as_completed(futures):
+            vector, score, expanded = future.result()
+            expanded_nodes += expanded
+            progress_state["expanded_nodes"] = expanded_nodes
+            if vector is not None and score < best_score:
+                best_score = score
+                best_solution = search.problem.solution_from_vector(vector)
+                progress_state["best_score"] = score
+                search.best_solution = best_solution
+                search.best_score = score
+                search.logger.debug("Worker found new best solution with score=%s", score)
+                if search.solution_file:
+                    search.save_solution_to_file(search.solution_file)
+
+    progress_state["done"] = True
+    monitor_thread.join()
+
+    search.save_solution_to_file("final_solution_2.txt")
+    return best_solution, best_score
+
+class WorkSharing:
+    """
+    Lets a worker's DFS give open nodes to idle workers (see ANDTreeSearch.work_sharing).
+
+    Every `interval` steps the worker checks whether any process is waiting for work.
+    If so, it takes half of the unexplored children of the shallowest frame that has at
+    least two left - the largest subtrees it still owns - and puts them on the shared
+    task queue as (assignment vector, depth, pscore, lower_bound). `outstanding` counts
+    tasks that are queued or being searched, so it only reaches 0 once the whole tree
+    has been explored.
+    """
+    def __init__(self, tasks, idle, outstanding, interval=64):
+        self.tasks = tasks
+        self.idle = idle
+        self.outstanding = outstanding
+        self.interval = interval
+        self.steps = 0
+        self.donated = 0
+
+    def maybe_donate(self, search, stack):
+        self.steps += 1
+        if self.steps < self.interval:
+            return
+        self.steps = 0
+        if self.idle.value == 0:
+            return
+        for index, frame in enumerate(stack):
+            if len(frame.children) < 2:
+                continue
+            # The next child to explore is the last one, so give away the front half
+            count = len(frame.children) // 2
+            given, frame.children[:count] = frame.children[:count], []
+            tasks = [
+                (search.frame_vector(stack, index, child.moves), frame.depth + 1, child.pscore, child.lower_bound)
+                for child in given if child.lower_bound < progress_state["best_score"]
+            ]
+            with self.outstanding.get_lock():
+                self.outstanding.value += len(tasks)
+            for task in tasks:
+                self.tasks.put(task)
+            self.donated += len(tasks)
+            return
+
+def _steal_worker(arguments, tasks, results, incumbent, idle, outstanding, max_depth, deadline):
+    # Runs in a worker process: search tasks from the queue until every task is done,
+    # then report the best schedule found here. Past the deadline every task left
+    # stops at once, so the queue drains quickly.
+    search = ANDTreeSearch(logger=logging.getLogger("SchedulerWorker"), **arguments)
+    search.solution_file = None
+    search.incumbent = incumbent
+    search.deadline = deadline
+    search.work_sharing = WorkSharing(tasks, idle, outstanding)
+    search.best_solution = None
+    progress_state["expanded_nodes"] = 0
+    progress_state["best_score"] = incumbent.value
+    visited_states = BoundedCache(search.visited_cache_size)
+
+    waiting = False
+    while True:
+        try:
+            task = tasks.get(timeout=0.01)
+        except queue.Empty:
+            if not waiting:
+                waiting = True
+                with idle.get_lock():
+                    idle.value += 1
+            if outstanding.value == 0:
+                break
+            continue
+        if waiting:
+            waiting = False
+            with idle.get_lock():
+                idle.value -= 1
+        search.search_from_vector(*task, visited_states, max_depth)
+        with outstanding.get_lock():
+            outstanding.value -= 1
+
+    vector = None
+    if search.best_solution is not None:
+        vector = search.problem.vector_from_solution(search.best_solution)
+    results.put((vector, search.best_score if vector is not None else float('inf'),
+                 progress_state["expanded_nodes"], search.work_sharing.donated))
+
+def run_work_stealing_search(search, processes=None, max_depth=1000, time_limit=None):
+    """
+    Parallel version of search.run_search() with dynamic load balancing. The root is
+    the only task at the start; a worker that runs out of tasks waits on the shared
+    queue, and busy workers notice it and donate open nodes from the bottom of their
+    DFS stacks (see WorkSharing). Subtrees that are pruned at once therefore cost a
+    worker almost nothing, instead of leaving it idle as a static split does.
+
+    Nodes travel as assignment vectors and the best score is shared through a
+    multiprocessing.Value, as in run_parallel_search, and so is time_limit. Returns
+    (best_solution, best_score).
+    """
+    processes = processes or os.cpu_count()
+    progress_state["best_score"] = float('inf')
+    progress_state["expanded_nodes"] = 0
+    progress_state["done"] = False
+
+    monitor_thread = threading.Thread(target=and_tree.progress_monitor, daemon=True)
+    monitor_thread.start()
+
+    search.reset_state()
+    root_task = (search.problem.vector_from_solution(search.root.solution), 0, 0,
+                 search.lower_bound(search.penalties.partial_penalty()))
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    incumbent = multiprocessing.Value('d', float('inf'))
+    idle = multiprocessing.Value('i', 0)
+    outstanding = multiprocessing.Value('i', 1)
+    tasks.put(root_task)
+
+    arguments = search_arguments(search)
+    deadline = None if time_limit is None else time.time() + time_limit
+    workers = [
+        multiprocessing.Process(target=_steal_worker, daemon=True,
+                                args=(arguments, tasks, results, incumbent, idle, outstanding, max_depth, deadline))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    best_solution, best_score = None, float('inf')
+    expanded_nodes = donated = 0
+    for _ in workers:
+        while True:
+            try:
+                vector, score, expanded, given = results.get(timeout=0.5)
+                break
+            except queue.Empty:
+                # Keep the progress monitor showing the shared best score
+                progress_state["best_score"] = min(best_score, incumbent.value)
+                if not any(worker.is_alive() for worker in workers) and results.empty():
+                    raise RuntimeError("A search worker exited without reporting its result")
+        expanded_nodes += expanded
+        donated += given
+        progress_state["expanded_nodes"] = expanded_nodes
+        if vector is not None and score < best_score:
+            best_score = score
+            best_solution = search.problem.solution_from_vector(vector)
+    for worker in workers:
+        worker.join()
+    search.logger.debug("Work stealing: %d nodes expanded, %d nodes donated", expanded_nodes, donated)
+
+    progress_state["best_score"] = best_score
+    search.best_solution = best_solution
+    search.best_score = best_score
+    if best_solution is not None and search.solution_file:
+        search.save_solution_to_file(search.solution_file)
+
+    progress_state["done"] = True
+    monitor_thread.join()
+
+    search.save_solution_to_file("final_solution_2.txt")
+    return best_solution, best_score
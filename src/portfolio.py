@@ -0,0 +1,139 @@
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+
+import and_tree
+from and_tree import ANDTreeSearch, progress_state
+from parallel_search import search_arguments
+from best_first import best_first_search
+
+# Search configurations raced by run_portfolio: ANDTreeSearch keyword options plus a
+# name for the logs. Seeded configurations break branching ties at random. "driver"
+# selects the depth-first search ("dfs", the default) or best_first_search ("best_first",
+# a beam search when the configuration also has a "beam_width").
+PORTFOLIO = [
+    dict(name="mrv"),
+    dict(name="degree", game_order="degree"),
+    dict(name="mrv-bound", value_order="bound"),
+    dict(name="input-slot", game_order="input", value_order="slot"),
+    dict(name="mrv-random", seed=1),
+    dict(name="degree-random", game_order="degree", value_order="bound", seed=2),
+    dict(name="beam", driver="best_first", beam_width=100),
+]
+
+def _watch_stop(search, stop, interval=0.05):
+    # Pause the search once the shared stop flag is raised. The flag is polled because
+    # a multiprocessing.Event cannot be set safely while processes that wait on it exit.
+    while not stop.value:
+        time.sleep(interval)
+    search.pause()
+
+def _portfolio_worker(arguments, config, incumbent, stop, results):
+    # Runs in a worker process: a DFS with one configuration, pruning against the shared
+    # incumbent, until it finishes or the stop flag is raised.
+    options = dict(config)
+    name = options.pop("name")
+    driver = options.pop("driver", "dfs")
+    beam_width = options.pop("beam_width", None)
+    search = ANDTreeSearch(logger=logging.getLogger("SchedulerPortfolio"), **dict(arguments, **options))
+    search.solution_file = None
+    search.incumbent = incumbent
+    threading.Thread(target=_watch_stop, args=(search, stop), daemon=True).start()
+
+    progress_state["expanded_nodes"] = 0
+    progress_state["best_score"] = incumbent.value
+    search.reset_state()
+    search.root.moves = []
+    if driver == "best_first":
+        best_first_search(search, beam_width)
+        finished = not search.pause_requested
+    else:
+        finished = search.depth_first_search(search.root) is None
+
+    vector = None
+    if search.best_solution is not None:
+        vector = search.problem.vector_from_solution(search.best_solution)
+    results.put((name, vector, search.best_score if vector is not None else float('inf'),
+                 finished, progress_state["expanded_nodes"]))
+
+def run_portfolio(search, configs=None, time_limit=None):
+    """
+    Race several configurations of search (PORTFOLIO by default) in their own
+    processes. They share the best score through a multiprocessing.Value, so each
+    prunes with what the others have found.
+
+    The DFS places practices greedily, so a configuration that finishes has only
+    exhausted its own tree; the others keep going, since they often find better
+    schedules. Optimality is proven once the shared best score reaches the lower
+    bound at the root, and that stops the race, as does time_limit seconds passing.
+
+    The best schedule is written to search.solution_file and final_solution_2.txt
+    like run_search does. Returns (best_solution, best_score, proven_optimal).
+    """
+    configs = PORTFOLIO if configs is None else configs
+    progress_state["best_score"] = float('inf')
+    progress_state["expanded_nodes"] = 0
+    progress_state["done"] = False
+
+    monitor_thread = threading.Thread(target=and_tree.progress_monitor, daemon=True)
+    monitor_thread.start()
+
+    search.reset_state()
+    root_bound = search.lower_bound(search.penalties.partial_penalty())
+    deadline = None if time_limit is None else time.time() + time_limit
+
+    incumbent = multiprocessing.Value('d', float('inf'))
+    stop = multiprocessing.Value('b', 0)
+    results = multiprocessing.Queue()
+    arguments = search_arguments(search)
+    workers = [
+        multiprocessing.Process(target=_portfolio_worker, daemon=True,
+                                args=(arguments, config, incumbent, stop, results))
+        for config in configs
+    ]
+    for worker in workers:
+        worker.start()
+
+    best_solution, best_score = None, float('inf')
+    expanded_nodes = 0
+    reports = 0
+    while reports < len(workers):
+        if not stop.value:
+            if incumbent.value <= root_bound:
+                search.logger.debug("Best score %s meets the root lower bound, stopping", incumbent.value)
+                stop.value = 1
+            elif deadline is not None and time.time() >= deadline:
+                search.logger.debug("Portfolio stopped after the %ss time limit", time_limit)
+                stop.value = 1
+        try:
+            name, vector, score, finished, expanded = results.get(timeout=0.1)
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers) and results.empty():
+                raise RuntimeError("A search worker exited without reporting its result")
+            progress_state["best_score"] = incumbent.value
+            continue
+        reports += 1
+        search.logger.debug("Configuration %s: score=%s, finished=%s, %d nodes", name, score, finished, expanded)
+        expanded_nodes += expanded
+        if vector is not None and score < best_score:
+            best_score = score
+            best_solution = search.problem.solution_from_vector(vector)
+    stop.value = 1
+    for worker in workers:
+        worker.join()
+    proven_optimal = best_score <= root_bound
+
+    progress_state["expanded_nodes"] = expanded_nodes
+    progress_state["best_score"] = best_score
+    search.best_solution = best_solution
+    search.best_score = best_score
+    if search.solution_file:
+        search.save_solution_to_file(search.solution_file)
+
+    progress_state["done"] = True
+    monitor_thread.join()
+
+    search.save_solution_to_file("final_solution_2.txt")
+    return best_solution, best_score, proven_optimal
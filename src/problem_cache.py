@@ -0,0 +1,284 @@
+import io
+import os
+import sys
+import array
+import struct
+import json
+import hashlib
+
+import models
+import input_parser
+import hard_constraints
+import compiled_problem
+from input_parser import read_input
+from compiled_problem import CompiledProblem, compile_problem
+
+# Bump FORMAT_VERSION whenever the file layout changes. What the arrays and the stored
+# objects hold is covered by CODE_DIGEST instead, so editing the code that derives
+# them rebuilds the caches without anyone having to remember to.
+MAGIC = b"SCPC"
+FORMAT_VERSION = 3
+# Directory, next to the input file, that load_problem keeps its caches in by default
+CACHE_DIRECTORY = ".compiled"
+
+# Header: magic, format version, byte order (0 little, 1 big) and item size of the int
+# arrays, SHA-256 of the input and of the code (CODE_DIGEST), offset and length of the
+# ParsedData as JSON (see encode_parsed_data), and the number of arrays. Each array
+# then has a table entry: name, offset and length of its values, and offset and length
+# of its offsets (0 for a flat array).
+HEADER = struct.Struct("<4sHBB32s32sQQI")
+ENTRY = struct.Struct("<32sQQQQ")
+TYPECODE = "i"
+ITEMSIZE = array.array(TYPECODE).itemsize
+ALIGNMENT = 8
+
+def code_digest(modules):
+    # SHA-256 of the source files of modules, in order.
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.digest()
+
+# SHA-256 of the code that decides what a cache holds: the parser and models behind the
+# stored objects and the compilation behind the arrays. Caches are keyed by it as well
+# as by the input.
+CODE_DIGEST = code_digest([models, input_parser, hard_constraints, compiled_problem])
+
+# The classes a cache may hold objects of. Loading a cache only ever makes instances of
+# these and sets their attributes to strings, numbers and references to each other, so
+# a planted cache file cannot run code the way a pickle could.
+MODEL_CLASSES = {cls.__name__: cls for cls in (
+    models.Game, models.Practice, models.GameSlot, models.PracticeSlot, models.Incompatible,
+    models.PairConstraint, models.Preference, models.Unwanted, models.PartialAssignments,
+)}
+
+def is_model(value):
+    return MODEL_CLASSES.get(type(value).__name__) is type(value)
+
+def is_plain(value):
+    return value is None or isinstance(value, (bool, int, float, str))
+
+def column_kind(values):
+    # How a column of attribute values is stored: as they are ("value"), as positions
+    # of model objects ("ref"), as lists of positions ("refs") or as tuples of plain
+    # values ("tuple"). Raises TypeError for values a cache cannot hold.
+    if all(map(is_plain, values)):
+        return "value"
+    if all(map(is_model, values)):
+        return "ref"
+    if all(isinstance(v, list) and all(map(is_model, v)) for v in values):
+        return "refs"
+    if all(isinstance(v, tuple) and all(map(is_plain, v)) for v in values):
+        return "tuple"
+    raise TypeError("Cannot cache these attribute values")
+
+def encode_parsed_data(parsed_data):
+    """
+    parsed_data as JSON bytes. The model objects are numbered class by class, in the
+    order of MODEL_CLASSES, and stored as one column per attribute and class; the
+    fields of parsed_data and attributes holding objects store their numbers, so
+    objects shared between lists stay shared.
+    """
+    objects = {name: [] for name in MODEL_CLASSES}
+    seen = set()
+    pending = [obj for field in vars(parsed_data).values() for obj in field]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        if not is_model(obj):
+            raise TypeError(f"Cannot cache a {type(obj).__name__}")
+        seen.add(id(obj))
+        objects[type(obj).__name__].append(obj)
+        for value in vars(obj).values():
+            if is_model(value):
+                pending.append(value)
+            elif isinstance(value, list):
+                pending.extend(value)
+
+    positions = {}
+    for group in objects.values():
+        for obj in group:
+            positions[id(obj)] = len(positions)
+
+    classes = {}
+    for name, group in objects.items():
+        if not group:
+            continue
+        attributes = list(vars(group[0]))
+        if any(vars(obj).keys() != vars(group[0]).keys() for obj in group):
+            raise TypeError(f"Cannot cache {name} objects with differing attributes")
+        columns, kinds = [], []
+        for attribute in attributes:
+            values = [obj.__dict__[attribute] for obj in group]
+            kind = column_kind(values)
+            if kind == "ref":
+                values = [positions[id(v)] for v in values]
+            elif kind == "refs":
+                values = [[positions[id(item)] for item in v] for v in values]
+            columns.append(values)
+            kinds.append(kind)
+        classes[name] = {"count": len(group), "attributes": attributes, "kinds": kinds, "columns": columns}
+    fields = {name: [positions[id(obj)] for obj in field] for name, field in vars(parsed_data).items()}
+    return json.dumps({"classes": classes, "fields": fields}, separators=(",", ":")).encode()
+
+def decode_parsed_data(blob):
+    # The ParsedData encode_parsed_data wrote as blob. The objects are made without
+    # calling __init__ and then given their attributes, so references in either
+    # direction resolve. Raises ValueError, KeyError, TypeError or IndexError on
+    # anything it did not write.
+    data = json.loads(bytes(blob))
+    classes = data["classes"]
+    table, groups = [], []
+    for name, cls in MODEL_CLASSES.items():
+        if name in classes:
+            group = [cls.__new__(cls) for _ in range(classes[name]["count"])]
+            groups.append((group, classes[name]))
+            table.extend(group)
+
+    for group, stored in groups:
+        columns = []
+        for kind, values in zip(stored["kinds"], stored["columns"]):
+            if len(values) != len(group):
+                raise ValueError("cache column has the wrong length")
+            if kind == "ref":
+                values = [table[k] for k in values]
+            elif kind == "refs":
+                values = [[table[k] for k in v] for v in values]
+            elif kind == "tuple":
+                values = list(map(tuple, values))
+            elif kind != "value":
+                raise ValueError(f"unknown cache column kind {kind!r}")
+            columns.append(values)
+        attributes = stored["attributes"]
+        for obj, values in zip(group, zip(*columns)):
+            obj.__dict__.update(zip(attributes, values))
+    return input_parser.ParsedData(**{name: [table[k] for k in field] for name, field in data["fields"].items()})
+
+def input_digest(data):
+    # SHA-256 of the input file's bytes; caches are keyed by it.
+    return hashlib.sha256(data).digest()
+
+def cache_path(file_path, digest, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIRECTORY)
+    return os.path.join(cache_dir, f"{digest.hex()}-{CODE_DIGEST.hex()[:16]}.bin")
+
+def save_compiled(path, digest, parsed_data, problem):
+    """
+    Write parsed_data and its compiled problem to path: the objects as JSON (see
+    encode_parsed_data), and every index CompiledProblem derives from them as flat int
+    arrays (see to_arrays), which load_compiled converts back with one bulk copy each
+    instead of deriving them again. The file is written under a temporary name and
+    renamed into place, so readers never see half a cache.
+    """
+    blob = encode_parsed_data(parsed_data)
+    columns = []
+    for name, data in problem.to_arrays().items():
+        values, offsets = data if isinstance(data, tuple) else (data, None)
+        columns.append((name, array.array(TYPECODE, values),
+                        None if offsets is None else array.array(TYPECODE, offsets)))
+
+    def aligned(position):
+        return -(-position // ALIGNMENT) * ALIGNMENT
+
+    # Lay the data out after the header and table, each piece aligned
+    position = HEADER.size + ENTRY.size * len(columns)
+    pieces, entries = [], []
+    blob_offset = position = aligned(position)
+    pieces.append((blob_offset, blob))
+    position = aligned(position + len(blob))
+    for name, values, offsets in columns:
+        values_offset = position
+        pieces.append((values_offset, values.tobytes()))
+        position = aligned(position + len(values) * values.itemsize)
+        offsets_offset, offsets_length = 0, 0
+        if offsets is not None:
+            offsets_offset, offsets_length = position, len(offsets)
+            pieces.append((offsets_offset, offsets.tobytes()))
+            position = aligned(position + len(offsets) * offsets.itemsize)
+        entries.append(ENTRY.pack(name.encode(), values_offset, len(values), offsets_offset, offsets_length))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == "big", ITEMSIZE,
+                            digest, CODE_DIGEST, blob_offset, len(blob), len(columns)))
+        f.write(b"".join(entries))
+        for offset, data in pieces:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(data)
+    os.replace(temporary, path)
+
+def load_compiled(path, digest):
+    """
+    Read a cache written by save_compiled, as (parsed_data, problem). The file is read
+    in one call, and each int array is cast in place from its bytes and copied once
+    into the lists CompiledProblem works on (see from_arrays). Returns None if there is
+    no cache at path, or it was written for other input, by other code or another
+    format version, or on a machine with other int arrays, or is damaged.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = memoryview(f.read())
+    except OSError:
+        return None
+
+    def piece(offset, length):
+        # Slicing stops quietly at the end of the data, so a cut-short file is caught here
+        if offset + length > len(data):
+            raise ValueError("cache file is truncated")
+        return data[offset:offset + length]
+
+    def ints(offset, length):
+        return piece(offset, length * ITEMSIZE).cast(TYPECODE)
+
+    try:
+        magic, version, big_endian, itemsize, stored_digest, stored_code, blob_offset, blob_length, n_columns = \
+            HEADER.unpack_from(data)
+        if (magic != MAGIC or version != FORMAT_VERSION or bool(big_endian) != (sys.byteorder == "big")
+                or itemsize != ITEMSIZE or stored_digest != digest or stored_code != CODE_DIGEST):
+            return None
+        parsed_data = decode_parsed_data(piece(blob_offset, blob_length))
+        arrays = {}
+        for k in range(n_columns):
+            name, values_offset, values_length, offsets_offset, offsets_length = \
+                ENTRY.unpack_from(data, HEADER.size + k * ENTRY.size)
+            values = ints(values_offset, values_length)
+            arrays[name.rstrip(b"\0").decode()] = \
+                values if offsets_offset == 0 else (values, ints(offsets_offset, offsets_length))
+        problem = CompiledProblem.from_arrays(parsed_data.games, parsed_data.practices,
+                                              parsed_data.game_slots, parsed_data.practice_slots, arrays)
+    except (struct.error, ValueError, TypeError, KeyError, IndexError, AttributeError, RecursionError):
+        return None
+    return parsed_data, problem
+
+def load_problem(file_path, cache_dir=None):
+    """
+    read_input and compile_problem for file_path, through a cache of the compiled
+    problem keyed by the SHA-256 of the file's contents and of the code (CODE_DIGEST). A
+    hit skips both; otherwise the input is parsed and compiled and the cache written,
+    so a changed input, or changed code, is rebuilt on its next load. Caches go in
+    cache_dir (by default CACHE_DIRECTORY next to the input). Returns (parsed_data,
+    problem).
+    """
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Error: File '{file_path}' not found.")
+    digest = input_digest(data)
+    path = cache_path(file_path, digest, cache_dir)
+    cached = load_compiled(path, digest)
+    if cached is not None:
+        return cached
+
+    parsed_data = read_input(io.StringIO(data.decode()))
+    problem = compile_problem(parsed_data)
+    try:
+        save_compiled(path, digest, parsed_data, problem)
+    except OSError:
+        # A read-only input directory only costs the next run a rebuild
+        pass
+    return parsed_data, problem
@@ -0,0 +1,145 @@
+class ScheduleState:
+    """
+    Mutable schedule that the search explores in place.
+
+    Items and slots are the dense ids of a CompiledProblem. Items are placed with
+    assign() and taken back with undo(), which pops a trail of (item, slot) moves in
+    LIFO order. Because the most recent move is always the last entry in its slot's
+    list, undoing is a list pop rather than a search. `slot_items` is the int view the
+    search works on; `solution` mirrors it as {slot: [items]} with the original objects
+    and is only copied when snapshot() is called, e.g. when a complete schedule becomes
+    the new best.
+
+    `hash` is the Zobrist hash of the current placements, updated with one XOR per move,
+    so two states with the same placements hash alike whatever order they were made in.
+
+    `item_slot` maps every item id to its slot id (None while unassigned), and the
+    unassigned games and practices are kept as sets, so "is this item placed" and
+    "is the schedule complete" never scan the slot lists.
+
+    Objects in `observers` (such as a PenaltyTracker) have on_assign(item, slot) and
+    on_unassign(item, slot) called after every move, so they can keep their own
+    incremental totals in step with the schedule.
+    """
+    def __init__(self, problem, solution, hash_bits=64):
+        self.problem = problem
+        self.zobrist = problem.zobrist_keys(hash_bits)
+        self.hash = 0
+        self.slot_items = [[] for _ in problem.slots]
+        self.solution = {slot: [] for slot in problem.slots}
+        self.item_slot = [None] * len(problem.items)
+        self.unassigned_games = set(problem.game_ids())
+        self.unassigned_practices = set(problem.practice_ids())
+        self.observers = []
+        # Start from the given solution; its assignments are not on the trail and so can
+        # never be undone.
+        for slot, items in solution.items():
+            s = problem.slot_index[slot]
+            for item in items:
+                i = problem.item_index.get(item)
+                if i is None:
+                    raise ValueError(f"Assigned item {item.id} is not part of the problem")
+                self.slot_items[s].append(i)
+                self.solution[problem.slots[s]].append(problem.items[i])
+                self._mark_assigned(i, s)
+        self.trail = []
+
+    def _mark_assigned(self, item, slot):
+        self.item_slot[item] = slot
+        self.hash ^= self.zobrist[item][slot]
+        if item < self.problem.n_games:
+            self.unassigned_games.discard(item)
+        else:
+            self.unassigned_practices.discard(item)
+
+    def assign(self, item, slot):
+        # Place item in slot and record the move so it can be undone.
+        self.slot_items[slot].append(item)
+        self.solution[self.problem.slots[slot]].append(self.problem.items[item])
+        self._mark_assigned(item, slot)
+        self.trail.append((item, slot))
+        for observer in self.observers:
+            observer.on_assign(item, slot)
+
+    def undo(self):
+        # Take back the most recent assignment.
+        item, slot = self.trail.pop()
+        self.slot_items[slot].pop()
+        self.solution[self.problem.slots[slot]].pop()
+        self.item_slot[item] = None
+        self.hash ^= self.zobrist[item][slot]
+        if item < self.problem.n_games:
+            self.unassigned_games.add(item)
+        else:
+            self.unassigned_practices.add(item)
+        for observer in self.observers:
+            observer.on_unassign(item, slot)
+        return item, slot
+
+    def remove(self, item):
+        # Take an assigned item out of its slot, whatever order it was placed in, and
+        # return that slot. Like place(), this is not recorded on the trail, so it is only
+        # for states that are never undone, such as the complete schedules local search
+        # works on.
+        slot = self.item_slot[item]
+        index = self.slot_items[slot].index(item)
+        del self.slot_items[slot][index]
+        del self.solution[self.problem.slots[slot]][index]
+        self.item_slot[item] = None
+        self.hash ^= self.zobrist[item][slot]
+        if item < self.problem.n_games:
+            self.unassigned_games.add(item)
+        else:
+            self.unassigned_practices.add(item)
+        for observer in self.observers:
+            observer.on_unassign(item, slot)
+        return slot
+
+    def place(self, item, slot):
+        # Put an unassigned item in slot without recording it on the trail (see remove).
+        self.slot_items[slot].append(item)
+        self.solution[self.problem.slots[slot]].append(self.problem.items[item])
+        self._mark_assigned(item, slot)
+        for observer in self.observers:
+            observer.on_assign(item, slot)
+
+    def is_assigned(self, item):
+        return self.item_slot[item] is not None
+
+    def is_complete(self):
+        # True once every game and practice has a slot.
+        return not self.unassigned_games and not self.unassigned_practices
+
+    def unassigned_game_ids(self):
+        # Unassigned game ids in id order, so ties are broken as in the item lists.
+        return sorted(self.unassigned_games)
+
+    def assigned_game_count(self):
+        return self.problem.n_games - len(self.unassigned_games)
+
+    def assigned_practice_count(self):
+        return len(self.problem.items) - self.problem.n_games - len(self.unassigned_practices)
+
+    def assignment_vector(self):
+        # The slot id of every item id (None while unassigned), as a hashable tuple.
+        return tuple(self.item_slot)
+
+    def mark(self):
+        # A position on the trail that undo_to() can later return to.
+        return len(self.trail)
+
+    def undo_to(self, mark):
+        while len(self.trail) > mark:
+            self.undo()
+
+    def moves_since(self, mark):
+        # The (item, slot) moves made after the given mark, oldest first.
+        return self.trail[mark:]
+
+    def apply(self, moves):
+        for item, slot in moves:
+            self.assign(item, slot)
+
+    def snapshot(self):
+        # Independent copy of the current {slot: [items]} solution.
+        return {slot: list(items) for slot, items in self.solution.items()}
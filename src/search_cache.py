@@ -0,0 +1,113 @@
+from collections import OrderedDict
+
+class BoundedCache:
+    """
+    Size-capped mapping with least-recently-used eviction and hit/miss counters.
+
+    Used for the search's visited states and hard-constraint results, keyed by the
+    ScheduleState's Zobrist hash, so memory stays flat however long the search runs.
+    An evicted entry only costs a recomputation (or a repeated visit). The keys are
+    hashes, not the states: two schedules with the same hash share an entry, so a
+    collision can skip an unvisited state or give one schedule the other's verdict.
+    With 64-bit hashes the chance of any collision among n states is about
+    n**2 / 2**65 (under 1e-7 for a million states); ANDTreeSearch's hash_bits=128
+    makes it negligible. maxsize=None disables eviction. It also works as a set
+    through add() and `in`, which is how the visited states use it.
+    """
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        entries = self.entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+        self.misses += 1
+        return default
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def __setitem__(self, key, value):
+        entries = self.entries
+        entries[key] = value
+        entries.move_to_end(key)
+        if self.maxsize is not None and len(entries) > self.maxsize:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def add(self, key):
+        self[key] = True
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        # Counters for logging, e.g. "visited: 1200 entries, 340 hits, 1200 misses, 0 evictions".
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+class NogoodStore:
+    """
+    Size-capped set of nogoods: tuples of (item, slot) placements that no valid schedule
+    contains all of, learned from the search's dead ends.
+
+    Each nogood is indexed under each of its placements, so after a move only the
+    nogoods mentioning one of the new placements need checking. Nogoods longer than
+    max_length are not kept, since they rarely match again; beyond maxsize the least
+    recently matched or learned nogood is dropped. A dropped nogood only costs search
+    time. Nogoods are stored as the placements themselves, not hashed, and find checks
+    every placement of a match, so unlike BoundedCache a hit is never a collision.
+    """
+    def __init__(self, maxsize=1 << 12, max_length=8):
+        self.maxsize = maxsize
+        self.max_length = max_length
+        self.entries = OrderedDict()
+        self.index = {}
+        self.hits = 0
+        self.evictions = 0
+
+    def add(self, nogood):
+        nogood = tuple(sorted(nogood))
+        if len(nogood) > self.max_length or nogood in self.entries:
+            return
+        self.entries[nogood] = True
+        for move in nogood:
+            self.index.setdefault(move, []).append(nogood)
+        if self.maxsize is not None and len(self.entries) > self.maxsize:
+            old, _ = self.entries.popitem(last=False)
+            for move in old:
+                watching = self.index[move]
+                watching.remove(old)
+                if not watching:
+                    del self.index[move]
+            self.evictions += 1
+
+    def find(self, moves, item_slot):
+        # A nogood that mentions one of moves and holds entirely in item_slot (a
+        # ScheduleState's item -> slot list), or None.
+        index = self.index
+        for move in moves:
+            for nogood in index.get(move, ()):
+                if all(item_slot[item] == slot for item, slot in nogood):
+                    self.hits += 1
+                    self.entries.move_to_end(nogood)
+                    return nogood
+        return None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.index.clear()
+
+    def stats(self):
+        return {"entries": len(self.entries), "hits": self.hits, "evictions": self.evictions}
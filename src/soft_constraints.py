@@ -136,4 +136,271 @@ def partial_soft_penalty(solution, weights, preferences, pairs, item_preferences
     penalty = 0
     for constraint in return_partial_soft_constraint_list():
         penalty += constraint(solution, weights, preferences, pairs, item_preferences, pairs_map)
-    return penalty
\ No newline at end of file
+    return penalty
+class PenaltyTracker:
+    """
+    Running soft-penalty totals for a ScheduleState, updated as items are assigned and
+    unassigned instead of being recomputed over the whole solution.
+
+    The tracker registers itself as an observer of the state and keeps unweighted counts
+    per constraint: slot minimum deficits, unmatched preference values, matched pairs and
+    same-tier/different-division pairs. Each update only touches the item's own slot,
+    preferences and pairs. Weights are applied when a penalty is queried, so they follow
+    the same [Wminfilled, Wpref, Wpair, Wsecdif, PENgamemin, PENpracticemin,
+    PENnotpaired, PENsection] layout as the functions above.
+
+    With debug=True every query is cross-checked against soft_penalty/partial_soft_penalty
+    on the state's object solution.
+    """
+    def __init__(self, problem, weights, preferences, pairs, debug=False):
+        self.problem = problem
+        self.weights = weights
+        self.preferences = preferences
+        self.pairs = pairs
+        self.debug = debug
+        self.state = None
+        slots = problem.slots
+
+        # Unmatched preference value of each item for each slot, built with the same
+        # item -> [(pday, ptime, pval)] map that preferences() uses
+        item_pref_map = {}
+        for p in preferences:
+            item_pref_map.setdefault(p.game_or_practice, []).append((p.slot_day, p.slot_time, float(p.preference_value)))
+        self.pref_cost = [None] * len(problem.items)
+        for i, item in enumerate(problem.items):
+            prefs = item_pref_map.get(item)
+            if prefs:
+                self.pref_cost[i] = [
+                    sum(pval for pday, ptime, pval in prefs if pday != slot.day or abs(ptime - slot.start_time) > 1e-9)
+                    for slot in slots
+                ]
+
+        # Pair endpoints resolved to item ids (None if the item is not in the problem)
+        self.pair_items = []
+        self.item_pairs = [[] for _ in problem.items]
+        for k, pair_obj in enumerate(pairs):
+            ends = tuple(problem.item_index.get(it) for it in (pair_obj.game_or_practice1, pair_obj.game_or_practice2))
+            self.pair_items.append(ends)
+            for i in set(ends):
+                if i is not None:
+                    self.item_pairs[i].append(k)
+
+        # Items of the same league and tier share a section
+        sections = {}
+        self.item_section = [sections.setdefault((it.league, it.tier), len(sections)) for it in problem.items]
+        self.reset()
+
+    def reset(self):
+        # Counts for an empty schedule.
+        problem = self.problem
+        n_slots = len(problem.slots)
+        self.item_slot = [None] * len(problem.items)
+        self.slot_count = [0] * n_slots
+        self.section_count = [{} for _ in range(n_slots)]
+        self.key_count = [{} for _ in range(n_slots)]
+        self.game_deficit = sum(problem.slot_min[s] for s in problem.game_slot_ids() if problem.slot_min[s] > 0)
+        self.practice_deficit = sum(problem.slot_min[s] for s in problem.practice_slot_ids() if problem.slot_min[s] > 0)
+        self.pref_total = 0.0
+        self.pair_ok = [False] * len(self.pairs)
+        self.matched_pairs = 0
+        self.section_pairs = 0
+
+    def attach(self, state):
+        # Start tracking state: count its current assignments and follow later moves.
+        self.reset()
+        self.state = state
+        for slot, assigns in enumerate(state.slot_items):
+            for item in assigns:
+                self.on_assign(item, slot)
+        state.observers.append(self)
+
+    def on_assign(self, item, slot):
+        problem = self.problem
+        self.item_slot[item] = slot
+        count = self.slot_count[slot]
+        if count < problem.slot_min[slot]:
+            if problem.slot_is_game[slot]:
+                self.game_deficit -= 1
+            else:
+                self.practice_deficit -= 1
+        self.slot_count[slot] = count + 1
+
+        cost = self.pref_cost[item]
+        if cost is not None:
+            self.pref_total += cost[slot]
+
+        # Every item already in the slot with the same section but another division is a pair
+        section, key = self.item_section[item], problem.item_key[item]
+        sections, keys = self.section_count[slot], self.key_count[slot]
+        self.section_pairs += sections.get(section, 0) - keys.get(key, 0)
+        sections[section] = sections.get(section, 0) + 1
+        keys[key] = keys.get(key, 0) + 1
+
+        for k in self.item_pairs[item]:
+            self._update_pair(k)
+
+    def on_unassign(self, item, slot):
+        problem = self.problem
+        self.item_slot[item] = None
+        count = self.slot_count[slot] - 1
+        self.slot_count[slot] = count
+        if count < problem.slot_min[slot]:
+            if problem.slot_is_game[slot]:
+                self.game_deficit += 1
+            else:
+                self.practice_deficit += 1
+
+        cost = self.pref_cost[item]
+        if cost is not None:
+            self.pref_total -= cost[slot]
+
+        section, key = self.item_section[item], problem.item_key[item]
+        sections, keys = self.section_count[slot], self.key_count[slot]
+        sections[section] -= 1
+        keys[key] -= 1
+        self.section_pairs -= sections[section] - keys[key]
+
+        for k in self.item_pairs[item]:
+            self._update_pair(k)
+
+    def _update_pair(self, k):
+        # Re-evaluate whether both items of pair k are at the same day and time.
+        i1, i2 = self.pair_items[k]
+        ok = False
+        if i1 is not None and i2 is not None:
+            s1, s2 = self.item_slot[i1], self.item_slot[i2]
+            if s1 is not None and s2 is not None:
+                slot1, slot2 = self.problem.slots[s1], self.problem.slots[s2]
+                ok = is_matching_day(slot1.day, slot2.day) and abs(slot1.start_time - slot2.start_time) < 1e-9
+        if ok != self.pair_ok[k]:
+            self.pair_ok[k] = ok
+            self.matched_pairs += 1 if ok else -1
+
+    def item_signature(self, item):
+        # What the soft constraints know about an item beyond the CompiledProblem: its
+        # section, preference costs and pair partners. Items with equal signatures score
+        # the same wherever they are swapped.
+        partners = sorted((i1 if i2 == item else i2) if None not in (i1, i2) else -1
+                          for i1, i2 in (self.pair_items[k] for k in self.item_pairs[item]))
+        cost = self.pref_cost[item]
+        return (self.item_section[item], None if cost is None else tuple(cost), tuple(partners))
+
+    def slot_signature(self, slot):
+        # What the soft constraints know about a slot: every item's preference cost there
+        # and, when there are pairs, the other slots at the same day and time.
+        problem = self.problem
+        costs = tuple(cost[slot] if cost is not None else None for cost in self.pref_cost)
+        matching = ()
+        if self.pairs:
+            this = problem.slots[slot]
+            matching = tuple(s for s, other in enumerate(problem.slots)
+                             if s != slot and is_matching_day(this.day, other.day)
+                             and abs(this.start_time - other.start_time) < 1e-9)
+        return (costs, matching)
+
+    def partial_penalty(self, weights=None):
+        # Same value as partial_soft_penalty: preferences, pairs and section differences.
+        weights = self.weights if weights is None else weights
+        # Like preferences(), only contribute a float once some preference is unmatched
+        penalty = weights[1] * self.pref_total if self.pref_total else 0
+        if self.pairs:
+            penalty += (len(self.pairs) - self.matched_pairs) * weights[2] * weights[6]
+        penalty += self.section_pairs * weights[7] * weights[3]
+        if self.debug:
+            self._cross_check(penalty, partial_soft_penalty, weights)
+        return penalty
+
+    def penalty(self, weights=None):
+        # Same value as soft_penalty: the partial penalty plus unfilled slot minimums.
+        weights = self.weights if weights is None else weights
+        penalty = (self.game_deficit * weights[4] + self.practice_deficit * weights[5]) * weights[0]
+        penalty += self.partial_penalty(weights)
+        if self.debug:
+            self._cross_check(penalty, soft_penalty, weights)
+        return penalty
+
+    def _cross_check(self, penalty, reference, weights):
+        expected = reference(self.state.solution, weights, self.preferences, self.pairs)
+        if abs(expected - penalty) > 1e-6:
+            raise AssertionError(f"PenaltyTracker total {penalty} does not match {reference.__name__} = {expected}")
+
+class RemainingCostBound:
+    """
+    Optimistic estimate of the soft penalty that the still unassigned items will add
+    on top of PenaltyTracker.partial_penalty(). The search prunes a node when
+    partial + sum of its bounds >= the best score, so an estimate must never exceed
+    what any completion of the state can actually cost.
+
+    Subclasses override estimate(); bounds that keep running totals can also define
+    on_assign/on_unassign, since attach() registers them as observers of the state.
+    """
+    def attach(self, state, tracker):
+        self.state = state
+        self.tracker = tracker
+        if hasattr(self, "on_assign"):
+            state.observers.append(self)
+
+    def estimate(self, weights):
+        return 0
+
+class PreferenceBound(RemainingCostBound):
+    # Every unassigned item will pay at least its cheapest unmatched-preference cost over
+    # the slots it could ever be placed in.
+    def attach(self, state, tracker):
+        problem = state.problem
+        self.min_cost = [0] * len(problem.items)
+        for item, cost in enumerate(tracker.pref_cost):
+            if cost is not None:
+                candidates = problem.candidate_slots(item)
+                self.min_cost[item] = min((cost[s] for s in candidates), default=0)
+        self.remaining = sum(self.min_cost[i] for i in state.unassigned_games | state.unassigned_practices)
+        super().attach(state, tracker)
+
+    def on_assign(self, item, slot):
+        self.remaining -= self.min_cost[item]
+
+    def on_unassign(self, item, slot):
+        self.remaining += self.min_cost[item]
+
+    def estimate(self, weights):
+        return weights[1] * self.remaining if self.remaining else 0
+
+class MinFilledBound(RemainingCostBound):
+    # Each unassigned game or practice can lower its kind's slot-minimum deficit by at
+    # most one, so whatever deficit exceeds the unassigned count will remain.
+    def estimate(self, weights):
+        games_short = self.tracker.game_deficit - len(self.state.unassigned_games)
+        practices_short = self.tracker.practice_deficit - len(self.state.unassigned_practices)
+        return (max(0, games_short) * weights[4] + max(0, practices_short) * weights[5]) * weights[0]
+
+class PairBound(RemainingCostBound):
+    # partial_penalty() counts a pair as unmatched while one of its items is still
+    # unassigned. Those pairs may yet be matched, so their penalty is credited back,
+    # making the estimate negative but keeping partial + bound a true lower bound.
+    def attach(self, state, tracker):
+        self.pending = [False] * len(tracker.pairs)
+        self.pending_count = 0
+        super().attach(state, tracker)
+        for k in range(len(tracker.pairs)):
+            self._update(k)
+
+    def _update(self, k):
+        i1, i2 = self.tracker.pair_items[k]
+        item_slot = self.tracker.item_slot
+        pending = i1 is not None and i2 is not None and (item_slot[i1] is None or item_slot[i2] is None)
+        if pending != self.pending[k]:
+            self.pending[k] = pending
+            self.pending_count += 1 if pending else -1
+
+    def on_assign(self, item, slot):
+        for k in self.tracker.item_pairs[item]:
+            self._update(k)
+
+    on_unassign = on_assign
+
+    def estimate(self, weights):
+        return -self.pending_count * weights[2] * weights[6]
+
+def default_bounds():
+    # Bounds the search uses unless it is given its own list.
+    return [PreferenceBound(), MinFilledBound(), PairBound()]
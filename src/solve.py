@@ -0,0 +1,174 @@
+import os
+import cProfile
+
+from input_parser import read_input
+from problem_cache import load_problem
+from and_tree import ANDTreeSearch, setup_logger
+from warm_start import run_from_solution
+from lns import run_lns
+from portfolio import run_portfolio
+from parallel_search import run_parallel_search
+
+def run_for_file(file_path, weights = [0, 0, 0, 1, 1, 1, 0, 5], processes=None, portfolio=False, time_limit=None, lns=False,
+                 cache=True, cache_dir=None, initial_solution=None):
+    # Utility function to run the search for a given file and weights.
+    # With processes > 1 the subtrees below the first assignments are searched by that
+    # many worker processes (parallel_search.run_parallel_search). With portfolio=True
+    # the configurations in portfolio.PORTFOLIO race each other instead. time_limit
+    # (seconds) stops the search early with the best schedule found so far.
+    # With lns=True a first schedule is improved by large neighbourhood search for
+    # time_limit seconds (60 by default).
+    # The parsed and compiled input is cached on disk by content hash (see
+    # problem_cache.load_problem), so solving the same file again with other weights
+    # skips both; cache=False always parses and compiles afresh.
+    # initial_solution names a schedule file from an earlier run (e.g. on last week's
+    # input): its still valid part is kept, the rest repaired, and the result improved
+    # by large neighbourhood search for time_limit seconds (see warm_start).
+    if cache:
+        parsed_data, problem = load_problem(file_path, cache_dir)
+    else:
+        parsed_data, problem = read_input(file_path), None
+
+    logger, listener = setup_logger("debug.log")
+
+    search = ANDTreeSearch(
+        games=parsed_data.games,
+        practices=parsed_data.practices,
+        game_slots=parsed_data.game_slots,
+        practice_slots=parsed_data.practice_slots,
+        incompatibilities=parsed_data.incompatibilities,
+        partial_assignments=parsed_data.partial_assignments,
+        weights=weights,
+        preferences=parsed_data.preferences,
+        pairs=parsed_data.pair,
+        unwanted=parsed_data.unwanted,
+        logger=logger,
+        problem=problem
+    )
+
+    if initial_solution is not None:
+        best_solution, best_score = run_from_solution(search, initial_solution, time_limit=time_limit)
+    elif lns:
+        best_solution, best_score = run_lns(search, time_limit=60.0 if time_limit is None else time_limit)
+    elif portfolio:
+        best_solution, best_score, _ = run_portfolio(search, time_limit=time_limit)
+    elif processes and processes > 1:
+        best_solution, best_score = run_parallel_search(search, processes, time_limit=time_limit)
+    else:
+        best_solution, best_score = search.run_search(time_limit=time_limit)
+    listener.stop()
+    return best_solution, best_score
+
+if __name__ == "__main__":
+
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "inputs", "large_2.txt")
+    cProfile.run('run_for_file(file_path, [1, 1, 1, 1, 1, 1, 1, 1])', sort='time')
+    # Loop through hc1.txt to hc12.txt.
+    # script_dir = os.path.dirname(os.path.abspath(__file__))
+    # for i in range(1, 13):
+    #     filename = f"hc{i}.txt"
+    #     file_path = os.path.join(script_dir, "..", "inputs", filename)
+    #     print(f"Running {filename}...")
+    #     best_solution, best_score = run_for_file(file_path)
+
+
+    #     # All other hc files should produce no valid solution found.
+    #     if best_solution is not None:
+    #         print(f"ERROR: {filename} found a solution when it shouldn't have.")
+    #     else:
+    #         print(f"{filename} correctly returned no valid solution found.")
+
+    # # Define the test cases based on your known reference outputs and parameter settings
+    # test_cases = [
+    #     {
+    #         "filename": "pairing.txt",
+    #         "weights": [0, 0, 1, 0, 0, 0, 11, 0],  # [w_minfilled, w_pref, w_pair, w_secdiff, pengamemin, penpracticemin, pennotpaired, pensection]
+    #         "expected_eval": 55,
+    #     },
+    #     {
+    #         "filename": "minnumber.txt",
+    #         "weights": [1, 0, 0, 0, 100, 100, 0, 10],
+    #         "expected_eval": 0,
+    #     },
+    #     {
+    #         "filename": "parallelpen.txt",
+    #         "weights": [0, 0, 0, 1, 1, 1, 0, 5],
+    #         "expected_eval": 5,
+    #     },
+    #     {
+    #         "filename": "prefexamp.txt",
+    #         "weights": [0, 1, 0, 0, 100, 100, 0, 100],
+    #         "expected_eval": 30,  # Insert the expected value if known
+    #     }
+    # ]
+
+    # # Assuming your files are in a directory ../inputs relative to this script
+    # script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    # for test_case in test_cases:
+    #     filename = test_case["filename"]
+    #     weights = test_case["weights"]
+    #     file_path = os.path.join(script_dir, "..", "inputs", filename)
+
+    #     print(f"Running {filename} with weights={weights}...")
+    #     best_solution, best_score = run_for_file(file_path, weights)
+
+    #     if best_solution is None:
+    #         print(f"No valid solution found for {filename}.")
+    #     else:
+    #         print(f"Solution found for {filename} with Eval-value: {best_score}")
+
+    #         # If you have an expected_eval value, compare it
+    #         expected_eval = test_case.get("expected_eval")
+    #         if expected_eval is not None:
+    #             if best_score == expected_eval:
+    #                 print(f"{filename}: Eval value matches expected result ({expected_eval}).")
+    #             else:
+    #                 print(f"{filename}: Eval value ({best_score}) does NOT match expected ({expected_eval}).")
+
+    #     print()  # Blank line for readability
+    
+    
+    # import argparse
+    # parser = argparse.ArgumentParser(description="Process and calculate scores based on weights and penalties.")
+    # parser.add_argument("filename", type=str, help="The file to process.")
+    # parser.add_argument("wminfilled", type=float, help="Weight for minimal filled sections.")
+    # parser.add_argument("wpref", type=float, help="Weight for preferred options.")
+    # parser.add_argument("wpair", type=float, help="Weight for paired options.")
+    # parser.add_argument("wsecdiff", type=float, help="Weight for section differences.")
+    # parser.add_argument("pengamemin", type=float, help="Penalty for engagement minimum not met.")
+    # parser.add_argument("penpracticemin", type=float, help="Penalty for practice minimum not met.")
+    # parser.add_argument("pennotpaired", type=float, help="Penalty for not paired sections.")
+    # parser.add_argument("pensection", type=float, help="Penalty for an entire section issue.")
+
+    # # Parse arguments
+    # args = parser.parse_args()
+
+    # file_path = args.filename
+    # Wminfilled = args.wminfilled
+    # Wpref = args.wpref
+    # Wpair = args.wpair
+    # Wsecdif = args.wsecdiff
+    # PENgamemin = args.pengamemin
+    # PENpracticemin = args.penpracticemin
+    # PENnotpaired = args.pennotpaired
+    # PENsection = args.pensection
+
+    # weights =  [Wminfilled, Wpref, Wpair, Wsecdif, PENgamemin, PENpracticemin, PENnotpaired, PENsection]
+
+    # parsed_data = read_input(file_path)
+
+    # search = ANDTreeSearch(
+    #     games=parsed_data.games,
+    #     practices=parsed_data.practices,
+    #     game_slots=parsed_data.game_slots,
+    #     practice_slots=parsed_data.practice_slots,
+    #     incompatibilities=parsed_data.incompatibilities,
+    #     partial_assignments=parsed_data.partial_assignments,
+    #     weights=weights,
+    #     preferences=parsed_data.preferences,
+    #     pairs=parsed_data.pair,
+    #     unwanted=parsed_data.unwanted,
+    # )
+
+    # search.run_search()
\ No newline at end of file
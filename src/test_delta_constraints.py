@@ -0,0 +1,233 @@
+import random
+import unittest
+from models import Game, Practice, GameSlot, PracticeSlot, Incompatible, Unwanted
+from hard_constraints import satisfies_hard_constraints, check_assignment_delta, check_compiled_assignment, SlotOverlapIndex, slots_overlap
+from compiled_problem import CompiledProblem
+from schedule_state import ScheduleState
+from domain_store import DomainStore
+
+LEAGUE_TIERS = [
+    ("CMSA", "U12T1"), ("CMSA", "U12T1S"), ("CMSA", "U13T1"), ("CMSA", "U13T1S"),
+    ("CMSA", "U13T3"), ("CMSA", "U15T1"), ("CMSA", "U17T1"), ("CUSA", "O18"), ("CUSA", "U19T1"),
+]
+
+def build_incompat_map(incompatibilities):
+    # Same construction as ANDTreeSearch.__init__
+    incompat_map = {}
+    for inc in incompatibilities:
+        i1, i2 = inc.game_or_practice1, inc.game_or_practice2
+        incompat_map.setdefault(i1, set()).add(i2)
+        incompat_map.setdefault(i2, set()).add(i1)
+    return incompat_map
+
+def random_problem(rng):
+    """
+    Build a random set of items, slots and hard constraints that exercises every rule:
+    CMSA special tiers, U15-U19 games, late divisions, the TR 11:00 slot and wildcard practices.
+    """
+    games = []
+    for i in range(rng.randint(4, 9)):
+        league, tier = rng.choice(LEAGUE_TIERS)
+        division = rng.choice(["01", "02", "91"])
+        games.append(Game(f"Game {i}", league, tier, division))
+    practices = []
+    for i in range(rng.randint(3, 8)):
+        if rng.random() < 0.6:
+            base = rng.choice(games)
+            league, tier, division = base.league, base.tier, base.division
+        else:
+            league, tier = rng.choice(LEAGUE_TIERS)
+            division = rng.choice([0, 1, 2])
+        practices.append(Practice(f"Practice {i}", league, tier, division, rng.choice(["PRC 01", "OPN 02"])))
+
+    game_slots = []
+    for i, (day, time) in enumerate(rng.sample([("MO", "8:00"), ("MO", "9:00"), ("MO", "18:00"), ("TU", "9:30"),
+                                                 ("TU", "11:00"), ("TU", "18:00")], rng.randint(3, 6))):
+        game_slots.append(GameSlot(f"GS {i}", day, time, rng.randint(1, 3), 0))
+    practice_slots = []
+    for i, (day, time) in enumerate(rng.sample([("MO", "8:00"), ("MO", "18:00"), ("TU", "10:00"), ("TU", "18:00"),
+                                                 ("FR", "8:00"), ("FR", "18:00")], rng.randint(3, 6))):
+        practice_slots.append(PracticeSlot(f"PS {i}", day, time, rng.randint(1, 3), 0))
+
+    items = games + practices
+    incompatibilities = []
+    for i in range(rng.randint(0, 6)):
+        a, b = rng.sample(items, 2)
+        incompatibilities.append(Incompatible(i, a, b))
+    unwanted = []
+    for i in range(rng.randint(0, 4)):
+        item = rng.choice(items)
+        slot = rng.choice(game_slots if isinstance(item, Game) else practice_slots)
+        day = {"MWF": "MO", "MW": "MO", "TR": "TU", "F": "FR"}[slot.day]
+        hours = int(slot.start_time)
+        minutes = int(round((slot.start_time - hours) * 60))
+        unwanted.append(Unwanted(i, item, day, f"{hours}:{minutes:02}"))
+    return games, practices, game_slots, practice_slots, incompatibilities, unwanted
+
+class TestCheckAssignmentDelta(unittest.TestCase):
+    def test_delta_matches_full_check_on_random_schedules(self):
+        """
+        Grow random valid schedules and compare the delta check against the full
+        satisfies_hard_constraints call for every candidate item/slot placement.
+        """
+        rng = random.Random(433)
+        compared = 0
+        for _ in range(60):
+            games, practices, game_slots, practice_slots, incompatibilities, unwanted = random_problem(rng)
+            incompat_map = build_incompat_map(incompatibilities)
+            overlap_index = SlotOverlapIndex(game_slots, practice_slots)
+            solution = {slot: [] for slot in game_slots + practice_slots}
+            unassigned = games + practices
+            rng.shuffle(unassigned)
+
+            for _ in range(len(unassigned)):
+                for item in games + practices:
+                    for slot in solution:
+                        hypo = {key: list(value) for key, value in solution.items()}
+                        hypo[slot].append(item)
+                        expected = satisfies_hard_constraints(hypo, incompatibilities, unwanted, incompat_map)
+                        actual = check_assignment_delta(item, slot, solution, unwanted, incompat_map)
+                        self.assertEqual(expected, actual, f"Mismatch placing {item.id} in {slot.id}")
+                        self.assertEqual(expected, satisfies_hard_constraints(hypo, incompatibilities, unwanted, incompat_map, overlap_index))
+                        self.assertEqual(expected, check_assignment_delta(item, slot, solution, unwanted, incompat_map, overlap_index))
+                        compared += 1
+
+                # Extend the base schedule with a random valid placement, if any
+                item = unassigned.pop()
+                slots = game_slots if isinstance(item, Game) else practice_slots
+                valid = [s for s in slots if check_assignment_delta(item, s, solution, unwanted, incompat_map)]
+                if valid:
+                    solution[rng.choice(valid)].append(item)
+                self.assertTrue(satisfies_hard_constraints(solution, incompatibilities, unwanted, incompat_map))
+        self.assertGreater(compared, 1000)
+
+    def test_delta_detects_each_rule(self):
+        """
+        Spot-check individual rules the delta check must catch.
+        """
+        game = Game("Game 1", "CMSA", "U12T1", "01")
+        special = Practice("Special", "CMSA", "U12T1S", "01", "")
+        late = Game("Game 2", "CMSA", "U13T3", "91")
+        monday = GameSlot("GS 1", "MO", "8:00", 1, 0)
+        morning = GameSlot("GS 2", "MO", "9:00", 2, 0)
+        evening = GameSlot("GS 3", "MO", "18:00", 1, 0)
+        practice_slot = PracticeSlot("PS 1", "MO", "8:00", 2, 0)
+        solution = {monday: [game], morning: [], evening: [], practice_slot: []}
+
+        # Capacity of the slot being filled
+        self.assertFalse(check_assignment_delta(late, monday, solution, [], {}))
+        # Late division before 18:00
+        self.assertFalse(check_assignment_delta(late, morning, solution, [], {}))
+        self.assertTrue(check_assignment_delta(late, evening, solution, [], {}))
+        # Unwanted slot for this item
+        unwanted = [Unwanted("Unwanted 1", late, "MO", "18:00")]
+        self.assertFalse(check_assignment_delta(late, evening, solution, unwanted, {}))
+        # Special CMSA practice overlapping its game
+        self.assertFalse(check_assignment_delta(special, practice_slot, solution, [], {}))
+        # Incompatible items in overlapping game/practice slots
+        practice = Practice("Practice 1", "CUSA", "O18", "01", "PRC 01")
+        incompat_map = {game: {practice}, practice: {game}}
+        self.assertFalse(check_assignment_delta(practice, practice_slot, solution, [], incompat_map))
+        self.assertTrue(check_assignment_delta(practice, practice_slot, solution, [], {}))
+
+class TestCompiledAssignment(unittest.TestCase):
+    def test_compiled_check_matches_object_check(self):
+        """
+        Grow random valid schedules in both representations and compare the integer-id
+        check against check_assignment_delta for every candidate placement.
+        """
+        rng = random.Random(1201)
+        compared = 0
+        for _ in range(60):
+            games, practices, game_slots, practice_slots, incompatibilities, unwanted = random_problem(rng)
+            incompat_map = build_incompat_map(incompatibilities)
+            problem = CompiledProblem(games, practices, game_slots, practice_slots, incompatibilities, unwanted)
+            solution = {slot: [] for slot in game_slots + practice_slots}
+            slot_items = [[] for _ in problem.slots]
+            unassigned = list(range(len(problem.items)))
+            rng.shuffle(unassigned)
+
+            for _ in range(len(unassigned)):
+                for i, item in enumerate(problem.items):
+                    for s, slot in enumerate(problem.slots):
+                        expected = check_assignment_delta(item, slot, solution, unwanted, incompat_map)
+                        self.assertEqual(expected, check_compiled_assignment(problem, i, s, slot_items),
+                                         f"Mismatch placing {item.id} in {slot.id}")
+                        compared += 1
+
+                i = unassigned.pop()
+                slots = problem.game_slot_ids() if problem.item_is_game[i] else problem.practice_slot_ids()
+                valid = [s for s in slots if check_compiled_assignment(problem, i, s, slot_items)]
+                if valid:
+                    s = rng.choice(valid)
+                    slot_items[s].append(i)
+                    solution[problem.slots[s]].append(problem.items[i])
+        self.assertGreater(compared, 1000)
+
+    def test_candidate_slots_match_object_check(self):
+        """
+        An item's candidate slots are the slots of its kind that check_assignment_delta
+        allows in an empty schedule, where only the rules about the item and slot alone
+        can fail.
+        """
+        rng = random.Random(1202)
+        for _ in range(60):
+            games, practices, game_slots, practice_slots, incompatibilities, unwanted = random_problem(rng)
+            incompat_map = build_incompat_map(incompatibilities)
+            problem = CompiledProblem(games, practices, game_slots, practice_slots, incompatibilities, unwanted)
+            solution = {slot: [] for slot in game_slots + practice_slots}
+            for i, item in enumerate(problem.items):
+                slots = problem.game_slot_ids() if problem.item_is_game[i] else problem.practice_slot_ids()
+                expected = [s for s in slots
+                            if check_assignment_delta(item, problem.slots[s], solution, unwanted, incompat_map)]
+                self.assertEqual(problem.candidate_slots(i), expected)
+
+class TestDomainStore(unittest.TestCase):
+    def test_domains_match_brute_force(self):
+        """
+        Through random valid assignments and undos, every unassigned item's domain is
+        exactly the set of slots the compiled check accepts.
+        """
+        rng = random.Random(2024)
+        for _ in range(40):
+            games, practices, game_slots, practice_slots, incompatibilities, unwanted = random_problem(rng)
+            problem = CompiledProblem(games, practices, game_slots, practice_slots, incompatibilities, unwanted)
+            state = ScheduleState(problem, {slot: [] for slot in problem.slots})
+            store = DomainStore(problem)
+            store.attach(state)
+            for _ in range(40):
+                # Pick moves without reading the store, so several moves can queue up
+                unassigned = sorted(state.unassigned_games | state.unassigned_practices)
+                placeable = [(i, s) for i in unassigned for s in range(len(problem.slots))
+                             if problem.item_is_game[i] == problem.slot_is_game[s]
+                             and check_compiled_assignment(problem, i, s, state.slot_items)]
+                if state.trail and (not placeable or rng.random() < 0.35):
+                    state.undo()
+                elif placeable:
+                    state.assign(*rng.choice(placeable))
+                if rng.random() < 0.5:
+                    continue
+                unassigned = sorted(state.unassigned_games | state.unassigned_practices)
+                for i in unassigned:
+                    slots = problem.game_slot_ids() if problem.item_is_game[i] else problem.practice_slot_ids()
+                    expected = {s for s in slots if check_compiled_assignment(problem, i, s, state.slot_items)}
+                    self.assertEqual(store.domain(i), expected)
+                self.assertEqual(store.has_dead_end(), any(not store.domain(i) for i in unassigned))
+
+class TestSlotOverlapIndex(unittest.TestCase):
+    def test_index_matches_pairwise_overlap(self):
+        """
+        The index must report exactly the game/practice slot pairs that overlap.
+        """
+        rng = random.Random(7)
+        for _ in range(20):
+            _, _, game_slots, practice_slots, _, _ = random_problem(rng)
+            index = SlotOverlapIndex(game_slots, practice_slots)
+            for gs in game_slots:
+                expected = {ps for ps in practice_slots if slots_overlap(gs, ps)}
+                self.assertEqual(set(index.overlapping(gs)), expected)
+                for ps in practice_slots:
+                    self.assertEqual(index.overlaps(ps, gs), ps in expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,1009 @@
+import io
+import os
+import pickle
+import queue
+import random
+import logging
+import multiprocessing
+import tempfile
+import unittest
+import and_tree
+import problem_cache
+from and_tree import ANDTreeSearch
+from input_parser import read_input, read_solution, determine_game_or_practice
+from hard_constraints import satisfies_hard_constraints
+from soft_constraints import soft_penalty, partial_soft_penalty
+from schedule_state import ScheduleState
+from compiled_problem import CompiledProblem, ARRAY_FIELDS, RAGGED_FIELDS
+from problem_cache import load_problem, load_compiled, cache_path, input_digest
+from search_cache import BoundedCache, NogoodStore
+from parallel_search import run_parallel_search, run_work_stealing_search, WorkSharing
+from portfolio import run_portfolio, PORTFOLIO
+from local_search import LocalSearch
+from lns import LargeNeighbourhoodSearch, run_lns
+from best_first import best_first_search, run_best_first
+from grasp import construct, run_grasp, run_grasp_search
+from batch_solve import solve_many, WeightSweep
+from warm_start import load_solution, run_from_solution
+from soft_constraints import PenaltyTracker
+from models import Game, GameSlot
+
+SEARCH_INPUT = """\
+Name:
+SearchTest
+
+Game slots:
+MO, 8:00, 3, 2
+MO, 9:00, 3, 2
+TU, 9:30, 2, 1
+TU, 18:00, 2, 1
+
+Practice slots:
+MO, 8:00, 4, 2
+TU, 10:00, 2, 1
+FR, 10:00, 2, 1
+TU, 18:00, 2, 1
+
+Games:
+CMSA U13T3 DIV 01
+CMSA U13T3 DIV 02
+CUSA O18 DIV 01
+CMSA U17T1 DIV 01
+CMSA U17T1 DIV 91
+CUSA O35T1 DIV 02
+
+Practices:
+CMSA U13T3 DIV 01 PRC 01
+CMSA U13T3 DIV 02 OPN 02
+CUSA O18 DIV 01 PRC 01
+CMSA U17T1 PRC 01
+CUSA O35T1 DIV 02 PRC 01
+
+Not compatible:
+CMSA U13T3 DIV 01, CMSA U13T3 DIV 02
+CMSA U17T1 DIV 01, CMSA U13T3 DIV 01
+
+Unwanted:
+CMSA U13T3 DIV 01, MO, 8:00
+
+Preferences:
+TU, 9:30, CMSA U13T3 DIV 01, 10
+MO, 8:00, CMSA U13T3 DIV 01 PRC 01, 3
+MO, 9:00, CUSA O35T1 DIV 02, 6
+
+Pair:
+CUSA O18 DIV 01, CMSA U17T1 DIV 01
+CMSA U13T3 DIV 02, CUSA O35T1 DIV 02 PRC 01
+
+Partial assignments:
+CMSA U17T1 PRC 01, FR, 10:00
+
+"""
+
+WEIGHTS = [1, 0, 1, 1, 2, 1, 3, 5]
+
+# Games of one tier with nothing else telling them apart, for symmetry breaking
+SYMMETRY_INPUT = """\
+Name:
+SymmetryTest
+
+Game slots:
+MO, 8:00, 2, 0
+MO, 9:00, 2, 1
+MO, 10:00, 2, 0
+MO, 17:00, 2, 0
+TU, 8:00, 2, 0
+TU, 9:30, 2, 0
+TU, 14:00, 2, 0
+
+Practice slots:
+FR, 8:00, 3, 0
+FR, 18:00, 3, 0
+TU, 10:00, 3, 0
+
+Games:
+CUSA O18 DIV 01
+CUSA O18 DIV 02
+CUSA O18 DIV 03
+CUSA O18 DIV 04
+CUSA O18 DIV 05
+CUSA O18 DIV 06
+CUSA O18 DIV 07
+CUSA O18 DIV 08
+CMSA U13T3 DIV 01
+CMSA U13T3 DIV 02
+CMSA U13T3 DIV 03
+
+Practices:
+
+Not compatible:
+
+Unwanted:
+
+Preferences:
+MO, 10:00, CUSA O18 DIV 07, 1
+MO, 17:00, CUSA O18 DIV 01, 2
+
+Pair:
+
+Partial assignments:
+
+"""
+
+def build_search(parsed_data, weights=WEIGHTS, **kwargs):
+    return ANDTreeSearch(
+        games=parsed_data.games,
+        practices=parsed_data.practices,
+        game_slots=parsed_data.game_slots,
+        practice_slots=parsed_data.practice_slots,
+        incompatibilities=parsed_data.incompatibilities,
+        partial_assignments=parsed_data.partial_assignments,
+        weights=weights,
+        preferences=parsed_data.preferences,
+        pairs=parsed_data.pair,
+        unwanted=parsed_data.unwanted,
+        logger=logging.getLogger("SchedulerTest"),
+        **kwargs
+    )
+
+class SearchTestCase(unittest.TestCase):
+    """
+    Runs each test from a temporary directory, since the search writes its best
+    schedule to final_solution.txt in the working directory.
+    """
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        with open("search_input.txt", "w") as f:
+            f.write(SEARCH_INPUT)
+        self.parsed_data = read_input("search_input.txt")
+        # Keep the progress printer quiet and from delaying each run_search by its interval
+        self._progress_monitor = and_tree.progress_monitor
+        and_tree.progress_monitor = lambda interval=1.0: None
+
+    def tearDown(self):
+        and_tree.progress_monitor = self._progress_monitor
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def assertValidSchedule(self, search, solution):
+        self.assertTrue(satisfies_hard_constraints(solution, search.incompatibilities, search.unwanted, search.incompat_map))
+        self.assertTrue(search.is_solution_complete(solution))
+
+class TestScheduleState(unittest.TestCase):
+    def test_assign_and_undo(self):
+        """
+        Assignments are undone in LIFO order and snapshots are independent copies.
+        """
+        slot_a = GameSlot("Slot A", "MO", "8:00", 3, 1)
+        slot_b = GameSlot("Slot B", "TU", "9:30", 3, 1)
+        game_1 = Game("Game 1", "CMSA", "U13T3", "01")
+        game_2 = Game("Game 2", "CMSA", "U13T3", "02")
+        game_3 = Game("Game 3", "CUSA", "O18", "01")
+        problem = CompiledProblem([game_1, game_2, game_3], [], [slot_a, slot_b], [], [], [])
+        state = ScheduleState(problem, {slot_a: [game_1], slot_b: []})
+        self.assertEqual(state.slot_items, [[0], []])
+        self.assertEqual(state.unassigned_game_ids(), [1, 2])
+
+        mark = state.mark()
+        state.assign(1, 0)
+        state.assign(2, 1)
+        snapshot = state.snapshot()
+        self.assertEqual(state.moves_since(mark), [(1, 0), (2, 1)])
+        self.assertEqual(state.solution[slot_a], [game_1, game_2])
+        self.assertEqual(state.item_slot, [0, 0, 1])
+        self.assertTrue(state.is_complete())
+
+        self.assertEqual(state.undo(), (2, 1))
+        self.assertEqual(state.solution[slot_b], [])
+        self.assertEqual(state.unassigned_game_ids(), [2])
+        state.undo_to(mark)
+        self.assertEqual(state.slot_items, [[0], []])
+        self.assertEqual(state.solution, {slot_a: [game_1], slot_b: []})
+        self.assertEqual(state.unassigned_game_ids(), [1, 2])
+        self.assertFalse(state.is_assigned(1))
+        self.assertFalse(state.is_complete())
+        self.assertEqual(snapshot[slot_a], [game_1, game_2])
+
+    def test_hash_depends_only_on_placements(self):
+        """
+        The Zobrist hash is the same however the placements were made, and undo restores it.
+        """
+        slots = [GameSlot(f"Slot {i}", "MO", f"{8 + i}:00", 3, 1) for i in range(3)]
+        games = [Game(f"Game {i}", "CMSA", "U13T3", f"0{i + 1}") for i in range(3)]
+        problem = CompiledProblem(games, [], slots, [], [], [])
+        first = ScheduleState(problem, {slot: [] for slot in slots})
+        second = ScheduleState(problem, {slot: [] for slot in slots})
+        empty = first.hash
+        first.apply([(0, 0), (1, 2), (2, 0)])
+        second.apply([(2, 0), (0, 0), (1, 2)])
+        self.assertEqual(first.hash, second.hash)
+        second.undo()
+        self.assertNotEqual(first.hash, second.hash)
+        first.undo_to(0)
+        self.assertEqual(first.hash, empty)
+
+    def test_remove_and_place_outside_the_trail(self):
+        slots = [GameSlot(f"Slot {i}", "MO", f"{8 + i}:00", 3, 1) for i in range(2)]
+        games = [Game(f"Game {i}", "CMSA", "U13T3", f"0{i + 1}") for i in range(3)]
+        problem = CompiledProblem(games, [], slots, [], [], [])
+        state = ScheduleState(problem, {slot: [] for slot in slots})
+        state.apply([(0, 0), (1, 0), (2, 1)])
+        moved = ScheduleState(problem, {slot: [] for slot in slots})
+        moved.apply([(1, 0), (2, 1), (0, 1)])
+        self.assertEqual(moved.remove(0), 1)
+        moved.place(0, 0)
+        self.assertEqual(moved.slot_items, [[1, 0], [2]])
+        self.assertEqual(moved.solution[slots[0]], [games[1], games[0]])
+        self.assertEqual(moved.item_slot, state.item_slot)
+        self.assertEqual(moved.hash, state.hash)
+
+class TestBoundedCache(unittest.TestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = BoundedCache(maxsize=2)
+        cache[1] = True
+        cache.add(2)
+        self.assertIn(1, cache)  # 1 becomes the most recently used
+        cache.add(3)             # evicts 2
+        self.assertNotIn(2, cache)
+        self.assertEqual(cache.get(1), True)
+        self.assertEqual(cache.get(3), True)
+        self.assertEqual(cache.stats(), {"entries": 2, "hits": 3, "misses": 1, "evictions": 1})
+
+class TestNogoodStore(unittest.TestCase):
+    def test_find_and_eviction(self):
+        store = NogoodStore(maxsize=2, max_length=2)
+        store.add([(3, 1), (0, 2)])
+        store.add([(1, 1), (2, 1), (4, 0)])  # too long to keep
+        self.assertEqual(len(store), 1)
+        item_slot = [2, None, None, 1, None]
+        self.assertEqual(store.find([(3, 1)], item_slot), ((0, 2), (3, 1)))
+        self.assertIsNone(store.find([(1, 1)], item_slot))
+        store.add([(1, 1)])
+        store.add([(2, 0)])  # evicts the first nogood
+        self.assertIsNone(store.find([(3, 1)], item_slot))
+        self.assertEqual(store.stats(), {"entries": 2, "hits": 1, "evictions": 1})
+
+class TestInputParser(SearchTestCase):
+    def test_references_resolve_to_parsed_objects(self):
+        """
+        Items named in the constraint sections are the parsed game and practice objects
+        themselves, and a reference to an unknown item matches none of them.
+        """
+        data = self.parsed_data
+        items = data.games + data.practices
+        referenced = [inc.game_or_practice1 for inc in data.incompatibilities] + \
+                     [inc.game_or_practice2 for inc in data.incompatibilities] + \
+                     [pair.game_or_practice1 for pair in data.pair] + \
+                     [p.game_or_practice for p in data.preferences + data.unwanted + data.partial_assignments]
+        for item in referenced:
+            self.assertTrue(any(item is other for other in items))
+        self.assertIs(data.partial_assignments[0].game_or_practice, data.practices[3])
+
+        unknown = determine_game_or_practice("CUSA O18 DIV 09", data.games, data.practices)
+        self.assertIsNone(unknown.id)
+        self.assertNotIn(unknown, items)
+
+    def test_reads_open_files_and_reports_bad_lines(self):
+        """
+        An open stream parses like the file it came from, and a malformed entry is
+        reported with its line number.
+        """
+        data = read_input(io.StringIO(SEARCH_INPUT))
+        self.assertEqual([g.id for g in data.games], [g.id for g in self.parsed_data.games])
+        self.assertEqual(len(data.preferences), len(self.parsed_data.preferences))
+
+        lines = SEARCH_INPUT.splitlines()
+        line = lines.index("Preferences:") + 2
+        lines.insert(line - 1, "MO, 8:00")
+        with self.assertRaisesRegex(ValueError, f"Line {line}:"):
+            read_input(io.StringIO("\n".join(lines) + "\n"))
+
+    def test_references_resolve_when_items_come_last(self):
+        """
+        References in sections read before the games and practices still resolve to the
+        parsed objects.
+        """
+        blocks = SEARCH_INPUT.strip().split("\n\n")
+        items_last = sorted(blocks, key=lambda block: 2 if block.startswith("Partial assignments:")
+                            else block.startswith(("Games:", "Practices:")))
+        data = read_input(io.StringIO("\n\n".join(items_last) + "\n\n"))
+        items = data.games + data.practices
+        for inc in data.incompatibilities:
+            self.assertTrue(any(inc.game_or_practice1 is other for other in items))
+        self.assertIs(data.partial_assignments[0].game_or_practice, data.practices[3])
+
+class TestProblemCache(SearchTestCase):
+    def test_cached_problem_matches_compiled_problem(self):
+        """
+        A cache hit returns the same problem as compiling the input, built around the
+        loaded objects, and solving it gives the same best score.
+        """
+        load_problem("search_input.txt", "cache")
+        self.assertEqual(len(os.listdir("cache")), 1)
+        parsed_data, problem = load_problem("search_input.txt", "cache")
+        compiled = build_search(self.parsed_data).problem
+        for name in list(ARRAY_FIELDS) + list(RAGGED_FIELDS):
+            self.assertEqual(getattr(problem, name), getattr(compiled, name))
+        for item, other in zip(problem.items, parsed_data.games + parsed_data.practices):
+            self.assertIs(item, other)
+
+        search = build_search(parsed_data, problem=problem)
+        self.assertIs(search.problem, problem)
+        self.assertEqual(search.run_search()[1], 3)
+
+    def test_cached_objects_match_parsed_objects(self):
+        """
+        The objects come back from the cache with the attributes the parser gave them,
+        and constraints refer to the loaded games and practices.
+        """
+        load_problem("search_input.txt", "cache")
+        parsed_data, _ = load_problem("search_input.txt", "cache")
+        for name, objects in vars(self.parsed_data).items():
+            self.assertEqual(len(getattr(parsed_data, name)), len(objects))
+            for loaded, parsed in zip(getattr(parsed_data, name), objects):
+                self.assertIs(type(loaded), type(parsed))
+                self.assertEqual(vars(loaded), vars(parsed))
+        self.assertIs(parsed_data.partial_assignments[0].game_or_practice, parsed_data.practices[3])
+
+    def test_stale_or_damaged_caches_are_rebuilt(self):
+        """
+        Changing the input keys a new cache, and a cache that does not match its input
+        or is cut short is ignored.
+        """
+        with open("search_input.txt", "rb") as f:
+            digest = input_digest(f.read())
+        path = cache_path("search_input.txt", digest, "cache")
+        self.assertIsNone(load_compiled(path, digest))
+        load_problem("search_input.txt", "cache")
+        self.assertIsNotNone(load_compiled(path, digest))
+        self.assertIsNone(load_compiled(path, input_digest(b"other input")))
+
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) // 2)
+        self.assertIsNone(load_compiled(path, digest))
+        parsed_data, problem = load_problem("search_input.txt", "cache")
+        self.assertEqual(len(problem.items), len(self.parsed_data.games) + len(self.parsed_data.practices))
+        self.assertIsNotNone(load_compiled(path, digest))
+
+        with open("search_input.txt", "w") as f:
+            f.write(SEARCH_INPUT.replace("CUSA O35T1 DIV 02\n", ""))
+        parsed_data, problem = load_problem("search_input.txt", "cache")
+        self.assertEqual(problem.n_games, len(self.parsed_data.games) - 1)
+        self.assertEqual(len(os.listdir("cache")), 2)
+
+    def test_changed_code_rebuilds_the_cache(self):
+        """
+        A cache written by other code (another CODE_DIGEST) is neither found nor trusted.
+        """
+        with open("search_input.txt", "rb") as f:
+            digest = input_digest(f.read())
+        load_problem("search_input.txt", "cache")
+        path = cache_path("search_input.txt", digest, "cache")
+        code = problem_cache.CODE_DIGEST
+        try:
+            problem_cache.CODE_DIGEST = problem_cache.code_digest([problem_cache])
+            self.assertNotEqual(cache_path("search_input.txt", digest, "cache"), path)
+            self.assertIsNone(load_compiled(path, digest))
+            load_problem("search_input.txt", "cache")
+            self.assertEqual(len(os.listdir("cache")), 2)
+        finally:
+            problem_cache.CODE_DIGEST = code
+        self.assertIsNotNone(load_compiled(path, digest))
+
+class TestInPlaceSearch(SearchTestCase):
+    def test_search_finds_best_schedule(self):
+        """
+        The in-place search returns a valid complete schedule with the known best score,
+        and leaves the state back at the root.
+        """
+        search = build_search(self.parsed_data)
+        best_solution, best_score = search.run_search()
+
+        self.assertValidSchedule(search, best_solution)
+        self.assertEqual(best_score, 3)
+        self.assertEqual(soft_penalty(best_solution, search.weights, search.preferences, search.pairs), best_score)
+        self.assertEqual(search.state.moves_since(0), search.root.moves)
+
+    def test_tiny_caches_still_find_best_schedule(self):
+        """
+        Evicting visited states and hard-constraint results only costs repeated work.
+        """
+        search = build_search(self.parsed_data, visited_cache_size=2, hard_cache_size=1, hash_bits=128,
+                              check_constraints=True)
+        best_solution, best_score = search.run_search()
+        self.assertValidSchedule(search, best_solution)
+        self.assertEqual(best_score, 3)
+        self.assertLessEqual(len(search.hard_constraint_cache), 1)
+
+class TestBackjumping(SearchTestCase):
+    def test_dead_end_explanations_are_nogoods(self):
+        """
+        The placements a dead end is blamed on leave the item without a feasible slot
+        on their own, placed on a fresh root state.
+        """
+        search = build_search(self.parsed_data, backjumping=True)
+        dead_ends = 0
+        for seed in range(50):
+            rng = random.Random(seed)
+            search.reset_state()
+            state = search.state
+            while not state.is_complete() and not search.domains.has_dead_end():
+                item = rng.choice(sorted(state.unassigned_games | state.unassigned_practices))
+                state.assign(item, rng.choice(sorted(search.domains.domain(item))))
+            if state.is_complete():
+                continue
+            dead_ends += 1
+            item = search.domains.dead_end_item()
+            nogood = [state.trail[index] for index in sorted(search.explain_dead_end())]
+            search.reset_state()
+            search.state.apply(nogood)
+            self.assertFalse(search.domains.domain(item))
+        self.assertGreater(dead_ends, 0)
+        self.assertGreater(len(search.nogoods), 0)
+
+    def test_backjumping_keeps_best_schedule(self):
+        for options in [{}, {"practice_fallback": True}]:
+            search = build_search(self.parsed_data, backjumping=True, **options)
+            best_solution, best_score = search.run_search()
+            self.assertValidSchedule(search, best_solution)
+            self.assertEqual(best_score, build_search(self.parsed_data, **options).run_search()[1])
+
+class TestSymmetryBreaking(SearchTestCase):
+    def test_interchangeable_games_and_slots(self):
+        """
+        Games that only differ in their division (and preferences, which the search
+        adds) form classes, as do slots with the same capacity and overlaps.
+        """
+        with open("symmetry_input.txt", "w") as f:
+            f.write(SYMMETRY_INPUT)
+        parsed_data = read_input("symmetry_input.txt")
+        problem = build_search(parsed_data).problem
+        self.assertEqual(problem.interchangeable_items(), [list(range(11))])
+        self.assertEqual(problem.interchangeable_slots(), [[2, 5], [3, 4, 6]])
+
+        search = build_search(parsed_data, weights=[1] * 8, symmetry_breaking=True)
+        self.assertEqual(search.game_classes[1], (1, 2, 3, 4, 5, 7))
+        self.assertEqual(search.game_classes[8], (8, 9, 10))
+        self.assertNotIn(0, search.game_classes)
+        # The preferences set MO 10:00 and MO 17:00 apart
+        self.assertEqual([c is not None for c in search.slot_class[:7]], [False, False, False, False, True, False, True])
+
+    def test_symmetry_breaking_keeps_best_score(self):
+        """
+        Without practices the DFS is exhaustive, so leaving out symmetric branches must
+        give the same optimum from fewer nodes.
+        """
+        with open("symmetry_input.txt", "w") as f:
+            f.write(SYMMETRY_INPUT)
+        parsed_data = read_input("symmetry_input.txt")
+        results = []
+        for symmetry_breaking in [False, True]:
+            and_tree.progress_state["expanded_nodes"] = 0
+            search = build_search(parsed_data, weights=[1] * 8, symmetry_breaking=symmetry_breaking)
+            best_solution, best_score = search.run_search()
+            self.assertValidSchedule(search, best_solution)
+            results.append((best_score, and_tree.progress_state["expanded_nodes"]))
+        self.assertEqual(results[0][0], results[1][0])
+        self.assertLess(results[1][1], results[0][1])
+
+class TestSearchBudgets(SearchTestCase):
+    def test_completed_search_status(self):
+        search = build_search(self.parsed_data)
+        best_solution, best_score, status = search.run_search(with_status=True)
+        self.assertEqual(best_score, 3)
+        self.assertEqual(status.stopped_by, "completed")
+        self.assertIsNone(status.cursor)
+        self.assertLessEqual(status.lower_bound, best_score)
+        self.assertEqual(status.gap, best_score - status.lower_bound)
+        self.assertEqual(status.proven_optimal, status.gap <= 0)
+
+    def test_node_limit_and_target_score(self):
+        """
+        A node budget stops the search with a cursor that finishes it, and a target
+        score stops it at the first schedule that good.
+        """
+        search = build_search(self.parsed_data)
+        _, _, status = search.run_search(node_limit=3, with_status=True)
+        self.assertEqual(status.stopped_by, "node_limit")
+        self.assertEqual(status.expanded_nodes, 3)
+        self.assertIsNone(search.resume_search(status.cursor))
+        self.assertEqual(and_tree.progress_state["best_score"], 3)
+
+        best_solution, best_score, status = build_search(self.parsed_data).run_search(target_score=100, with_status=True)
+        self.assertEqual(status.stopped_by, "target_score")
+        self.assertLessEqual(best_score, 100)
+        self.assertValidSchedule(search, best_solution)
+
+    def test_time_limit(self):
+        best_solution, best_score, status = build_search(self.parsed_data).run_search(time_limit=0, with_status=True)
+        self.assertEqual(status.stopped_by, "time_limit")
+        self.assertFalse(status.proven_optimal)
+        self.assertEqual(best_score, float('inf'))
+        self.assertIsNone(best_solution)
+
+    def test_options(self):
+        search = build_search(self.parsed_data, seed=3)
+        self.assertEqual(search.options, dict(and_tree.SEARCH_OPTIONS, seed=3))
+        with self.assertRaisesRegex(TypeError, "grasp_restarts"):
+            build_search(self.parsed_data, grasp_restarts=20)
+
+class TestSearchCursor(SearchTestCase):
+    def test_pause_and_resume_matches_uninterrupted_search(self):
+        """
+        A search stopped every few nodes and resumed from a pickled cursor in a fresh
+        ANDTreeSearch expands the same nodes and finds the same best schedule, also in
+        slot order, where children are generated one at a time.
+        """
+        for value_order in ("penalty", "slot"):
+            with self.subTest(value_order=value_order):
+                and_tree.progress_state["expanded_nodes"] = 0
+                _, expected_score = build_search(self.parsed_data, value_order=value_order).run_search()
+                expected_nodes = and_tree.progress_state["expanded_nodes"]
+
+                and_tree.progress_state["expanded_nodes"] = 0
+                and_tree.progress_state["best_score"] = float('inf')
+                search = build_search(self.parsed_data, value_order=value_order)
+                cursor = search.depth_first_search(search.root, node_limit=2)
+                pauses = 0
+                while cursor is not None:
+                    pauses += 1
+                    cursor = pickle.loads(pickle.dumps(cursor))
+                    search = build_search(self.parsed_data, value_order=value_order)
+                    cursor = search.resume_search(cursor, node_limit=and_tree.progress_state["expanded_nodes"] + 2)
+
+                self.assertGreater(pauses, 1)
+                self.assertEqual(and_tree.progress_state["best_score"], expected_score)
+                self.assertEqual(and_tree.progress_state["expanded_nodes"], expected_nodes)
+                self.assertValidSchedule(search, search.best_solution)
+
+    def test_slot_order_generates_children_lazily(self):
+        """
+        In slot order the root's frame holds a generator, and a child is only built when
+        the DFS asks for it, with the state back at the root afterwards.
+        """
+        search = build_search(self.parsed_data, value_order="slot")
+        frame = search.visit_node(search.root, 0, None, BoundedCache(None), 1000)
+        self.assertEqual(frame.children, [])
+        self.assertIsNotNone(frame.pending)
+        trail = list(search.state.trail)
+        first = frame.next_child()
+        self.assertEqual(search.state.trail, trail)
+        frame.generate_pending()
+        self.assertIsNone(frame.pending)
+
+        eager = build_search(self.parsed_data)
+        eager.value_order = "slot"
+        eager.work_sharing = object()
+        children = eager.visit_node(eager.root, 0, None, BoundedCache(None), 1000).children
+        self.assertEqual([c.moves for c in reversed(children)], [first.moves] + [c.moves for c in reversed(frame.children)])
+
+class TestParallelSearch(SearchTestCase):
+    def test_root_split_covers_sequential_result(self):
+        """
+        Splitting below the root and searching the subproblems in worker processes
+        finds the same best score as the sequential search.
+        """
+        search = build_search(self.parsed_data)
+        best_solution, best_score = run_parallel_search(search, processes=2, split_depth=1)
+        self.assertEqual(best_score, 3)
+        self.assertValidSchedule(search, best_solution)
+        self.assertTrue(os.path.exists("final_solution_2.txt"))
+
+    def test_work_stealing_matches_sequential_result(self):
+        """
+        Workers that share open nodes through the task queue find the best score.
+        """
+        search = build_search(self.parsed_data)
+        best_solution, best_score = run_work_stealing_search(search, processes=2)
+        self.assertEqual(best_score, 3)
+        self.assertValidSchedule(search, best_solution)
+
+    def test_time_limit_stops_the_workers(self):
+        """
+        A time limit that has already run out stops both parallel searches before they
+        find a schedule.
+        """
+        for run in (run_parallel_search, run_work_stealing_search):
+            with self.subTest(run=run.__name__):
+                search = build_search(self.parsed_data)
+                self.assertEqual(run(search, processes=2, time_limit=0), (None, float('inf')))
+
+    def test_donated_nodes_cover_the_tree(self):
+        """
+        A search that donates nodes at every step, with the donated nodes then searched
+        from their assignment vectors, still finds the best schedule.
+        """
+        search = build_search(self.parsed_data)
+        tasks = queue.Queue()
+        outstanding = multiprocessing.Value('i', 1)
+        search.work_sharing = WorkSharing(tasks, multiprocessing.Value('i', 1), outstanding, interval=1)
+        and_tree.progress_state["best_score"] = float('inf')
+        search.reset_state()
+        tasks.put((search.problem.vector_from_solution(search.root.solution), 0, 0, 0))
+        visited_states = BoundedCache()
+        searched = 0
+        while not tasks.empty():
+            search.search_from_vector(*tasks.get(), visited_states)
+            searched += 1
+        self.assertGreater(searched, 1)
+        self.assertEqual(outstanding.value, searched)
+        self.assertEqual(and_tree.progress_state["best_score"], 3)
+        self.assertValidSchedule(search, search.best_solution)
+
+class TestPortfolio(SearchTestCase):
+    def test_every_configuration_finds_a_valid_schedule(self):
+        """
+        Each portfolio configuration searches to a valid schedule whose score is its penalty.
+        """
+        for config in PORTFOLIO:
+            options = dict(config)
+            del options["name"]
+            driver = options.pop("driver", "dfs")
+            beam_width = options.pop("beam_width", None)
+            search = build_search(self.parsed_data, **options)
+            if driver == "best_first":
+                best_solution, best_score = run_best_first(search, beam_width)
+            else:
+                best_solution, best_score = search.run_search()
+            self.assertValidSchedule(search, best_solution)
+            self.assertEqual(soft_penalty(best_solution, search.weights, search.preferences, search.pairs), best_score)
+
+    def test_unknown_order_is_rejected(self):
+        with self.assertRaises(ValueError):
+            build_search(self.parsed_data, game_order="largest")
+
+    def test_portfolio_returns_best_schedule(self):
+        """
+        The portfolio writes its best schedule to final_solution.txt; this fixture's
+        root lower bound is below the best score, so optimality is not proven.
+        """
+        search = build_search(self.parsed_data)
+        best_solution, best_score, proven_optimal = run_portfolio(search, PORTFOLIO[:2] + PORTFOLIO[-1:], time_limit=30)
+        self.assertLessEqual(best_score, 3)
+        self.assertFalse(proven_optimal)
+        self.assertValidSchedule(search, best_solution)
+        self.assertEqual(soft_penalty(best_solution, search.weights, search.preferences, search.pairs), best_score)
+        self.assertTrue(os.path.exists("final_solution.txt"))
+
+class TestSolveMany(SearchTestCase):
+    SWEEP = [WEIGHTS, [1, 1, 1, 1, 1, 1, 1, 1], [0, 1, 0, 0, 10, 10, 0, 10]]
+
+    def test_weight_vectors_get_their_own_best_schedules(self):
+        """
+        Each weight vector gets the best score its own search finds, with the schedule
+        that scores it under those weights, in one process or several.
+        """
+        expected = []
+        for weights in self.SWEEP:
+            search = build_search(self.parsed_data, weights=weights)
+            expected.append(search.run_search()[1])
+        for processes in (1, 2):
+            results = solve_many("search_input.txt", self.SWEEP, processes=processes, round_nodes=5)
+            self.assertEqual([score for _, score in results], expected)
+            for weights, (solution, score) in zip(self.SWEEP, results):
+                search = build_search(self.parsed_data, weights=weights)
+                self.assertValidSchedule(search, solution)
+                self.assertEqual(soft_penalty(solution, weights, search.preferences, search.pairs), score)
+
+    def test_searches_share_the_problem_and_rescore_seeds(self):
+        """
+        A schedule found under one weight vector is rescored under another before it
+        seeds that search, and both searches run on the same compiled problem.
+        """
+        parsed_data, problem = load_problem("search_input.txt")
+        arguments = dict(games=parsed_data.games, practices=parsed_data.practices,
+                         game_slots=parsed_data.game_slots, practice_slots=parsed_data.practice_slots,
+                         incompatibilities=parsed_data.incompatibilities, preferences=parsed_data.preferences,
+                         pairs=parsed_data.pair, partial_assignments=parsed_data.partial_assignments,
+                         unwanted=parsed_data.unwanted, problem=problem)
+        sweep = WeightSweep(arguments, self.SWEEP)
+        finished, vector, score, _ = sweep.run_round(0, [], 10 ** 6)
+        self.assertTrue(finished)
+        self.assertIs(sweep.search(1).problem, sweep.search(0).problem)
+
+        other = sweep.search(1)
+        rescored = soft_penalty(problem.solution_from_vector(vector), self.SWEEP[1], other.preferences, other.pairs)
+        self.assertEqual(other.score_vector(vector), rescored)
+        _, _, seeded_score, _ = sweep.run_round(1, [vector], 0)
+        self.assertEqual(seeded_score, rescored)
+
+class TestLocalSearch(SearchTestCase):
+    def test_annealing_keeps_schedules_valid(self):
+        """
+        Every improvement local search reports is a valid schedule with that score that
+        keeps the partial assignments, and the best is no worse than the start.
+        """
+        search = build_search(self.parsed_data, weights=[1, 1, 1, 1, 1, 1, 1, 1])
+        start, start_score = search.run_search()
+        problem = search.problem
+        fixed = [i for i, slot in enumerate(problem.vector_from_solution(search.root.solution)) if slot is not None]
+        local_search = LocalSearch(problem, PenaltyTracker(problem, search.weights, search.preferences, search.pairs), fixed, seed=3)
+        improvements = []
+        vector, score = local_search.run(problem.vector_from_solution(start), 500,
+                                         lambda v, sc: improvements.append((v, sc)))
+        self.assertLessEqual(score, start_score)
+        for v, sc in improvements:
+            solution = problem.solution_from_vector(v)
+            self.assertValidSchedule(search, solution)
+            self.assertAlmostEqual(soft_penalty(solution, search.weights, search.preferences, search.pairs), sc)
+            for item in fixed:
+                self.assertEqual(v[item], vector[item])
+        self.assertEqual(local_search.penalties.penalty(),
+                         soft_penalty(local_search.state.solution, search.weights, search.preferences, search.pairs))
+
+    def test_block_swaps_games_with_their_practices(self):
+        """
+        A block move exchanges the slots of two games and moves their practices along
+        into a valid schedule; revert, or a move that fails, leaves the schedule as it
+        was.
+        """
+        search = build_search(self.parsed_data, weights=[1, 1, 1, 1, 1, 1, 1, 1])
+        start, _ = search.run_search()
+        problem = search.problem
+        fixed = [i for i, slot in enumerate(problem.vector_from_solution(search.root.solution)) if slot is not None]
+        local_search = LocalSearch(problem, PenaltyTracker(problem, search.weights, search.preferences, search.pairs), fixed, seed=5)
+        local_search.run(problem.vector_from_solution(start), 0)
+        state = local_search.state
+        moved = 0
+        for _ in range(200):
+            before = state.assignment_vector()
+            changes = local_search.block()
+            if changes is None:
+                self.assertEqual(state.assignment_vector(), before)
+                continue
+            moved += 1
+            (g1, s1), (g2, s2) = changes[:2]
+            self.assertEqual((state.item_slot[g1], state.item_slot[g2]), (s2, s1))
+            self.assertEqual({item for item, _ in changes[2:]},
+                             {p for g in (g1, g2) for p in problem.associated_practices[g] if p not in fixed})
+            self.assertValidSchedule(search, state.solution)
+            local_search.revert(changes)
+            self.assertEqual(state.assignment_vector(), before)
+        self.assertGreater(moved, 0)
+
+    def test_search_with_local_search(self):
+        search = build_search(self.parsed_data, local_search_iterations=300)
+        best_solution, best_score = search.run_search()
+        self.assertLessEqual(best_score, 3)
+        self.assertValidSchedule(search, best_solution)
+        self.assertEqual(soft_penalty(best_solution, search.weights, search.preferences, search.pairs), best_score)
+
+class TestLargeNeighbourhoodSearch(SearchTestCase):
+    def test_fixed_assignments_are_kept(self):
+        """
+        Games fixed at their slots in the best schedule stay there, and the search fills
+        in the rest; a fixed placement that breaks a hard constraint is rejected.
+        """
+        search = build_search(self.parsed_data)
+        best_solution, best_score = search.run_search()
+        vector = search.problem.vector_from_solution(best_solution)
+        fixed = tuple(slot if search.problem.item_is_game[i] else None for i, slot in enumerate(vector))
+        solution, score = build_search(self.parsed_data).run_search(fixed_assignments=fixed)
+        self.assertValidSchedule(search, solution)
+        self.assertLessEqual(score, best_score)
+        for g in search.problem.game_ids():
+            self.assertEqual(search.problem.vector_from_solution(solution)[g], vector[g])
+
+        # The two incompatible U13T3 games in one slot
+        clash = [None] * len(search.problem.items)
+        clash[0] = clash[1] = 2
+        with self.assertRaises(ValueError):
+            build_search(self.parsed_data).run_search(fixed_assignments=clash)
+
+    def test_dead_end_under_fixed_assignments_does_not_stick(self):
+        """
+        A run whose fixed assignments leave the root without a completion does not stop
+        the next run from the same root, nor splitting the tree below it.
+        """
+        search = build_search(self.parsed_data)
+        fixed = [None] * len(search.problem.items)
+        fixed[3] = 3
+        self.assertIsNone(search.run_search(fixed_assignments=tuple(fixed))[0])
+        self.assertTrue(search.split_root(1))
+        self.assertIsNone(search.run_search(fixed_assignments=tuple(fixed))[0])
+        self.assertEqual(search.run_search()[1], 3)
+
+    def test_repair_places_freed_practices_of_fixed_games_with_fallback(self):
+        """
+        Freeing only practices leaves every game fixed, so apply_fixed_assignments places
+        all of them; it does so with the practice fallback, like the DFS, and finds a
+        better schedule than the plain DFS did.
+        """
+        search = build_search(self.parsed_data)
+        best_solution, best_score = search.run_search()
+        vector = search.problem.vector_from_solution(best_solution)
+        repaired = LargeNeighbourhoodSearch(search, 200).repair(vector, best_score, set(search.problem.practice_ids()))
+        self.assertIsNotNone(repaired)
+        repaired_vector, score = repaired
+        self.assertLess(score, best_score)
+        self.assertValidSchedule(search, search.problem.solution_from_vector(repaired_vector))
+        for g in search.problem.game_ids():
+            self.assertEqual(repaired_vector[g], vector[g])
+        self.assertFalse(search.practice_fallback)
+
+    def test_lns_improves_a_valid_schedule(self):
+        search = build_search(self.parsed_data)
+        best_solution, best_score = run_lns(search, iterations=20, node_limit=50)
+        self.assertLessEqual(best_score, 3)
+        self.assertValidSchedule(search, best_solution)
+        self.assertEqual(soft_penalty(best_solution, search.weights, search.preferences, search.pairs), best_score)
+        for slot, items in search.root.solution.items():
+            for item in items:
+                self.assertIn(item, best_solution[slot])
+        self.assertFalse(search.practice_fallback)
+
+class TestWarmStart(SearchTestCase):
+    def test_schedule_files_load_back(self):
+        """
+        A schedule saved by the search, and the same schedule in the reference format,
+        load back as its assignment vector with nothing dropped.
+        """
+        search = build_search(self.parsed_data)
+        best_solution, _ = search.run_search()
+        vector = search.problem.vector_from_solution(best_solution)
+        reference = []
+        for slot, items in best_solution.items():
+            for item in items:
+                kind = "Game  " if isinstance(item, Game) else f"{item.practice_type}"
+                reference.append(f"{item.league} {item.tier} DIV {item.division:02} - {kind}: "
+                                 f"{slot.day}, {int(slot.start_time):02}:{round(slot.start_time % 1 * 60):02}")
+        with open("reference.txt", "w") as f:
+            f.write("\n".join(reference) + "\n\nEval value: 3\n")
+
+        for solution_file in ("final_solution.txt", "reference.txt"):
+            loaded, dropped = load_solution(build_search(self.parsed_data), solution_file)
+            self.assertEqual(loaded, vector)
+            self.assertEqual(dropped, [])
+        with self.assertRaisesRegex(ValueError, "Line 2:"):
+            read_solution(io.StringIO("\nCMSA U13T3 DIV 01 MO 8:00\n"), self.parsed_data.games, self.parsed_data.practices)
+
+    def test_changed_input_keeps_the_valid_part(self):
+        """
+        Against an input that no longer allows part of the schedule, only the entries
+        that break it are dropped, and the repaired schedule is valid and complete.
+        """
+        search = build_search(self.parsed_data)
+        best_solution, _ = search.run_search()
+        vector = search.problem.vector_from_solution(best_solution)
+        # Two games the schedule puts in one slot become incompatible
+        first, second = next(items for items in best_solution.values() if sum(isinstance(it, Game) for it in items) > 1)[:2]
+        changed = SEARCH_INPUT.replace("Not compatible:\n", f"Not compatible:\n{first.league} {first.tier} DIV "
+                                       f"{first.division:02}, {second.league} {second.tier} DIV {second.division:02}\n")
+        with open("changed_input.txt", "w") as f:
+            f.write(changed)
+        changed_search = build_search(read_input("changed_input.txt"))
+        loaded, dropped = load_solution(changed_search, "final_solution.txt")
+        self.assertEqual(len(dropped), 1)
+        self.assertEqual(sum(slot != loaded[i] for i, slot in enumerate(vector)), 1)
+
+        solution, score = run_from_solution(changed_search, "final_solution.txt")
+        self.assertValidSchedule(changed_search, solution)
+        self.assertEqual(soft_penalty(solution, changed_search.weights, changed_search.preferences, changed_search.pairs), score)
+        self.assertTrue(os.path.exists("final_solution_2.txt"))
+
+class TestBestFirstSearch(SearchTestCase):
+    def test_best_first_finds_best_schedule(self):
+        """
+        With nothing dropped, best-first search explores the DFS's tree in another order
+        and finds the same best score.
+        """
+        search = build_search(self.parsed_data)
+        best_solution, best_score = run_best_first(search)
+        self.assertEqual(best_score, 3)
+        self.assertValidSchedule(search, best_solution)
+        self.assertEqual(search.state.moves_since(0), [])
+
+    def test_beam_keeps_valid_schedules(self):
+        for beam_width in [1, 3]:
+            search = build_search(self.parsed_data)
+            and_tree.progress_state["best_score"] = float('inf')
+            search.reset_state()
+            best_first_search(search, beam_width=beam_width)
+            self.assertValidSchedule(search, search.best_solution)
+            self.assertEqual(soft_penalty(search.best_solution, search.weights, search.preferences, search.pairs),
+                             and_tree.progress_state["best_score"])
+
+class TestGrasp(SearchTestCase):
+    def test_constructions_are_valid_schedules(self):
+        """
+        Every randomised construction that completes is a valid schedule with the partial
+        assignments in place and the score soft_penalty gives it.
+        """
+        search = build_search(self.parsed_data)
+        rng = random.Random(7)
+        completed = 0
+        for _ in range(30):
+            result = construct(search, rng, alpha=0.5)
+            if result is None:
+                continue
+            completed += 1
+            vector, score = result
+            solution = search.problem.solution_from_vector(vector)
+            self.assertValidSchedule(search, solution)
+            self.assertEqual(soft_penalty(solution, search.weights, search.preferences, search.pairs), score)
+            for slot, items in search.root.solution.items():
+                for item in items:
+                    self.assertIn(item, solution[slot])
+        self.assertGreater(completed, 0)
+
+    def test_grasp_seeds_the_search(self):
+        """
+        The best GRASP schedule becomes the incumbent before the DFS starts, so a
+        target score it already meets stops the search straight away.
+        """
+        vector, score = run_grasp(build_search(self.parsed_data), 20, processes=2)
+        self.assertValidSchedule(build_search(self.parsed_data), build_search(self.parsed_data).problem.solution_from_vector(vector))
+        vector, score = run_grasp(build_search(self.parsed_data), 20)
+        search = build_search(self.parsed_data)
+        best_solution, best_score, status = run_grasp_search(search, 20, target_score=score, with_status=True)
+        self.assertEqual(best_score, score)
+        self.assertEqual(status.stopped_by, "target_score")
+        self.assertEqual(status.expanded_nodes, 1)
+        self.assertValidSchedule(search, best_solution)
+
+class TestPenaltyTracker(SearchTestCase):
+    def test_tracker_follows_random_moves(self):
+        """
+        Running totals match soft_penalty/partial_soft_penalty through random
+        assignments and undos, for several weight vectors.
+        """
+        search = build_search(self.parsed_data)
+        state = search.state
+        rng = random.Random(5)
+        all_weights = [WEIGHTS, [1, 1, 1, 1, 1, 1, 1, 1], [0, 2, 0, 3, 0, 0, 0, 1]]
+        for _ in range(300):
+            unassigned = sorted(state.unassigned_games | state.unassigned_practices)
+            if state.trail and (not unassigned or rng.random() < 0.4):
+                state.undo()
+            else:
+                item = rng.choice(unassigned)
+                state.assign(item, rng.choice(range(len(search.problem.slots))))
+            for weights in all_weights:
+                self.assertAlmostEqual(search.penalties.partial_penalty(weights),
+                                       partial_soft_penalty(state.solution, weights, search.preferences, search.pairs))
+                self.assertAlmostEqual(search.penalties.penalty(weights),
+                                       soft_penalty(state.solution, weights, search.preferences, search.pairs))
+
+    def test_search_with_cross_checked_penalties(self):
+        """
+        In debug mode every penalty query of a full search is cross-checked.
+        """
+        search = build_search(self.parsed_data, check_penalties=True)
+        best_solution, best_score = search.run_search()
+        self.assertEqual(best_score, 3)
+
+class TestLowerBounds(SearchTestCase):
+    def test_bounds_never_exceed_completed_score(self):
+        """
+        Along random assignment orders, partial penalty plus bounds at every prefix stays
+        at or below the score of the schedule the order completes.
+        """
+        search = build_search(self.parsed_data, weights=[1, 1, 1, 1, 1, 1, 1, 1])
+        state = search.state
+        rng = random.Random(11)
+        for _ in range(50):
+            prefix_bounds = [search.lower_bound(search.penalties.partial_penalty())]
+            mark = state.mark()
+            while not state.is_complete():
+                item = rng.choice(sorted(state.unassigned_games | state.unassigned_practices))
+                slots = search.problem.candidate_slots(item)
+                state.assign(item, rng.choice(slots))
+                prefix_bounds.append(search.lower_bound(search.penalties.partial_penalty()))
+            score = search.penalties.penalty()
+            self.assertAlmostEqual(prefix_bounds[-1], score)
+            for bound in prefix_bounds:
+                self.assertLessEqual(bound, score + 1e-9)
+            state.undo_to(mark)
+
+    def test_bounds_keep_best_score(self):
+        """
+        Pruning with and without bounds finds the same best score.
+        """
+        for bounds in [(), None]:
+            best_solution, best_score = build_search(self.parsed_data, bounds=bounds).run_search()
+            self.assertEqual(best_score, 3)
+
+if __name__ == "__main__":
+    unittest.main()
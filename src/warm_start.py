@@ -0,0 +1,127 @@
+import threading
+
+import and_tree
+from and_tree import progress_state
+from input_parser import read_solution
+from hard_constraints import satisfies_hard_constraints
+from lns import LargeNeighbourhoodSearch
+
+def load_solution(search, solution_file):
+    """
+    Read a schedule file (see input_parser.read_solution) as an assignment vector of
+    search's problem. An entry is dropped, with its reason in the returned list of
+    (line, reason), when its item or slot is not in the input any more, its item is
+    already placed (twice in the file, or by a partial assignment), or it is what makes
+    the schedule break the hard constraints. Returns (vector, dropped): the vector
+    places the root's partial assignments and every kept entry, and has None for the
+    other items. The state is left reset at the root.
+    """
+    problem = search.problem
+    slot_ids = {}
+    for s, slot in enumerate(problem.slots):
+        slot_ids.setdefault((problem.slot_is_game[s], slot.day, round(slot.start_time * 60)), s)
+
+    placements, dropped = [], []
+    for assignment in read_solution(solution_file, search.games, search.practices):
+        item = problem.item_index.get(assignment.game_or_practice) if assignment.game_or_practice.id is not None else None
+        if item is None:
+            dropped.append((assignment.id, "item is not in the input"))
+            continue
+        slot = slot_ids.get((problem.item_is_game[item], assignment.slot_day, round(assignment.slot_time * 60)))
+        if slot is None:
+            dropped.append((assignment.id, "slot is not in the input"))
+            continue
+        placements.append((assignment.id, item, slot))
+
+    search.reset_state()
+    state = search.state
+    kept = []
+    for line, item, slot in placements:
+        if state.is_assigned(item):
+            if state.item_slot[item] != slot:
+                dropped.append((line, "item is already placed"))
+            continue
+        state.assign(item, slot)
+        kept.append((line, item, slot))
+
+    # Most of a schedule for a slightly changed input is still valid; only if the whole
+    # of it is not are the entries replayed one by one, games first, to find the broken
+    # ones (check_assignment gives the same verdicts, a placement at a time)
+    if not satisfies_hard_constraints(state.solution, search.incompatibilities, search.unwanted,
+                                      search.incompat_map, search.overlap_index):
+        search.reset_state()
+        state = search.state
+        for line, item, slot in sorted(kept, key=lambda entry: not problem.item_is_game[entry[1]]):
+            if search.check_assignment(item, slot, state):
+                state.assign(item, slot)
+            else:
+                dropped.append((line, "breaks the hard constraints"))
+
+    vector = state.assignment_vector()
+    search.reset_state()
+    return vector, sorted(dropped)
+
+def repair_solution(search, vector, node_limit=2000):
+    """
+    Complete the valid part of a schedule (an assignment vector with None for the items
+    to place) by searching only what is missing. Everything else is held as fixed
+    assignments while the DFS places the missing items, for at most node_limit nodes.
+    If that finds nothing, more is freed each time: the league/tier of every missing
+    item, then also every item placed in a slot of a missing item's kind on the days
+    the missing items can use, and finally the whole schedule. Returns (vector, score)
+    of the repaired schedule, or (None, inf) if none was found.
+    """
+    problem = search.problem
+    lns = LargeNeighbourhoodSearch(search, node_limit)
+    missing = {i for i, s in enumerate(vector) if s is None}
+    if not missing:
+        return vector, search.score_vector(vector)
+
+    tiers = {(problem.items[i].league, problem.items[i].tier) for i in missing}
+    same_tier = missing | {i for i, item in enumerate(problem.items) if (item.league, item.tier) in tiers}
+    kinds = {problem.item_is_game[i] for i in missing}
+    days = {problem.slots[s].day for i in missing for s in problem.candidate_slots(i)}
+    same_days = same_tier | {i for i, s in enumerate(vector)
+                             if s is not None and problem.slot_is_game[s] in kinds and problem.slots[s].day in days}
+    for free in (missing, same_tier, same_days):
+        repaired = lns.repair(vector, float('inf'), free)
+        if repaired is not None:
+            search.logger.debug("Repaired the schedule with %d of %d items freed", len(free), len(vector))
+            return repaired
+    search.logger.debug("No repair kept any of the schedule, searching from scratch")
+    return lns.first_schedule()
+
+def run_from_solution(search, solution_file, time_limit=None, node_limit=2000, seed=0):
+    """
+    Re-solve from a previous schedule: load solution_file against search's input
+    (load_solution), keep its valid part, repair the rest (repair_solution), and, given
+    a time_limit in seconds, improve the result with large neighbourhood search for
+    that long. Progress is reported like run_search, the best schedule is written to
+    search.solution_file and final_solution_2.txt, and (best_solution, best_score) is
+    returned, with (None, inf) if no valid schedule was found.
+    """
+    progress_state["best_score"] = float('inf')
+    progress_state["done"] = False
+    monitor_thread = threading.Thread(target=and_tree.progress_monitor, daemon=True)
+    monitor_thread.start()
+
+    vector, dropped = load_solution(search, solution_file)
+    for line, reason in dropped:
+        search.logger.debug("Solution line %d dropped: %s", line, reason)
+    search.logger.debug("Loaded %d placements from %s, %d dropped",
+                        sum(s is not None for s in vector), solution_file, len(dropped))
+
+    vector, score = repair_solution(search, vector, node_limit)
+    if vector is not None and time_limit:
+        lns = LargeNeighbourhoodSearch(search, node_limit, seed=seed)
+        vector, score = lns.run(vector, score, time_limit=time_limit)
+
+    search.best_solution = None
+    if vector is not None:
+        search.record_best(search.problem.solution_from_vector(vector), score)
+    search.reset_state()
+
+    progress_state["done"] = True
+    monitor_thread.join()
+    search.save_solution_to_file("final_solution_2.txt")
+    return search.best_solution, progress_state["best_score"]